@@ -0,0 +1,160 @@
+"""GEDCOM import benchmark: throughput and peak memory on a generated file
+
+Usage (from backend/):
+    python scripts/bench_gedcom_import.py                 # 100k records, parsing only
+    python scripts/bench_gedcom_import.py --records 250000
+    python scripts/bench_gedcom_import.py --import        # full import into MONGO_URL/DB_NAME
+    python scripts/bench_gedcom_import.py --check         # malformed-record regressions, against MONGO_URL/DB_NAME
+
+Parsing only runs the same code path as the import (file decoding, record
+grouping, INDI/FAM parsing) without a database. --import runs
+run_gedcom_import end to end against the configured database, under a
+throwaway owner id whose persons/links are deleted afterwards. --check
+imports a small file with an xref-less INDI and a repeated INDI xref the
+same way and verifies both are skipped instead of failing the import.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import server  # noqa: E402
+
+FIRST_NAMES = ["Jean", "Marie", "Pierre", "Sophie", "Lucas", "Emma", "Louis", "Alice", "Paul", "Jeanne"]
+LAST_NAMES = ["Dupont", "Martin", "Bernard", "Durand", "Lefebvre", "Moreau", "Laurent", "Simon"]
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+
+def write_gedcom(path: str, records: int, seed: int = 42) -> dict:
+    """Write about `records` level-0 records: 3 individuals per family of 2 parents + 1 child"""
+    rng = random.Random(seed)
+    individuals = records * 3 // 4
+    families = individuals // 3
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write("0 HEAD\n1 GEDC\n2 VERS 5.5.1\n1 CHAR UTF-8\n")
+        for i in range(1, individuals + 1):
+            out.write(f"0 @I{i}@ INDI\n")
+            out.write(f"1 NAME {rng.choice(FIRST_NAMES)} /{rng.choice(LAST_NAMES)}/\n")
+            out.write(f"1 SEX {'M' if i % 2 else 'F'}\n")
+            out.write(f"1 BIRT\n2 DATE {rng.randint(1, 28)} {rng.choice(MONTHS)} {rng.randint(1850, 2020)}\n")
+            if i % 5 == 0:
+                out.write(f"1 DEAT\n2 DATE {rng.randint(1900, 2024)}\n")
+            if i % 7 == 0:
+                out.write("1 NOTE Une note assez longue pour exercer les lignes CONT\n2 CONT et leur concaténation.\n")
+        for f in range(1, families + 1):
+            husband, wife, child = 3 * f - 2, 3 * f - 1, 3 * f
+            out.write(f"0 @F{f}@ FAM\n1 HUSB @I{husband}@\n1 WIFE @I{wife}@\n1 CHIL @I{child}@\n")
+        out.write("0 TRLR\n")
+    return {"individuals": individuals, "families": families}
+
+
+def parse_file(path: str) -> dict:
+    progress = {"bytes_read": 0}
+    records = server.iter_gedcom_records(server.iter_gedcom_file(path, progress))
+    count = 0
+    while True:
+        parsed = server.read_gedcom_records(records, server.GEDCOM_IMPORT_BATCH_SIZE)
+        if not parsed:
+            break
+        count += len(parsed)
+    return {"records": count, "bytes": progress["bytes_read"]}
+
+
+def bench_parse(path: str) -> dict:
+    """Time one pass untraced (tracemalloc slows parsing down), then measure peak memory on a second"""
+    started = time.perf_counter()
+    result = parse_file(path)
+    result["seconds"] = time.perf_counter() - started
+    tracemalloc.start()
+    parse_file(path)
+    _, result["peak_bytes"] = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result
+
+
+async def import_file(path: str, measure: bool = False) -> dict:
+    """Run run_gedcom_import under a throwaway owner, then delete what it wrote; returns the import document"""
+    owner_id = f"bench-{uuid.uuid4()}"
+    import_id = str(uuid.uuid4())
+    await server.db.gedcom_imports.insert_one({"id": import_id, "owner_id": owner_id, "status": "queued"})
+    if measure:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        await server.run_gedcom_import(import_id, owner_id, path)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if measure else None
+        result = await server.db.gedcom_imports.find_one({"id": import_id}, {"_id": 0})
+        result["stored_persons"] = await server.db.persons.count_documents({"owner_id": owner_id})
+    finally:
+        if measure:
+            tracemalloc.stop()
+        await server.db.persons.delete_many({"owner_id": owner_id})
+        await server.db.links.delete_many({"owner_id": owner_id})
+        await server.db.gedcom_imports.delete_one({"id": import_id})
+        await server.forget_tree_changes(owner_id)
+    return {**result, "seconds": elapsed, "peak_bytes": peak}
+
+
+async def check_malformed(path: str) -> list:
+    """Import records that used to crash or duplicate persons; returns the failed expectations"""
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write("0 HEAD\n0 INDI\n1 NAME Sans /Xref/\n0 @I1@ INDI\n1 NAME Jean /Dupont/\n"
+                  "0 @I1@ INDI\n1 NAME Jean /Doublon/\n0 @I2@ INDI\n1 NAME Marie /Dupont/\n"
+                  "0 @F1@ FAM\n1 HUSB @I1@\n1 WIFE @I2@\n0 TRLR\n")
+    result = await import_file(path)
+    expectations = {
+        "status": (result.get("status"), "completed"),
+        "persons": (result.get("persons"), 2),
+        "stored persons": (result["stored_persons"], 2),
+        "skipped_records": (result.get("skipped_records"), 2),
+        "links": (result.get("links"), 1),
+    }
+    return [f"{name}: got {got}, expected {want}" for name, (got, want) in expectations.items() if got != want]
+
+
+async def bench_import(path: str) -> dict:
+    result = await import_file(path, measure=True)
+    return {"records": result.get("records"), "bytes": result.get("bytes_read"), "seconds": result["seconds"],
+            "peak_bytes": result["peak_bytes"], "persons": result.get("persons"), "links": result.get("links"),
+            "status": result.get("status")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--import", dest="full_import", action="store_true",
+                        help="run the full import against MONGO_URL/DB_NAME")
+    parser.add_argument("--check", action="store_true",
+                        help="import malformed records against MONGO_URL/DB_NAME and verify they are skipped")
+    args = parser.parse_args()
+
+    if args.check:
+        with tempfile.TemporaryDirectory() as tmp:
+            failures = asyncio.run(check_malformed(os.path.join(tmp, "malformed.ged")))
+        print("\n".join(failures) or "Malformed records skipped as expected")
+        sys.exit(1 if failures else 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.ged")
+        shape = write_gedcom(path, args.records)
+        print(f"Generated {shape['individuals']} individuals, {shape['families']} families "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+        result = asyncio.run(bench_import(path)) if args.full_import else bench_parse(path)
+
+    print(f"{result['records']} records in {result['seconds']:.2f}s "
+          f"({result['records'] / result['seconds']:,.0f} records/s, "
+          f"{result['bytes'] / 1e6 / result['seconds']:.1f} MB/s)")
+    print(f"Peak traced memory: {result['peak_bytes'] / 1e6:.1f} MB")
+    if args.full_import:
+        print(f"Import {result['status']}: {result['persons']} persons, {result['links']} links")
+
+
+if __name__ == "__main__":
+    main()
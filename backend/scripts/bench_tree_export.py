@@ -0,0 +1,218 @@
+"""Large-tree benchmark: dict path vs CompactTree, and the streamed JSON export
+
+Usage (from backend/):
+    python scripts/bench_tree_export.py                   # 50k persons, analyses only
+    python scripts/bench_tree_export.py --persons 200000 --merge-persons 10000
+    python scripts/bench_tree_export.py --export          # JSON export against MONGO_URL/DB_NAME
+
+The analyses run in process on a generated tree, without a database:
+- The parentless-person analysis is run on the list of person dicts with a
+  FamilyGraph of UUID strings, and on a CompactTree.
+- Merge duplicate detection is run as the pairwise scan and as the hash join.
+Retained memory is what tracemalloc still sees once each structure is built:
+all person documents plus the graph for the dict path, the tree alone for
+CompactTree (which is fed from a stream, as load_compact_tree is).
+
+--export writes the tree under a throwaway owner id. It then times the
+JSON export both ways: fully loaded with to_list(None) then json.dumps,
+and consumed from stream_tree_json. Both tracemalloc peaks are reported,
+and the documents are deleted afterwards.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import server  # noqa: E402
+
+FIRST_NAMES = ["Jean", "Marie", "Pierre", "Sophie", "Lucas", "Emma", "Louis", "Alice", "Paul", "Jeanne"]
+LAST_NAMES = ["Dupont", "Martin", "Bernard", "Durand", "Lefebvre", "Moreau", "Laurent", "Simon"]
+
+
+def person_id(i: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"bench-person-{i}"))
+
+
+def iter_persons(count: int, owner_id: str = "bench", seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "id": person_id(i),
+            "owner_id": owner_id,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "gender": "male" if i % 2 else "female",
+            "birth_date": f"{rng.randint(1850, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "death_date": f"{rng.randint(1900, 2024)}" if i % 5 == 0 else None,
+            "photo_url": f"https://example.invalid/{i}.jpg" if i % 3 == 0 else None,
+            "notes": "Une note de quelques mots" if i % 7 == 0 else None,
+            "created_at": "2025-01-01T00:00:00+00:00",
+        }
+
+
+def iter_links(count: int, owner_id: str = "bench", seed: int = 7):
+    """Couples of consecutive persons; each later person is the child of an earlier couple"""
+    rng = random.Random(seed)
+    link = 0
+    for i in range(0, count - 1, 2):
+        yield {"id": f"bench-link-{link}", "owner_id": owner_id, "link_type": "spouse",
+               "person_id_1": person_id(i), "person_id_2": person_id(i + 1)}
+        link += 1
+    for child in range(2, count):
+        if rng.random() < 0.5:
+            continue
+        father = rng.randrange(0, min(child, count - 1) - 1, 2) if child > 2 else 0
+        for parent in (father, father + 1):
+            yield {"id": f"bench-link-{link}", "owner_id": owner_id, "link_type": "parent",
+                   "person_id_1": person_id(parent), "person_id_2": person_id(child)}
+            link += 1
+
+
+def parentless_dict(persons: list, graph) -> int:
+    return sum(1 for person in persons if not graph.relatives(person.get('id'))['parents'])
+
+
+def parentless_compact(tree) -> int:
+    return int((tree.parent_counts() == 0).sum())
+
+
+def retained_bytes(build) -> int:
+    """Memory still allocated once build() returned (its result is kept alive meanwhile)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def timed(fn) -> tuple:
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def bench_analysis(count: int) -> dict:
+    persons, links = list(iter_persons(count)), list(iter_links(count))
+    dict_result, dict_ms = timed(lambda: parentless_dict(persons, server.FamilyGraph.from_links(links)))
+    compact_result, compact_ms = timed(lambda: parentless_compact(server.CompactTree.build(persons, links)))
+    assert dict_result == compact_result, (dict_result, compact_result)
+    return {
+        "persons": count,
+        "links": len(links),
+        "parentless": compact_result,
+        "dict_ms": dict_ms,
+        "compact_ms": compact_ms,
+        "dict_bytes": retained_bytes(lambda: (list(iter_persons(count)), server.FamilyGraph.from_links(iter_links(count)))),
+        "compact_bytes": retained_bytes(lambda: server.CompactTree.build(iter_persons(count), iter_links(count))),
+    }
+
+
+def bench_merge(count: int) -> dict:
+    mine = server.CompactTree.build(iter_persons(count, seed=1), [])
+    source = server.CompactTree.build(iter_persons(count, seed=2), [])
+
+    def key(record):
+        return ((record.first_name or '').lower(), (record.last_name or '').lower())
+
+    def pairwise():
+        return sum(1 for s in source.records for m in mine.records if key(s) == key(m))
+
+    def hash_join():
+        by_name = {}
+        for record in mine.records:
+            by_name.setdefault(key(record), []).append(record.id)
+        return sum(len(by_name.get(key(record), ())) for record in source.records)
+
+    pairwise_matches, pairwise_ms = timed(pairwise)
+    join_matches, join_ms = timed(hash_join)
+    assert pairwise_matches == join_matches, (pairwise_matches, join_matches)
+    return {"persons": count, "matches": join_matches, "pairwise_ms": pairwise_ms, "join_ms": join_ms}
+
+
+async def measure_export(export) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = await export()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+async def bench_export(count: int) -> dict:
+    owner = {"id": f"bench-{uuid.uuid4()}", "email": "bench@example.invalid", "first_name": "Bench", "last_name": "Tree"}
+    for collection, docs in ((server.db.persons, iter_persons(count, owner['id'])),
+                             (server.db.links, iter_links(count, owner['id']))):
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= 1000:
+                await collection.insert_many(batch)
+                batch = []
+        if batch:
+            await collection.insert_many(batch)
+
+    async def loaded():
+        persons = await server.db.persons.find({"owner_id": owner['id']}, {"_id": 0}).to_list(None)
+        links = await server.db.links.find({"owner_id": owner['id']}, {"_id": 0}).to_list(None)
+        body = json.dumps({"persons": persons, "links": links,
+                           "stats": {"total_persons": len(persons), "total_links": len(links)}},
+                          default=server._json_default, ensure_ascii=False, separators=(",", ":"))
+        return len(body.encode('utf-8'))
+
+    async def streamed():
+        size = 0
+        async for chunk in server.stream_tree_json(owner):
+            size += len(chunk)
+        return size
+
+    try:
+        loaded_size, loaded_ms, loaded_peak = await measure_export(loaded)
+        streamed_size, streamed_ms, streamed_peak = await measure_export(streamed)
+    finally:
+        await server.db.persons.delete_many({"owner_id": owner['id']})
+        await server.db.links.delete_many({"owner_id": owner['id']})
+    return {"persons": count, "loaded_ms": loaded_ms, "loaded_peak": loaded_peak, "loaded_size": loaded_size,
+            "streamed_ms": streamed_ms, "streamed_peak": streamed_peak, "streamed_size": streamed_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, default=50_000)
+    parser.add_argument("--merge-persons", type=int, default=5_000, help="persons on each side of the merge")
+    parser.add_argument("--export", action="store_true", help="benchmark the JSON export against MONGO_URL/DB_NAME")
+    args = parser.parse_args()
+
+    if args.export:
+        result = asyncio.run(bench_export(args.persons))
+        print(f"JSON export of {result['persons']} persons")
+        print(f"  to_list + json.dumps: {result['loaded_ms']:8.0f} ms, peak {result['loaded_peak'] / 1e6:6.1f} MB, "
+              f"{result['loaded_size'] / 1e6:.1f} MB body")
+        print(f"  stream_tree_json:     {result['streamed_ms']:8.0f} ms, peak {result['streamed_peak'] / 1e6:6.1f} MB, "
+              f"{result['streamed_size'] / 1e6:.1f} MB body")
+        return
+
+    result = bench_analysis(args.persons)
+    print(f"Parentless analysis, {result['persons']} persons / {result['links']} links "
+          f"({result['parentless']} parentless)")
+    print(f"  dict path:   {result['dict_ms']:8.0f} ms, {result['dict_bytes'] / 1e6:6.1f} MB retained")
+    print(f"  CompactTree: {result['compact_ms']:8.0f} ms, {result['compact_bytes'] / 1e6:6.1f} MB retained")
+    result = bench_merge(args.merge_persons)
+    print(f"Merge duplicates, {result['persons']} x {result['persons']} persons ({result['matches']} matches)")
+    print(f"  pairwise scan: {result['pairwise_ms']:8.0f} ms")
+    print(f"  hash join:     {result['join_ms']:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
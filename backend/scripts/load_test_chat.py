@@ -0,0 +1,156 @@
+"""Chat WebSocket load test: hundreds of sockets in one room, some of them stuck
+
+Usage (from backend/):
+    python scripts/load_test_chat.py                      # 300 sockets, 5 stuck, 500 messages
+    python scripts/load_test_chat.py --sockets 1000 --stuck 20 --messages 2000
+
+Every socket runs the real chat_socket endpoint through the ASGI app, in
+process, against MONGO_URL/DB_NAME and the configured CHAT_BROKER. Senders
+post messages over their sockets; every healthy socket must receive all of
+them, while stuck sockets (whose sends never complete) must be closed with
+1013 once their queue is full instead of slowing the room down. A
+throwaway user owns the room; its messages are deleted afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import server  # noqa: E402
+
+
+class AsgiSocket:
+    """A WebSocket client speaking ASGI messages straight to the app"""
+
+    def __init__(self, owner_id: str, token: str, stuck: bool = False):
+        self.scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": f"/api/chat/ws/{owner_id}", "raw_path": f"/api/chat/ws/{owner_id}".encode(),
+            "query_string": f"token={token}".encode(), "headers": [], "subprotocols": [],
+            "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+        }
+        self.stuck = stuck
+        self.inbox = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.close_code = None
+        self.received = {}
+        self.task = None
+
+    async def receive(self) -> dict:
+        return await self.inbox.get()
+
+    async def send(self, message: dict):
+        if message["type"] == "websocket.accept":
+            self.accepted.set()
+        elif message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            self.closed.set()
+        elif message["type"] == "websocket.send":
+            if self.stuck:
+                await asyncio.Event().wait()  # a client that stopped reading
+            event = json.loads(message["text"])
+            if event.get("type") == "message":
+                seq, sent_at = event["message"]["message"].split()[1:]
+                self.received[int(seq)] = time.perf_counter() - float(sent_at)
+
+    def connect(self):
+        self.inbox.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.create_task(server.app(self.scope, self.receive, self.send))
+
+    def send_text(self, data: dict):
+        self.inbox.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def disconnect(self):
+        self.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+def percentile(values: list, fraction: float) -> float:
+    return sorted(values)[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+async def run(args) -> dict:
+    owner_id = f"loadtest-{uuid.uuid4()}"
+    email = f"{owner_id}@loadtest.invalid"
+    await server.db.users.insert_one({"id": owner_id, "email": email, "first_name": "Load", "last_name": "Test"})
+    token = server.create_access_token(owner_id, email)
+    server.CHAT_SOCKET_QUEUE_SIZE = args.queue_size
+    server.chat_broker.start()
+    sockets = [AsgiSocket(owner_id, token, stuck=i < args.stuck) for i in range(args.sockets)]
+    try:
+        started = time.perf_counter()
+        for socket in sockets:
+            socket.connect()
+        await asyncio.wait_for(asyncio.gather(*(socket.accepted.wait() for socket in sockets)), args.timeout)
+        connect_seconds = time.perf_counter() - started
+
+        healthy = sockets[args.stuck:]
+        senders = healthy[:args.senders]
+        started = time.perf_counter()
+        for seq in range(args.messages):
+            senders[seq % len(senders)].send_text({"type": "message", "message": f"load {seq} {time.perf_counter()}"})
+            if seq % len(senders) == len(senders) - 1:
+                await asyncio.sleep(0)
+
+        deadline = time.perf_counter() + args.timeout
+        while time.perf_counter() < deadline:
+            if all(len(socket.received) == args.messages for socket in healthy):
+                break
+            await asyncio.sleep(0.05)
+        send_seconds = time.perf_counter() - started
+        if args.stuck:
+            await asyncio.wait([asyncio.create_task(socket.closed.wait()) for socket in sockets[:args.stuck]], timeout=2)
+
+        latencies = [latency for socket in healthy for latency in socket.received.values()]
+        return {
+            "connect_seconds": connect_seconds,
+            "send_seconds": send_seconds,
+            "deliveries": len(latencies),
+            "expected": args.messages * len(healthy),
+            "incomplete_sockets": sum(1 for socket in healthy if len(socket.received) < args.messages),
+            "healthy_closed": sum(1 for socket in healthy if socket.closed.is_set()),
+            "stuck_closed_1013": sum(1 for socket in sockets[:args.stuck] if socket.close_code == 1013),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": max(latencies, default=0) * 1000,
+        }
+    finally:
+        await asyncio.gather(*(socket.disconnect() for socket in sockets if socket.task))
+        await server.chat_broker.stop()
+        await server.db.chat_messages.delete_many({"tree_owner_id": owner_id})
+        await server.db.chat_buckets.delete_many({"tree_owner_id": owner_id})
+        await server.db.users.delete_one({"id": owner_id})
+        server.invalidate_cached_user(owner_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=300)
+    parser.add_argument("--stuck", type=int, default=5, help="sockets that stop reading")
+    parser.add_argument("--senders", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--queue-size", type=int, default=server.CHAT_SOCKET_QUEUE_SIZE,
+                        help="events buffered per socket (CHAT_SOCKET_QUEUE_SIZE)")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    if args.stuck >= args.sockets or args.senders < 1:
+        parser.error("need at least one healthy sender socket")
+    args.senders = min(args.senders, args.sockets - args.stuck)
+
+    result = asyncio.run(run(args))
+    print(f"{args.sockets} sockets ({args.stuck} stuck) connected in {result['connect_seconds']:.2f}s "
+          f"[{type(server.chat_broker).__name__}, storage={server.CHAT_STORAGE}]")
+    print(f"{args.messages} messages -> {result['deliveries']}/{result['expected']} deliveries in "
+          f"{result['send_seconds']:.2f}s ({result['deliveries'] / max(result['send_seconds'], 1e-6):,.0f}/s)")
+    print(f"Latency p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, max {result['max_ms']:.1f} ms")
+    print(f"Healthy sockets missing messages: {result['incomplete_sockets']}, closed: {result['healthy_closed']}; "
+          f"stuck sockets closed with 1013: {result['stuck_closed_1013']}/{args.stuck}")
+
+
+if __name__ == "__main__":
+    main()
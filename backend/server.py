@@ -1,17 +1,35 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response, UploadFile, File, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import IndexModel, ReturnDocument, UpdateOne, UpdateMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from gridfs.errors import NoFile
+from bson import ObjectId
 import os
+import re
+import hashlib
+import json
 import logging
+import socket
+import tempfile
+import zipfile
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional, Any
 import uuid
-from datetime import datetime, timezone, timedelta
+import time
+import asyncio
+import calendar
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timezone, timedelta
 import bcrypt
 import jwt
+import numpy as np
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 
@@ -29,6 +47,116 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'aila-secret-key-change-in-production-
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24 * 7  # 7 days
 
+# Authenticated-principal cache (per process). Entries are invalidated by the
+# endpoints that modify users; the TTL bounds staleness across workers.
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000'))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+
+# Password hashing: bcrypt runs on a dedicated thread pool so it never blocks
+# the event loop. BCRYPT_TARGET_MS, when set, calibrates the work factor at
+# startup unless it was already calibrated for that target. The calibrated
+# cost is stored in the settings collection and shared by every worker (each
+# re-reads it at most every PASSWORD_HASH_SETTINGS_TTL_SECONDS); hashes with
+# a lower cost are upgraded transparently on login.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+BCRYPT_MIN_ROUNDS = int(os.environ.get('BCRYPT_MIN_ROUNDS', '10'))
+BCRYPT_MAX_ROUNDS = int(os.environ.get('BCRYPT_MAX_ROUNDS', '15'))
+BCRYPT_TARGET_MS = float(os.environ.get('BCRYPT_TARGET_MS', '0'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '32'))
+PASSWORD_HASH_SETTINGS_TTL_SECONDS = float(os.environ.get('PASSWORD_HASH_SETTINGS_TTL_SECONDS', '60'))
+PASSWORD_HASH_SETTINGS_ID = "password_hashing"
+
+# Bulk person/link creation: maximum items per request
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '1000'))
+
+# Background jobs: concurrent jobs per process, lease held while running (an
+# expired lease means the worker died and the job is resumed from its checkpoint)
+JOB_MAX_CONCURRENCY = int(os.environ.get('JOB_MAX_CONCURRENCY', '2'))
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '60'))
+JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', '500'))
+JOB_WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+# Automatic reminder campaigns: users planned per batch, and the period during
+# which a user gets at most one reminder from a campaign (also the dedup window)
+REMINDER_CAMPAIGN_BATCH_SIZE = int(os.environ.get('REMINDER_CAMPAIGN_BATCH_SIZE', '1000'))
+REMINDER_CAMPAIGN_WINDOW_DAYS = 7
+
+# Scheduled reminder dispatcher: reminders claimed per batch, claim lease, and
+# the longest sleep (bounds the delay for reminders scheduled by other workers)
+REMINDER_DISPATCH_BATCH_SIZE = int(os.environ.get('REMINDER_DISPATCH_BATCH_SIZE', '100'))
+REMINDER_DISPATCH_LEASE_SECONDS = int(os.environ.get('REMINDER_DISPATCH_LEASE_SECONDS', '60'))
+REMINDER_DISPATCH_MAX_SLEEP_SECONDS = float(os.environ.get('REMINDER_DISPATCH_MAX_SLEEP_SECONDS', '60'))
+
+# Notification push (SSE): events buffered per open stream before the oldest
+# are dropped, and the keep-alive interval that stops proxies closing idle streams
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_STREAM_QUEUE_SIZE', '100'))
+NOTIFICATION_STREAM_KEEPALIVE_SECONDS = float(os.environ.get('NOTIFICATION_STREAM_KEEPALIVE_SECONDS', '25'))
+# UTC hour of the daily job that recounts unread counters that drifted from the notifications
+NOTIFICATION_RECOUNT_HOUR = int(os.environ.get('NOTIFICATION_RECOUNT_HOUR', '4'))
+
+# Family chat WebSockets: broker ('memory' for a single process, 'mongo' to fan
+# out across workers via a change stream on chat_events, which needs a replica
+# set), events buffered per socket before a slow client is disconnected, how
+# long chat_events are kept, and how often an open socket's access is rechecked
+CHAT_BROKER = os.environ.get('CHAT_BROKER', 'memory')
+CHAT_SOCKET_QUEUE_SIZE = int(os.environ.get('CHAT_SOCKET_QUEUE_SIZE', '256'))
+CHAT_EVENT_TTL_SECONDS = int(os.environ.get('CHAT_EVENT_TTL_SECONDS', '3600'))
+CHAT_ACCESS_RECHECK_SECONDS = float(os.environ.get('CHAT_ACCESS_RECHECK_SECONDS', '60'))
+
+# Chat history: 'messages' (one document per message) or 'buckets' (one
+# document per tree and day, split past CHAT_BUCKET_MAX_MESSAGES; messages
+# are still written to chat_messages so the switch can be rolled back), and
+# the largest page of history returned at once
+CHAT_STORAGE = os.environ.get('CHAT_STORAGE', 'messages')
+CHAT_BUCKET_MAX_MESSAGES = int(os.environ.get('CHAT_BUCKET_MAX_MESSAGES', '500'))
+CHAT_PAGE_MAX_LIMIT = 200
+
+# Daily birthday digest: UTC hour after which the day's digest job is submitted
+BIRTHDAY_DIGEST_HOUR = int(os.environ.get('BIRTHDAY_DIGEST_HOUR', '6'))
+DAILY_JOB_CHECK_SECONDS = 300
+DAILY_JOB_MAX_ATTEMPTS = 3
+
+# 'aila' -> 'aila_db' copy: documents per bulk_write and bulk_writes in flight per collection
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '1000'))
+MIGRATION_PARALLELISM = int(os.environ.get('MIGRATION_PARALLELISM', '4'))
+
+# GEDCOM import: uploads are spooled to disk, then parsed line by line
+GEDCOM_IMPORT_DIR = os.environ.get('GEDCOM_IMPORT_DIR', tempfile.gettempdir())
+GEDCOM_IMPORT_MAX_BYTES = int(os.environ.get('GEDCOM_IMPORT_MAX_BYTES', str(200 * 1024 * 1024)))
+GEDCOM_IMPORT_BATCH_SIZE = int(os.environ.get('GEDCOM_IMPORT_BATCH_SIZE', '1000'))
+
+# GDPR export archives: built in a scratch file by a background job, then stored in
+# GridFS so that every worker can serve the download; kept for a limited time
+GDPR_EXPORT_DIR = os.environ.get('GDPR_EXPORT_DIR', tempfile.gettempdir())
+GDPR_EXPORT_BUCKET = os.environ.get('GDPR_EXPORT_BUCKET', 'gdpr_exports')
+GDPR_EXPORT_TTL_HOURS = int(os.environ.get('GDPR_EXPORT_TTL_HOURS', '48'))
+GDPR_EXPORT_CHUNK_SIZE = 256 * 1024
+# UTC hour of the daily job that deletes expired archives
+GDPR_EXPORT_SWEEP_HOUR = int(os.environ.get('GDPR_EXPORT_SWEEP_HOUR', '3'))
+
+# Tree retrieval: keyset page size cap and Motor batch size for NDJSON streams
+TREE_PAGE_MAX_LIMIT = 1000
+TREE_STREAM_BATCH_SIZE = int(os.environ.get('TREE_STREAM_BATCH_SIZE', '500'))
+
+# Materialized tree cache: pre-serialized GET /api/tree payloads per owner
+TREE_CACHE_MAX_ENTRIES = int(os.environ.get('TREE_CACHE_MAX_ENTRIES', '1000'))
+TREE_CACHE_MAX_BYTES = int(os.environ.get('TREE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Genealogy graphs kept in memory (one per owner, rebuilt on revision change)
+GRAPH_CACHE_MAX_ENTRIES = int(os.environ.get('GRAPH_CACHE_MAX_ENTRIES', '256'))
+
+# Calendar months kept in memory (one entry per owner, dropped on any change
+# to the owner's events or tree), the longest range served at once, and the
+# page size cap of GET /api/events
+CALENDAR_CACHE_MAX_ENTRIES = int(os.environ.get('CALENDAR_CACHE_MAX_ENTRIES', '1000'))
+CALENDAR_MAX_DAYS = 366
+EVENTS_PAGE_MAX_LIMIT = 500
+
+# Tree change log: entries kept per owner before older ones are compacted away
+TREE_CHANGELOG_RETENTION = int(os.environ.get('TREE_CHANGELOG_RETENTION', '5000'))
+TREE_CHANGELOG_COMPACT_EVERY = 100
+
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = '548263066328-916g23gmboqvmqtd7fi3ejatoseh4h09.apps.googleusercontent.com'
 
@@ -151,6 +279,19 @@ class LinkCreate(BaseModel):
     person_id_2: str
     link_type: str
 
+class PersonBulkItem(PersonCreate):
+    client_id: Optional[str] = None  # temporary id, referenceable by links of the same batch
+
+class LinkBulkItem(LinkCreate):
+    client_id: Optional[str] = None
+
+class PersonsBulkCreate(BaseModel):
+    persons: List[PersonBulkItem]
+    links: List[LinkBulkItem] = []
+
+class LinksBulkCreate(BaseModel):
+    links: List[LinkBulkItem]
+
 class StatusCheck(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -165,15 +306,120 @@ class StatusCheckCreate(BaseModel):
 # HELPER FUNCTIONS
 # ============================================================================
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """Hash a password using bcrypt (blocking, use password_hasher in handlers)"""
+    salt = bcrypt.gensalt(rounds=rounds)
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against its hash (blocking, use password_hasher in handlers)"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+class PasswordHasher:
+    """Runs bcrypt on a size-limited thread pool with a queue-depth limit and latency metrics"""
+
+    def __init__(self, rounds: int, workers: int, max_queue: int):
+        self.rounds = rounds
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.workers = workers
+        self.in_flight = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.latencies = {"hash": deque(maxlen=1000), "verify": deque(maxlen=1000)}
+        self.loaded_at = None
+
+    async def _run(self, op: str, fn, *args):
+        if self.in_flight >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            # Includes queueing time: this is what the login request actually waits
+            self.latencies[op].append((time.perf_counter() - start) * 1000)
+
+    async def hash(self, password: str) -> str:
+        await self.refresh()
+        return await self._run("hash", hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run("verify", verify_password, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if the hash was produced with a lower work factor"""
+        try:
+            return int(hashed.split('$')[2]) < self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    async def refresh(self, force: bool = False):
+        """Adopt the work factor stored in the settings collection, re-read at most every TTL"""
+        now = time.monotonic()
+        if not force and self.loaded_at is not None and now - self.loaded_at < PASSWORD_HASH_SETTINGS_TTL_SECONDS:
+            return
+        self.loaded_at = now
+        stored = await db.settings.find_one({"_id": PASSWORD_HASH_SETTINGS_ID}, {"rounds": 1})
+        if stored and stored.get('rounds'):
+            self.rounds = int(stored['rounds'])
+
+    async def calibrate(self, target_ms: float) -> int:
+        """Pick the highest cost whose hash time stays under target_ms and store it for every worker"""
+        loop = asyncio.get_running_loop()
+        probe_rounds = BCRYPT_MIN_ROUNDS
+        samples = []
+        for _ in range(3):
+            start = time.perf_counter()
+            await loop.run_in_executor(self.executor, hash_password, "calibration", probe_rounds)
+            samples.append((time.perf_counter() - start) * 1000)
+        probe_ms = sorted(samples)[1]
+
+        # Each extra round doubles the bcrypt cost
+        rounds = probe_rounds
+        while rounds < BCRYPT_MAX_ROUNDS and probe_ms * 2 ** (rounds + 1 - probe_rounds) <= target_ms:
+            rounds += 1
+        await db.settings.update_one(
+            {"_id": PASSWORD_HASH_SETTINGS_ID},
+            {"$set": {"rounds": rounds, "target_ms": target_ms, "calibrated_on": socket.gethostname(),
+                      "calibrated_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+        self.rounds = rounds
+        self.loaded_at = time.monotonic()
+        logger.info(f"bcrypt calibrated: {rounds} rounds (~{probe_ms * 2 ** (rounds - probe_rounds):.0f} ms, target {target_ms:.0f} ms)")
+        return rounds
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "latency_ms": {
+                op: {
+                    "count": len(values),
+                    "p50": _percentile(values, 50),
+                    "p95": _percentile(values, 95),
+                    "p99": _percentile(values, 99),
+                }
+                for op, values in self.latencies.items()
+            },
+        }
+
+password_hasher = PasswordHasher(BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
 def create_access_token(user_id: str, email: str) -> str:
     """Create a JWT access token"""
     payload = {
@@ -184,6 +430,178 @@ def create_access_token(user_id: str, email: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+class LRUCache:
+    """Bounded in-process LRU cache with per-entry TTL and hit/miss counters
+
+    When max_bytes is set, sizeof(value) is used to keep the resident size
+    under that budget as well.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _size(self, value) -> int:
+        return self.sizeof(value) if self.sizeof else 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= self._size(entry[0])
+        return entry
+
+    def set(self, key, value):
+        self._remove(key)
+        size = self._size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Would evict everything else and still not fit
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (value, expires_at)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if self._remove(key) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "bytes_resident": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+user_cache = LRUCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+# email -> user id, so lookups by email share the principal cache entries
+user_email_cache = LRUCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+
+async def get_cached_user(user_id: str) -> Optional[dict]:
+    """Get a user document (without password hash) by id, through the principal cache"""
+    if not user_id:
+        return None
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if not user:
+            return None
+        user_cache.set(user_id, user)
+    # Callers get their own copy so they can't corrupt the cached document
+    return dict(user)
+
+async def get_cached_user_by_email(email: str) -> Optional[dict]:
+    """Get a user document (without password hash) by email, through the principal cache"""
+    if not email:
+        return None
+    user_id = user_email_cache.get(email)
+    if user_id is not None:
+        user = await get_cached_user(user_id)
+        # The address may have moved to another account since it was cached
+        if user and user.get('email') == email:
+            return user
+        user_email_cache.invalidate(email)
+    user = await db.users.find_one({"email": email}, {"_id": 0, "password_hash": 0})
+    if not user:
+        return None
+    if user.get('id'):
+        user_cache.set(user['id'], user)
+        user_email_cache.set(email, user['id'])
+    return dict(user)
+
+def invalidate_cached_user(user_id: Optional[str]):
+    """Drop a user from the principal cache after it has been modified"""
+    if user_id:
+        user_cache.invalidate(user_id)
+
+def _json_default(value):
+    """json.dumps fallback matching FastAPI's encoding of Mongo documents"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+async def insert_many_unordered(collection, docs: List[dict]) -> dict:
+    """insert_many(ordered=False); returns {position: error message} for the documents that failed"""
+    if not docs:
+        return {}
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {err['index']: err.get('errmsg', 'write error') for err in e.details.get('writeErrors', [])}
+    finally:
+        for doc in docs:
+            doc.pop('_id', None)
+    return {}
+
+async def paginate_owner_collection(collection, owner_id: str, cursor: Optional[str], limit: int) -> dict:
+    """Keyset pagination on (owner_id, _id): returns items and the cursor of the next page
+
+    _id is always present and unique, unlike the id field of legacy documents.
+    """
+    limit = max(1, min(limit, TREE_PAGE_MAX_LIMIT))
+    query = {"owner_id": owner_id}
+    if cursor:
+        if not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid cursor, pass back next_cursor as is")
+        query["_id"] = {"$gt": ObjectId(cursor)}
+    items = await collection.find(query).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = str(items[-1]['_id'])
+    for item in items:
+        item.pop('_id')
+    return {"items": items, "next_cursor": next_cursor}
+
+async def stream_tree_ndjson(owner_id: str):
+    """Yield a tree as NDJSON lines (persons, then links) straight from the Motor cursors"""
+    counts = {}
+    for kind, collection in (("person", db.persons), ("link", db.links)):
+        count = 0
+        cursor = collection.find({"owner_id": owner_id}, {"_id": 0}).batch_size(TREE_STREAM_BATCH_SIZE)
+        async for doc in cursor:
+            count += 1
+            yield (json.dumps({"type": kind, "data": doc}, default=_json_default, ensure_ascii=False) + "\n").encode('utf-8')
+        counts[kind] = count
+    yield (json.dumps({"type": "end", "persons": counts["person"], "links": counts["link"]}) + "\n").encode('utf-8')
+
 def decode_token(token: str) -> dict:
     """Decode and verify a JWT token"""
     try:
@@ -202,7 +620,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     token = credentials.credentials
     payload = decode_token(token)
     
-    user = await db.users.find_one({"id": payload['sub']}, {"_id": 0, "password_hash": 0})
+    user = await get_cached_user(payload['sub'])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -216,11 +634,470 @@ async def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(
     try:
         token = credentials.credentials
         payload = decode_token(token)
-        user = await db.users.find_one({"id": payload['sub']}, {"_id": 0, "password_hash": 0})
+        user = await get_cached_user(payload['sub'])
         return user
     except:
         return None
 
+# ============================================================================
+# DATABASE INDEXES
+# ============================================================================
+
+# Declarative index registry: collection -> list of (keys, options).
+# Every hot query filter must be backed by one of these. Indexes are created
+# on startup (see ensure_indexes) and checked by GET /api/admin/indexes.
+INDEX_REGISTRY = {
+    "users": [
+        ([("email", 1)], {"name": "email_unique", "unique": True}),
+        ([("id", 1)], {"name": "id_unique", "unique": True, "partialFilterExpression": {"id": {"$type": "string"}}}),
+        ([("created_at", -1)], {"name": "created_at"}),
+    ],
+    "persons": [
+        ([("owner_id", 1), ("id", 1)], {"name": "owner_id_id"}),
+        ([("owner_id", 1), ("_id", 1)], {"name": "owner_id__id"}),
+        ([("id", 1)], {"name": "id"}),
+        ([("owner_id", 1), ("created_at", -1)], {"name": "owner_id_created_at"}),
+        ([("owner_id", 1), ("birth_mmdd", 1)], {"name": "owner_id_birth_mmdd"}),
+        ([("owner_id", 1), ("death_mmdd", 1)], {"name": "owner_id_death_mmdd"}),
+    ],
+    "links": [
+        ([("owner_id", 1), ("person_id_1", 1)], {"name": "owner_id_person_id_1"}),
+        ([("owner_id", 1), ("person_id_2", 1)], {"name": "owner_id_person_id_2"}),
+        ([("owner_id", 1), ("_id", 1)], {"name": "owner_id__id"}),
+        ([("id", 1)], {"name": "id"}),
+    ],
+    "events": [
+        ([("owner_id", 1), ("event_day", 1), ("_id", 1)], {"name": "owner_id_event_day__id"}),
+        ([("id", 1)], {"name": "id"}),
+    ],
+    "notifications": [
+        ([("user_id", 1), ("created_at", -1)], {"name": "user_id_created_at"}),
+        ([("user_id", 1), ("read", 1)], {"name": "user_id_read"}),
+        ([("id", 1)], {"name": "id"}),
+        # One daily digest per user and day, whichever worker or run writes it first
+        ([("user_id", 1), ("type", 1), ("day", 1)], {
+            "name": "user_id_type_day_unique",
+            "unique": True,
+            "partialFilterExpression": {"day": {"$exists": True}}
+        }),
+    ],
+    "notification_counters": [
+        ([("user_id", 1)], {"name": "user_id", "unique": True}),
+    ],
+    "preview_sessions": [
+        ([("token", 1)], {"name": "token_unique", "unique": True}),
+    ],
+    "preview_persons": [
+        ([("session_token", 1), ("id", 1)], {"name": "session_token_id"}),
+    ],
+    "preview_links": [
+        ([("session_token", 1), ("id", 1)], {"name": "session_token_id"}),
+    ],
+    "collaborators": [
+        ([("owner_id", 1), ("email", 1)], {"name": "owner_id_email"}),
+        ([("email", 1), ("status", 1)], {"name": "email_status"}),
+        ([("id", 1)], {"name": "id"}),
+    ],
+    "contributions": [
+        ([("tree_owner_id", 1), ("status", 1)], {"name": "tree_owner_id_status"}),
+        ([("contributor_id", 1)], {"name": "contributor_id"}),
+        ([("id", 1)], {"name": "id"}),
+    ],
+    "chat_messages": [
+        ([("tree_owner_id", 1), ("created_at", -1), ("id", -1)], {"name": "tree_owner_id_created_at_id"}),
+        ([("id", 1)], {"name": "id"}),
+    ],
+    "chat_buckets": [
+        ([("tree_owner_id", 1), ("day", -1)], {"name": "tree_owner_id_day"}),
+        ([("messages.id", 1)], {"name": "messages_id"}),
+    ],
+    "chat_events": [
+        ([("created_at", 1)], {"name": "created_at_ttl", "expireAfterSeconds": CHAT_EVENT_TTL_SECONDS}),
+    ],
+    "password_resets": [
+        ([("token", 1)], {"name": "token"}),
+    ],
+    "reminders": [
+        ([("created_at", -1)], {"name": "created_at"}),
+        ([("audience", 1), ("created_at", -1)], {"name": "audience_created_at"}),
+    ],
+    "reminder_receipts": [
+        ([("reminder_id", 1), ("user_id", 1)], {"name": "reminder_id_user_id", "unique": True}),
+        ([("user_id", 1)], {"name": "user_id"}),
+    ],
+    "gedcom_imports": [
+        ([("id", 1)], {"name": "id"}),
+    ],
+    "jobs": [
+        ([("id", 1)], {"name": "id", "unique": True}),
+        ([("status", 1), ("lease_expires_at", 1)], {"name": "status_lease_expires_at"}),
+        ([("created_at", -1)], {"name": "created_at"}),
+        # One queued/running job per type and params when submitted with unique (see JobRunner.submit)
+        ([("active_key", 1)], {
+            "name": "active_key_unique",
+            "unique": True,
+            "partialFilterExpression": {"active_key": {"$exists": True}}
+        }),
+        # One scheduled run per job type and day across workers (see DailyJobScheduler)
+        ([("type", 1), ("params.day", 1)], {
+            "name": "type_params_day_scheduler_unique",
+            "unique": True,
+            "partialFilterExpression": {"created_by": "scheduler"}
+        }),
+    ],
+    "export_jobs": [
+        ([("id", 1)], {"name": "id"}),
+        ([("user_id", 1), ("created_at", -1)], {"name": "user_id_created_at"}),
+        ([("status", 1), ("expires_at", 1)], {"name": "status_expires_at"}),
+    ],
+    "tree_revisions": [
+        ([("owner_id", 1)], {"name": "owner_id_unique", "unique": True}),
+    ],
+    "tree_changes": [
+        # Revisions are taken by logging them (see log_tree_revision)
+        ([("owner_id", 1), ("revision", 1)], {"name": "owner_id_revision_unique", "unique": True}),
+    ],
+    "user_reminders": [
+        ([("user_id", 1), ("created_at", -1)], {"name": "user_id_created_at"}),
+        ([("status", 1)], {"name": "status"}),
+        ([("status", 1), ("scheduled_at", 1)], {"name": "status_scheduled_at"}),
+        ([("idempotency_key", 1)], {
+            "name": "idempotency_key",
+            "unique": True,
+            "partialFilterExpression": {"idempotency_key": {"$exists": True}}
+        }),
+    ],
+}
+
+def _index_key(keys) -> tuple:
+    """Normalize an index key spec so declared and existing indexes compare equal"""
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in keys)
+
+async def ensure_indexes() -> dict:
+    """Create every index declared in INDEX_REGISTRY (idempotent)"""
+    report = {}
+    for collection_name, specs in INDEX_REGISTRY.items():
+        created = []
+        for keys, options in specs:
+            # One index at a time so a single failure (e.g. duplicate emails
+            # blocking a unique index) doesn't prevent the others.
+            try:
+                names = await db[collection_name].create_indexes([IndexModel(keys, **options)])
+                created.extend(names)
+            except Exception as e:
+                logger.error(f"Index {collection_name}.{options.get('name')} could not be created: {e}")
+        report[collection_name] = created
+    return report
+
+async def verify_indexes() -> dict:
+    """Compare declared indexes with the live ones and report usage via $indexStats"""
+    report = {}
+    for collection_name, specs in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        existing_by_key = {_index_key(info['key']): name for name, info in existing.items()}
+
+        usage = {}
+        try:
+            async for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat['name']] = {
+                    "ops": int(stat.get('accesses', {}).get('ops', 0)),
+                    "since": stat.get('accesses', {}).get('since'),
+                }
+        except Exception as e:
+            logger.warning(f"$indexStats unavailable for {collection_name}: {e}")
+
+        declared_keys = set()
+        missing = []
+        for keys, options in specs:
+            key = _index_key(keys)
+            declared_keys.add(key)
+            if key not in existing_by_key:
+                missing.append({"name": options.get('name'), "keys": dict(keys)})
+
+        undeclared = [
+            name for key, name in existing_by_key.items()
+            if name != '_id_' and key not in declared_keys
+        ]
+        unused = [
+            name for name, stat in usage.items()
+            if name != '_id_' and stat['ops'] == 0
+        ]
+
+        report[collection_name] = {
+            "missing": missing,
+            "undeclared": undeclared,
+            "unused": unused,
+            "usage": usage,
+        }
+    return report
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+JOB_HANDLERS = {}
+
+def job_handler(job_type: str):
+    """Register an async handler(ctx: JobContext) -> result dict for a job type"""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+class JobInterrupted(Exception):
+    """Raised inside a handler when the job was cancelled or its lease was lost"""
+
+class JobContext:
+    """What a running handler sees: its params, last checkpoint and a way to persist progress"""
+    
+    def __init__(self, job: dict):
+        self.id = job['id']
+        self.type = job['type']
+        self.params = job.get('params') or {}
+        self.checkpoint = job.get('checkpoint') or {}
+        self.progress = job.get('progress') or {}
+    
+    async def save(self, checkpoint: Optional[dict] = None, **progress):
+        """Persist checkpoint/progress, renew the lease and stop if cancellation was requested"""
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        self.progress.update(progress)
+        now = datetime.now(timezone.utc)
+        job = await db.jobs.find_one_and_update(
+            {"id": self.id, "status": "running", "lease_owner": JOB_WORKER_ID},
+            {"$set": {
+                "checkpoint": self.checkpoint,
+                "progress": self.progress,
+                "updated_at": now.isoformat(),
+                "lease_expires_at": (now + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+            }},
+            projection={"_id": 0, "cancel_requested": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            raise JobInterrupted("lease lost")
+        if job.get('cancel_requested'):
+            raise JobInterrupted("cancelled")
+
+def job_unique_key(job_type: str, params: dict) -> str:
+    """Identity of a job for deduplication: its type and a digest of its params"""
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"{job_type}:{digest}"
+
+class JobRunner:
+    """In-process asyncio job runner backed by the jobs collection"""
+    
+    def __init__(self, max_concurrency: int):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.tasks = {}
+        self.sweeper = None
+    
+    async def submit(self, job_type: str, params: Optional[dict] = None, created_by: Optional[str] = None,
+                     unique: bool = True) -> dict:
+        """Queue a job; with unique, an already queued/running job of the same type and params is returned instead
+        
+        Uniqueness is enforced by the active_key_unique index: active_key only
+        exists while the job is queued or running, so concurrent submits from
+        any worker cannot both insert.
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        params = params or {}
+        unique_key = job_unique_key(job_type, params) if unique else None
+        for _ in range(3):
+            now = datetime.now(timezone.utc).isoformat()
+            job = {
+                "id": str(uuid.uuid4()),
+                "type": job_type,
+                "params": params,
+                "status": "queued",
+                "checkpoint": {},
+                "progress": {},
+                "attempts": 0,
+                "cancel_requested": False,
+                "created_by": created_by,
+                "created_at": now,
+                "updated_at": now
+            }
+            if unique_key:
+                job["unique_key"] = job["active_key"] = unique_key
+            try:
+                await db.jobs.insert_one(job)
+                break
+            except DuplicateKeyError:
+                if not unique_key:
+                    raise
+                active = await db.jobs.find_one({"active_key": unique_key}, {"_id": 0})
+                if active:
+                    return active
+                # The active job finished in between: try again
+        else:
+            raise RuntimeError(f"Could not submit {job_type}: identical jobs keep finishing")
+        job.pop('_id', None)
+        self._spawn(job['id'])
+        logger.info(f"Job {job['id']} ({job_type}) submitted")
+        return job
+    
+    def _spawn(self, job_id: str):
+        if job_id in self.tasks:
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+    
+    async def _claim(self, job_id: str) -> Optional[dict]:
+        """Take the lease on a queued job, or on a running one whose worker stopped renewing it"""
+        now = datetime.now(timezone.utc)
+        lease = {
+            "status": "running",
+            "lease_owner": JOB_WORKER_ID,
+            "lease_expires_at": (now + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat(),
+            "started_at": now.isoformat(),
+            "updated_at": now.isoformat()
+        }
+        job = await db.jobs.find_one_and_update(
+            {"id": job_id, "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now.isoformat()}}
+            ]},
+            {"$set": lease, "$inc": {"attempts": 1}},
+            projection={"_id": 0}
+        )
+        if job:
+            job.update(lease, attempts=job.get('attempts', 0) + 1)
+        return job
+    
+    async def _heartbeat(self, job_id: str):
+        """Keep the lease alive while a handler is between checkpoints"""
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await db.jobs.update_one(
+                {"id": job_id, "status": "running", "lease_owner": JOB_WORKER_ID},
+                {"$set": {"lease_expires_at": (datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()}}
+            )
+    
+    async def _finish(self, job_id: str, status: str, **fields):
+        await db.jobs.update_one(
+            {"id": job_id, "lease_owner": JOB_WORKER_ID},
+            {"$set": {"status": status, "finished_at": datetime.now(timezone.utc).isoformat(), **fields},
+             "$unset": {"lease_expires_at": "", "active_key": ""}}
+        )
+    
+    async def _run(self, job_id: str):
+        async with self.semaphore:
+            job = await self._claim(job_id)
+            if not job:
+                return
+            if job.get('cancel_requested'):
+                await self._finish(job_id, "cancelled")
+                return
+            ctx = JobContext(job)
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            started = time.perf_counter()
+            try:
+                result = await JOB_HANDLERS[job['type']](ctx)
+                await self._finish(job_id, "completed", result=result, progress=ctx.progress,
+                                   duration_ms=round((time.perf_counter() - started) * 1000))
+                logger.info(f"Job {job_id} ({job['type']}) completed: {result}")
+            except JobInterrupted as e:
+                if str(e) == "cancelled":
+                    await self._finish(job_id, "cancelled", progress=ctx.progress)
+                logger.info(f"Job {job_id} ({job['type']}) stopped: {e}")
+            except asyncio.CancelledError:
+                # Process shutting down: leave the job running, its lease will expire and it resumes elsewhere
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} ({job['type']}) failed: {e}")
+                await self._finish(job_id, "failed", error=str(e), progress=ctx.progress)
+            finally:
+                heartbeat.cancel()
+    
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """Request cancellation; queued jobs stop immediately, running ones at their next checkpoint"""
+        job = await db.jobs.find_one_and_update(
+            {"id": job_id, "status": {"$in": ["queued", "running"]}},
+            {"$set": {"cancel_requested": True, "updated_at": datetime.now(timezone.utc).isoformat()}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if job and job['status'] == 'queued':
+            await db.jobs.update_one(
+                {"id": job_id, "status": "queued"},
+                {"$set": {"status": "cancelled", "finished_at": datetime.now(timezone.utc).isoformat()},
+                 "$unset": {"active_key": ""}}
+            )
+            job['status'] = 'cancelled'
+        return job
+    
+    async def retry(self, query: dict) -> Optional[dict]:
+        """Put a failed job matching query back in the queue; it resumes from its last checkpoint"""
+        job = await db.jobs.find_one({**query, "status": "failed"}, {"_id": 0, "id": 1, "unique_key": 1})
+        if not job:
+            return None
+        requeue = {"status": "queued", "updated_at": datetime.now(timezone.utc).isoformat()}
+        if job.get('unique_key'):
+            requeue["active_key"] = job['unique_key']
+        try:
+            result = await db.jobs.update_one(
+                {"id": job['id'], "status": "failed"},
+                {"$set": requeue, "$unset": {"error": "", "finished_at": ""}}
+            )
+        except DuplicateKeyError:
+            # An identical job was submitted since and is still queued or running
+            return None
+        if not result.modified_count:
+            return None
+        self._spawn(job['id'])
+        logger.info(f"Job {job['id']} requeued")
+        return {"id": job['id']}
+    
+    async def resume_orphans(self):
+        """Pick up queued jobs and running jobs whose lease expired (crashed or restarted worker)"""
+        now = datetime.now(timezone.utc).isoformat()
+        cursor = db.jobs.find(
+            {"$or": [{"status": "queued"}, {"status": "running", "lease_expires_at": {"$lt": now}}]},
+            {"_id": 0, "id": 1}
+        )
+        async for job in cursor:
+            self._spawn(job['id'])
+    
+    async def _sweep(self):
+        while True:
+            try:
+                await self.resume_orphans()
+            except Exception as e:
+                logger.error(f"Job sweep failed: {e}")
+            await asyncio.sleep(JOB_LEASE_SECONDS)
+    
+    def start(self):
+        if self.sweeper is None:
+            self.sweeper = asyncio.create_task(self._sweep())
+    
+    async def stop(self):
+        tasks = list(self.tasks.values()) + ([self.sweeper] if self.sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.sweeper = None
+
+job_runner = JobRunner(JOB_MAX_CONCURRENCY)
+
+async def iter_job_batches(collection, query: dict, after_id: Optional[str] = None, projection: Optional[dict] = None,
+                           batch_size: Optional[int] = None):
+    """Yield batches (JOB_BATCH_SIZE by default) in _id order, resuming after a checkpointed _id"""
+    batch_size = batch_size or JOB_BATCH_SIZE
+    if after_id is not None:
+        query = {**query, "_id": {"$gt": ObjectId(after_id) if ObjectId.is_valid(after_id) else after_id}}
+    batch = []
+    async for doc in collection.find(query, projection).sort("_id", 1).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 # ============================================================================
 # AUTH ENDPOINTS
 # ============================================================================
@@ -243,7 +1120,7 @@ async def register(user_data: UserCreate):
         )
         
         # Hash password
-        password_hash = hash_password(user_data.password)
+        password_hash = await password_hasher.hash(user_data.password)
         
         # Save to database
         user_doc = user.model_dump()
@@ -253,6 +1130,7 @@ async def register(user_data: UserCreate):
                 user_doc[key] = user_doc[key].isoformat() if isinstance(user_doc[key], datetime) else user_doc[key]
         
         await db.users.insert_one(user_doc)
+        await seed_unread_counter(user.id)
         
         # Create token
         token = create_access_token(user.id, user.email)
@@ -292,10 +1170,23 @@ async def login(credentials: UserLogin):
             logger.error(f"No password hash found for user: {credentials.email}")
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        if not verify_password(credentials.password, password_hash):
+        if not await password_hasher.verify(credentials.password, password_hash):
             logger.error(f"Password verification failed for user: {credentials.email}")
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
+        # Transparently upgrade hashes made with a lower work factor
+        await password_hasher.refresh()
+        if password_hasher.needs_rehash(password_hash):
+            try:
+                new_hash = await password_hasher.hash(credentials.password)
+                await db.users.update_one(
+                    {"email": user['email']},
+                    {"$set": {"password_hash": new_hash}}
+                )
+                password_hasher.rehashed += 1
+            except Exception as e:
+                logger.warning(f"Password rehash failed for {credentials.email}: {e}")
+        
         # Get or generate user ID (legacy accounts may not have 'id' field)
         user_id = user.get('id') or str(uuid.uuid4())
         
@@ -381,6 +1272,7 @@ async def google_auth(auth_data: GoogleAuthRequest):
         
         if existing_user:
             await db.users.update_one({"id": existing_user['id']}, {"$set": {"last_login": datetime.now(timezone.utc).isoformat(), "photo_url": google_picture}})
+            invalidate_cached_user(existing_user['id'])
             user_id = existing_user['id']
             first_name = existing_user.get('first_name', google_given_name)
             last_name = existing_user.get('last_name', google_family_name)
@@ -395,6 +1287,7 @@ async def google_auth(auth_data: GoogleAuthRequest):
             created_at = datetime.now(timezone.utc).isoformat()
             is_active = True
             await db.users.insert_one({"id": user_id, "email": google_email, "first_name": first_name, "last_name": last_name, "photo_url": google_picture, "gdpr_consent": gdpr_consent, "created_at": created_at, "updated_at": created_at, "last_login": created_at, "is_active": is_active, "auth_provider": "google"})
+            await seed_unread_counter(user_id)
         
         token = create_access_token(user_id, google_email)
         return TokenResponse(access_token=token, user=UserResponse(id=user_id, email=google_email, first_name=first_name, last_name=last_name, gdpr_consent=gdpr_consent, created_at=created_at, is_active=is_active))
@@ -404,16 +1297,470 @@ async def google_auth(auth_data: GoogleAuthRequest):
         logger.error(f"Google auth error: {e}")
         raise HTTPException(status_code=500, detail="Google authentication failed")
 
+# ============================================================================
+# TREE REVISIONS & CHANGE LOG
+# ============================================================================
+
+def tree_change(entity: str, op: str, doc: Optional[dict] = None, entity_id: Optional[str] = None) -> dict:
+    """Build a change-log entry: op is 'upsert' (with the full document) or 'delete'"""
+    change = {"entity": entity, "op": op, "entity_id": entity_id or (doc or {}).get('id')}
+    if op == "upsert":
+        change["data"] = {k: v for k, v in doc.items() if k != '_id'}
+    return change
+
+async def log_tree_revision(owner_id: str, changes: List[dict], reset: bool = False) -> int:
+    """Take the owner's next tree revision by logging it, then move the counter up to it
+    
+    The log entry is inserted first, under the unique (owner_id, revision)
+    index, so no revision is ever counted without its entry. A write that
+    dies before moving the counter is caught up by the next one.
+    """
+    while True:
+        latest = await db.tree_changes.find_one({"owner_id": owner_id}, {"_id": 0, "revision": 1},
+                                                sort=[("revision", -1)])
+        revision = max(await get_tree_revision(owner_id), (latest or {}).get('revision', 0)) + 1
+        entry = {
+            "owner_id": owner_id,
+            "revision": revision,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "changes": changes
+        }
+        if reset:
+            entry["reset"] = True
+        try:
+            await db.tree_changes.insert_one(entry)
+            break
+        except DuplicateKeyError:
+            continue  # Another write of this owner took that revision
+    
+    counter = {"revision": revision}
+    if reset:
+        counter["compacted_through"] = revision
+    await db.tree_revisions.update_one(
+        {"owner_id": owner_id},
+        {"$max": counter, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    tree_cache.invalidate(owner_id)
+    graph_cache.invalidate(owner_id)
+    calendar_cache.invalidate(owner_id)
+    return revision
+
+async def record_tree_changes(owner_id: str, changes: List[dict]) -> int:
+    """Log the changes as the owner's next tree revision
+    
+    Each revision is logged as one document, so readers see all of its
+    changes or none of them.
+    """
+    if len(changes) > TREE_CHANGELOG_RETENTION:
+        # Larger than the log itself: clients resync fully anyway
+        return await reset_tree_changes(owner_id)
+    
+    revision = await log_tree_revision(owner_id, changes)
+    if revision % TREE_CHANGELOG_COMPACT_EVERY == 0:
+        await compact_tree_changes(owner_id, revision)
+    return revision
+
+async def reset_tree_changes(owner_id: str) -> int:
+    """Log a reset revision and drop the entries before it, so every client does a full resync"""
+    revision = await log_tree_revision(owner_id, [], reset=True)
+    await db.tree_changes.delete_many({"owner_id": owner_id, "revision": {"$lt": revision}})
+    return revision
+
+async def forget_tree_changes(owner_id: str):
+    """Drop the revision counter and log of a deleted account"""
+    await db.tree_revisions.delete_many({"owner_id": owner_id})
+    await db.tree_changes.delete_many({"owner_id": owner_id})
+    tree_cache.invalidate(owner_id)
+    graph_cache.invalidate(owner_id)
+    calendar_cache.invalidate(owner_id)
+
+async def compact_tree_changes(owner_id: str, revision: int):
+    """Drop log entries older than the retention window"""
+    cutoff = revision - TREE_CHANGELOG_RETENTION
+    if cutoff <= 0:
+        return
+    await db.tree_changes.delete_many({"owner_id": owner_id, "revision": {"$lte": cutoff}})
+    await db.tree_revisions.update_one(
+        {"owner_id": owner_id, "compacted_through": {"$not": {"$gte": cutoff}}},
+        {"$set": {"compacted_through": cutoff}}
+    )
+
+# owner_id -> (revision, serialized JSON bytes); entries are dropped on every
+# write and are also ignored when their revision is stale (other workers).
+tree_cache = LRUCache(TREE_CACHE_MAX_ENTRIES, max_bytes=TREE_CACHE_MAX_BYTES, sizeof=lambda entry: len(entry[1]))
+
+async def get_tree_revision_doc(owner_id: str) -> dict:
+    doc = await db.tree_revisions.find_one({"owner_id": owner_id}, {"_id": 0})
+    return doc or {"owner_id": owner_id, "revision": 0}
+
+async def get_tree_revision(owner_id: str) -> int:
+    doc = await db.tree_revisions.find_one({"owner_id": owner_id}, {"_id": 0, "revision": 1})
+    return (doc or {}).get("revision", 0)
+
+def tree_etag(owner_id: str, revision: int) -> str:
+    """Weak ETag for everything derived from an owner's persons/links
+    
+    Includes the owner: revisions of different accounts collide, and the
+    client cache is keyed by URL only.
+    """
+    return f'W/"tree-{owner_id}-{revision}"'
+
+def tree_cache_headers(owner_id: str, revision: int) -> dict:
+    return {
+        "ETag": tree_etag(owner_id, revision),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization"
+    }
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore the W/ prefix
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+async def check_tree_etag(owner_id: str, request: Request, response: Response) -> Optional[Response]:
+    """Return a 304 response if the client's copy is current, else set the validators on response"""
+    headers = tree_cache_headers(owner_id, await get_tree_revision(owner_id))
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def get_tree_response(owner_id: str, request: Request) -> Response:
+    """Serve {persons, links} from the materialized tree cache, rebuilding it when the revision moved"""
+    # Read the revision before the data so a cached body is never older than its label
+    revision = await get_tree_revision(owner_id)
+    headers = tree_cache_headers(owner_id, revision)
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    entry = tree_cache.get(owner_id)
+    if entry is not None and entry[0] == revision:
+        body = entry[1]
+    else:
+        persons = await db.persons.find({"owner_id": owner_id}, {"_id": 0}).to_list(None)
+        links = await db.links.find({"owner_id": owner_id}, {"_id": 0}).to_list(None)
+        body = json.dumps(
+            {"persons": persons, "links": links},
+            default=_json_default, ensure_ascii=False, separators=(",", ":")
+        ).encode('utf-8')
+        tree_cache.set(owner_id, (revision, body))
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# ============================================================================
+# GENEALOGY GRAPH
+# ============================================================================
+
+class FamilyGraph:
+    """Parent/child/spouse adjacency of one tree, built from its links
+
+    Link semantics: 'parent' means person_id_1 is a parent of person_id_2,
+    'child' the reverse, 'spouse' is symmetric. Traversals are O(V+E).
+    """
+
+    def __init__(self):
+        self.parents = {}
+        self.children = {}
+        self.spouses = {}
+
+    @classmethod
+    def from_links(cls, links) -> "FamilyGraph":
+        graph = cls()
+        for link in links:
+            p1, p2, link_type = link.get('person_id_1'), link.get('person_id_2'), link.get('link_type')
+            if not p1 or not p2 or p1 == p2:
+                continue
+            if link_type == 'parent':
+                graph._add_parent(p1, p2)
+            elif link_type == 'child':
+                graph._add_parent(p2, p1)
+            elif link_type == 'spouse':
+                graph.spouses.setdefault(p1, set()).add(p2)
+                graph.spouses.setdefault(p2, set()).add(p1)
+        return graph
+
+    def _add_parent(self, parent_id: str, child_id: str):
+        self.parents.setdefault(child_id, set()).add(parent_id)
+        self.children.setdefault(parent_id, set()).add(child_id)
+
+    def relatives(self, person_id: str) -> dict:
+        return {
+            "parents": self.parents.get(person_id, set()),
+            "children": self.children.get(person_id, set()),
+            "spouses": self.spouses.get(person_id, set()),
+        }
+
+    def _walk(self, adjacency: dict, start: str, max_depth: Optional[int]) -> List[tuple]:
+        """Breadth-first walk returning (person_id, distance), each person once at its shortest distance"""
+        seen = {start}
+        frontier = [start]
+        found = []
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier = []
+            for person_id in frontier:
+                for relative in adjacency.get(person_id, ()):
+                    if relative not in seen:
+                        seen.add(relative)
+                        next_frontier.append(relative)
+                        found.append((relative, depth))
+            frontier = next_frontier
+        return found
+
+    def ancestors(self, person_id: str, max_depth: Optional[int] = None) -> List[tuple]:
+        return self._walk(self.parents, person_id, max_depth)
+
+    def descendants(self, person_id: str, max_depth: Optional[int] = None) -> List[tuple]:
+        return self._walk(self.children, person_id, max_depth)
+
+    def generations(self, person_ids) -> tuple:
+        """Number generations from the oldest ancestors (0) downwards
+
+        A child sits one generation below its lowest parent (topological pass
+        over parent->child edges). Persons without recorded parents, such as
+        in-laws, are then aligned on their spouse and the pass is repeated
+        so their descendants follow. Returns (generation by id, ids left
+        unnumbered because they sit on a parent cycle).
+        """
+        nodes = set(person_ids) | set(self.parents) | set(self.children)
+        roots = [pid for pid in nodes if not self.parents.get(pid)]
+
+        generation = self._propagate(nodes, {pid: 0 for pid in roots})
+        aligned = {}
+        for person_id in roots:
+            spouse_generations = [generation[s] for s in self.spouses.get(person_id, ()) if s in generation]
+            aligned[person_id] = max([0] + spouse_generations)
+        generation = self._propagate(nodes, aligned)
+
+        # Only report persons of the tree (links may point to deleted persons)
+        person_ids = set(person_ids)
+        unresolved = sorted(pid for pid in person_ids if pid not in generation)
+        return {pid: gen for pid, gen in generation.items() if pid in person_ids}, unresolved
+
+    def _propagate(self, nodes, root_generations: dict) -> dict:
+        pending_parents = {pid: len(self.parents.get(pid, ())) for pid in nodes}
+        generation = dict(root_generations)
+        queue = deque(generation)
+        while queue:
+            person_id = queue.popleft()
+            for child in self.children.get(person_id, ()):
+                generation[child] = max(generation.get(child, 0), generation[person_id] + 1)
+                pending_parents[child] -= 1
+                if pending_parents[child] == 0:
+                    queue.append(child)
+        # Nodes on a parent cycle never reach zero pending parents
+        return {pid: gen for pid, gen in generation.items() if pending_parents.get(pid, 0) == 0}
+
+# owner_id -> (revision, FamilyGraph)
+graph_cache = LRUCache(GRAPH_CACHE_MAX_ENTRIES)
+
+async def get_family_graph(owner_id: str) -> FamilyGraph:
+    """Get the owner's FamilyGraph, rebuilding it only when the tree revision changed"""
+    revision = await get_tree_revision(owner_id)
+    entry = graph_cache.get(owner_id)
+    if entry is not None and entry[0] == revision:
+        return entry[1]
+    links = await db.links.find(
+        {"owner_id": owner_id},
+        {"_id": 0, "person_id_1": 1, "person_id_2": 1, "link_type": 1}
+    ).to_list(None)
+    graph = FamilyGraph.from_links(links)
+    graph_cache.set(owner_id, (revision, graph))
+    return graph
+
+async def _persons_by_id(owner_id: str, person_ids) -> dict:
+    persons = await db.persons.find(
+        {"owner_id": owner_id, "id": {"$in": list(person_ids)}},
+        {"_id": 0}
+    ).to_list(None)
+    return {p['id']: p for p in persons}
+
+class PersonRecord:
+    """Person attributes needed by the analysis and export paths"""
+    __slots__ = ("id", "first_name", "last_name", "gender", "birth_date", "death_date", "photo_url")
+
+    FIELDS = ("id", "first_name", "last_name", "gender", "birth_date", "death_date", "photo_url")
+
+    def __init__(self, doc: dict):
+        for field in self.FIELDS:
+            setattr(self, field, doc.get(field))
+
+    @property
+    def name(self) -> str:
+        return f"{self.first_name or ''} {self.last_name or ''}".strip()
+
+def _csr(size: int, sources, targets) -> tuple:
+    """Compressed sparse rows: the neighbours of i are targets[ptr[i]:ptr[i + 1]]"""
+    sources = np.frombuffer(sources, dtype=np.int32) if len(sources) else np.zeros(0, dtype=np.int32)
+    targets = np.frombuffer(targets, dtype=np.int32) if len(targets) else np.zeros(0, dtype=np.int32)
+    order = np.argsort(sources, kind='stable')
+    ptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=ptr[1:])
+    return ptr, targets[order]
+
+class CompactTree:
+    """Array-backed tree for large analyses
+
+    Person UUIDs are interned to dense int indices; parent, child and spouse
+    adjacency are NumPy CSR arrays and attributes live in __slots__ records,
+    instead of lists of dicts keyed by 36-character strings.
+    """
+    __slots__ = ("ids", "index", "records", "link_count", "_edges",
+                 "parent_ptr", "parent_idx", "child_ptr", "child_idx", "spouse_ptr", "spouse_idx")
+
+    def __init__(self):
+        self.records = []
+        self.ids = []
+        self.index = {}
+        self.link_count = 0
+        # Edge lists are only kept until finish() turns them into CSR arrays
+        self._edges = (array('i'), array('i'), array('i'), array('i'))
+
+    def add_person(self, doc: dict):
+        person_id = doc.get('id')
+        if person_id and person_id not in self.index:
+            self.index[person_id] = len(self.records)
+            self.ids.append(person_id)
+            self.records.append(PersonRecord(doc))
+
+    def add_link(self, doc: dict):
+        """Add a link; persons must be added first (dangling links are skipped)"""
+        self.link_count += 1
+        i, j = self.index.get(doc.get('person_id_1')), self.index.get(doc.get('person_id_2'))
+        if i is None or j is None or i == j:
+            return
+        parents, children, spouse_a, spouse_b = self._edges
+        link_type = doc.get('link_type')
+        if link_type == 'parent':
+            parents.append(i)
+            children.append(j)
+        elif link_type == 'child':
+            parents.append(j)
+            children.append(i)
+        elif link_type == 'spouse':
+            spouse_a.append(i)
+            spouse_b.append(j)
+
+    def finish(self) -> "CompactTree":
+        parents, children, spouse_a, spouse_b = self._edges
+        size = len(self.records)
+        self.parent_ptr, self.parent_idx = _csr(size, children, parents)
+        self.child_ptr, self.child_idx = _csr(size, parents, children)
+        self.spouse_ptr, self.spouse_idx = _csr(size, spouse_a + spouse_b, spouse_b + spouse_a)
+        self._edges = None
+        return self
+
+    @classmethod
+    def build(cls, persons, links) -> "CompactTree":
+        """Build from iterables of person and link documents"""
+        tree = cls()
+        for person in persons:
+            tree.add_person(person)
+        for link in links:
+            tree.add_link(link)
+        return tree.finish()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def parents_of(self, i: int):
+        return self.parent_idx[self.parent_ptr[i]:self.parent_ptr[i + 1]]
+
+    def children_of(self, i: int):
+        return self.child_idx[self.child_ptr[i]:self.child_ptr[i + 1]]
+
+    def spouses_of(self, i: int):
+        return self.spouse_idx[self.spouse_ptr[i]:self.spouse_ptr[i + 1]]
+
+    def parent_counts(self):
+        return np.diff(self.parent_ptr)
+
+async def load_compact_tree(owner_id: str) -> CompactTree:
+    """Stream an owner's persons and links from Motor straight into a CompactTree"""
+    tree = CompactTree()
+    person_projection = {"_id": 0, **{field: 1 for field in PersonRecord.FIELDS}}
+    async for doc in db.persons.find({"owner_id": owner_id}, person_projection).batch_size(TREE_STREAM_BATCH_SIZE):
+        tree.add_person(doc)
+    link_projection = {"_id": 0, "person_id_1": 1, "person_id_2": 1, "link_type": 1}
+    async for doc in db.links.find({"owner_id": owner_id}, link_projection).batch_size(TREE_STREAM_BATCH_SIZE):
+        tree.add_link(doc)
+    return tree.finish()
+
 # ============================================================================
 # PERSONS ENDPOINTS
 # ============================================================================
 
+ISO_DATE_RE = re.compile(r'^\s*(\d{4})-(\d{2})-(\d{2})')
+
+def iso_mmdd(value: Any) -> Optional[int]:
+    """'1950-03-12...' -> 312 (month * 100 + day); None when the day is unknown"""
+    match = ISO_DATE_RE.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    month, day = int(match.group(2)), int(match.group(3))
+    try:
+        date(2000, month, day)  # leap year, so 02-29 is valid
+    except ValueError:
+        return None
+    return month * 100 + day
+
+def iso_day(value: Any) -> Optional[datetime]:
+    """'2025-03-12...' -> that day at 00:00 UTC (a BSON date for range queries); None if unparseable"""
+    match = ISO_DATE_RE.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    try:
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def with_anniversary_mmdd(person: dict) -> dict:
+    """Set the birth_mmdd/death_mmdd used by the anniversary range queries; call on every person write"""
+    person['birth_mmdd'] = iso_mmdd(person.get('birth_date'))
+    person['death_mmdd'] = iso_mmdd(person.get('death_date'))
+    return person
+
+def person_mmdd(person: dict, kind: str) -> Optional[int]:
+    """birth_mmdd/death_mmdd of a person (kind 'birth' or 'death'), from the date when never stored"""
+    if f'{kind}_mmdd' in person:
+        return person[f'{kind}_mmdd']
+    return iso_mmdd(person.get(f'{kind}_date'))
+
+def event_iso_day(event: dict) -> Optional[datetime]:
+    """event_day of an event (aware UTC), from event_date when it was never stored"""
+    if 'event_day' not in event:
+        return iso_day(event.get('event_date'))
+    day = event['event_day']
+    # The driver returns naive datetimes
+    return day.replace(tzinfo=timezone.utc) if day is not None and day.tzinfo is None else day
+
 @api_router.get("/persons")
-async def get_persons(current_user: dict = Depends(get_current_user)):
+async def get_persons(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
     """Get all persons for the current user"""
-    persons = await db.persons.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
+    not_modified = await check_tree_etag(current_user['id'], request, response)
+    if not_modified:
+        return not_modified
+    persons = await db.persons.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(None)
     return persons
 
+@api_router.get("/persons/page")
+async def get_persons_page(cursor: Optional[str] = None, limit: int = 200, current_user: dict = Depends(get_current_user)):
+    """Get one page of persons, keyset-paginated on _id (pass next_cursor back as cursor)"""
+    return await paginate_owner_collection(db.persons, current_user['id'], cursor, limit)
+
 @api_router.get("/persons/{person_id}")
 async def get_person(person_id: str, current_user: dict = Depends(get_current_user)):
     """Get a specific person"""
@@ -426,7 +1773,7 @@ async def get_person(person_id: str, current_user: dict = Depends(get_current_us
 async def create_person(person_data: PersonCreate, current_user: dict = Depends(get_current_user)):
     """Create a new person"""
     try:
-        doc = {
+        doc = with_anniversary_mmdd({
             "id": str(uuid.uuid4()),
             "owner_id": current_user['id'],
             "first_name": person_data.first_name,
@@ -438,16 +1785,68 @@ async def create_person(person_data: PersonCreate, current_user: dict = Depends(
             "bio": person_data.bio,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "updated_at": datetime.now(timezone.utc).isoformat()
-        }
+        })
         
         await db.persons.insert_one(doc)
         # Remove _id before returning
         doc.pop('_id', None)
+        await record_tree_changes(current_user['id'], [tree_change("person", "upsert", doc)])
         return doc
     except Exception as e:
         logger.error(f"Error creating person: {e}")
         raise HTTPException(status_code=500, detail=f"Error creating person: {str(e)}")
 
+@api_router.post("/persons/bulk")
+async def create_persons_bulk(data: PersonsBulkCreate, current_user: dict = Depends(get_current_user)):
+    """Create many persons (and optionally links between them) in one request
+    
+    Links may reference persons of the same batch through their client_id.
+    Returns one result per item.
+    """
+    if len(data.persons) + len(data.links) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} items per request")
+    
+    owner_id = current_user['id']
+    now = datetime.now(timezone.utc).isoformat()
+    id_map = {}
+    results = []
+    docs = []
+    positions = []
+    for index, item in enumerate(data.persons):
+        if item.client_id and item.client_id in id_map:
+            results.append({"index": index, "client_id": item.client_id, "status": "error", "error": "Duplicate client_id"})
+            continue
+        doc = with_anniversary_mmdd({
+            "id": str(uuid.uuid4()),
+            "owner_id": owner_id,
+            **item.model_dump(exclude={"client_id"}),
+            "created_at": now,
+            "updated_at": now
+        })
+        if item.client_id:
+            id_map[item.client_id] = doc['id']
+        results.append({"index": index, "client_id": item.client_id, "id": doc['id'], "status": "created"})
+        docs.append(doc)
+        positions.append(len(results) - 1)
+    
+    errors = await insert_many_unordered(db.persons, docs)
+    for position, message in errors.items():
+        result = results[positions[position]]
+        result.update({"status": "error", "error": message})
+        result.pop('id', None)
+        if result.get('client_id'):
+            id_map.pop(result['client_id'], None)
+    created = [doc for position, doc in enumerate(docs) if position not in errors]
+    
+    link_results, created_links = await _create_links_bulk(owner_id, data.links, id_map, {doc['id'] for doc in created})
+    
+    changes = [tree_change("person", "upsert", doc) for doc in created]
+    changes += [tree_change("link", "upsert", doc) for doc in created_links]
+    if changes:
+        await record_tree_changes(owner_id, changes)
+    
+    return {"persons": results, "links": link_results, "id_map": id_map}
+
 @api_router.put("/persons/{person_id}")
 async def update_person(person_id: str, person_data: PersonCreate, current_user: dict = Depends(get_current_user)):
     """Update a person"""
@@ -457,10 +1856,14 @@ async def update_person(person_id: str, person_data: PersonCreate, current_user:
     
     update_data = person_data.model_dump(exclude_unset=True)
     update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    for kind in ('birth', 'death'):
+        if f'{kind}_date' in update_data:
+            update_data[f'{kind}_mmdd'] = iso_mmdd(update_data[f'{kind}_date'])
     
     await db.persons.update_one({"id": person_id}, {"$set": update_data})
     
     updated = await db.persons.find_one({"id": person_id}, {"_id": 0})
+    await record_tree_changes(current_user['id'], [tree_change("person", "upsert", updated)])
     return updated
 
 @api_router.delete("/persons/{person_id}")
@@ -471,10 +1874,16 @@ async def delete_person(person_id: str, current_user: dict = Depends(get_current
         raise HTTPException(status_code=404, detail="Person not found")
     
     # Also delete related links
-    await db.links.delete_many({
+    links_filter = {
         "owner_id": current_user['id'],
         "$or": [{"person_id_1": person_id}, {"person_id_2": person_id}]
-    })
+    }
+    related_links = await db.links.find(links_filter, {"_id": 0, "id": 1}).to_list(None)
+    await db.links.delete_many(links_filter)
+    
+    changes = [tree_change("person", "delete", entity_id=person_id)]
+    changes += [tree_change("link", "delete", entity_id=link.get('id')) for link in related_links]
+    await record_tree_changes(current_user['id'], changes)
     
     return {"success": True}
 
@@ -483,11 +1892,19 @@ async def delete_person(person_id: str, current_user: dict = Depends(get_current
 # ============================================================================
 
 @api_router.get("/links")
-async def get_links(current_user: dict = Depends(get_current_user)):
+async def get_links(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
     """Get all links for the current user"""
-    links = await db.links.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
+    not_modified = await check_tree_etag(current_user['id'], request, response)
+    if not_modified:
+        return not_modified
+    links = await db.links.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(None)
     return links
 
+@api_router.get("/links/page")
+async def get_links_page(cursor: Optional[str] = None, limit: int = 200, current_user: dict = Depends(get_current_user)):
+    """Get one page of links, keyset-paginated on _id (pass next_cursor back as cursor)"""
+    return await paginate_owner_collection(db.links, current_user['id'], cursor, limit)
+
 @api_router.post("/links")
 async def create_link(link_data: LinkCreate, current_user: dict = Depends(get_current_user)):
     """Create a new link between two persons"""
@@ -510,6 +1927,7 @@ async def create_link(link_data: LinkCreate, current_user: dict = Depends(get_cu
         
         await db.links.insert_one(doc)
         doc.pop('_id', None)
+        await record_tree_changes(current_user['id'], [tree_change("link", "upsert", doc)])
         return doc
     except HTTPException:
         raise
@@ -517,12 +1935,66 @@ async def create_link(link_data: LinkCreate, current_user: dict = Depends(get_cu
         logger.error(f"Error creating link: {e}")
         raise HTTPException(status_code=500, detail=f"Error creating link: {str(e)}")
 
+async def _create_links_bulk(owner_id: str, items: List[LinkBulkItem], id_map: dict, new_person_ids: set) -> tuple:
+    """Validate links with a single $in query and insert them unordered; returns (results, created docs)"""
+    resolved = [
+        (id_map.get(item.person_id_1, item.person_id_1), id_map.get(item.person_id_2, item.person_id_2))
+        for item in items
+    ]
+    to_check = {pid for pair in resolved for pid in pair} - new_person_ids
+    existing = set(new_person_ids)
+    if to_check:
+        found = await db.persons.find(
+            {"owner_id": owner_id, "id": {"$in": list(to_check)}},
+            {"_id": 0, "id": 1}
+        ).to_list(None)
+        existing.update(p['id'] for p in found)
+    
+    now = datetime.now(timezone.utc).isoformat()
+    results = []
+    docs = []
+    positions = []
+    for index, (item, (person_id_1, person_id_2)) in enumerate(zip(items, resolved)):
+        if person_id_1 not in existing or person_id_2 not in existing:
+            results.append({"index": index, "client_id": item.client_id, "status": "error", "error": "One or both persons not found"})
+            continue
+        doc = {
+            "id": str(uuid.uuid4()),
+            "owner_id": owner_id,
+            "person_id_1": person_id_1,
+            "person_id_2": person_id_2,
+            "link_type": item.link_type,
+            "created_at": now
+        }
+        results.append({"index": index, "client_id": item.client_id, "id": doc['id'], "status": "created"})
+        docs.append(doc)
+        positions.append(len(results) - 1)
+    
+    errors = await insert_many_unordered(db.links, docs)
+    for position, message in errors.items():
+        result = results[positions[position]]
+        result.update({"status": "error", "error": message})
+        result.pop('id', None)
+    return results, [doc for position, doc in enumerate(docs) if position not in errors]
+
+@api_router.post("/links/bulk")
+async def create_links_bulk(data: LinksBulkCreate, current_user: dict = Depends(get_current_user)):
+    """Create many links between existing persons in one request; returns one result per item"""
+    if len(data.links) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} items per request")
+    
+    results, created = await _create_links_bulk(current_user['id'], data.links, {}, set())
+    if created:
+        await record_tree_changes(current_user['id'], [tree_change("link", "upsert", doc) for doc in created])
+    return {"links": results}
+
 @api_router.delete("/links/{link_id}")
 async def delete_link(link_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a link"""
     result = await db.links.delete_one({"id": link_id, "owner_id": current_user['id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Link not found")
+    await record_tree_changes(current_user['id'], [tree_change("link", "delete", entity_id=link_id)])
     return {"success": True}
 
 # ============================================================================
@@ -530,23 +2002,121 @@ async def delete_link(link_id: str, current_user: dict = Depends(get_current_use
 # ============================================================================
 
 @api_router.get("/tree")
-async def get_tree(current_user: dict = Depends(get_current_user)):
+async def get_tree(request: Request, current_user: dict = Depends(get_current_user)):
     """Get the complete family tree for the current user"""
-    persons = await db.persons.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    links = await db.links.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    
-    return {
-        "persons": persons,
-        "links": links
-    }
+    return await get_tree_response(current_user['id'], request)
+
+@api_router.get("/tree/stream")
+async def stream_tree(current_user: dict = Depends(get_current_user)):
+    """Stream the complete family tree as NDJSON (persons, then links, then an end marker)"""
+    return StreamingResponse(stream_tree_ndjson(current_user['id']), media_type="application/x-ndjson")
 
 @api_router.delete("/tree/clear")
 async def clear_tree(current_user: dict = Depends(get_current_user)):
     """Clear all persons and links for the current user"""
     await db.persons.delete_many({"owner_id": current_user['id']})
     await db.links.delete_many({"owner_id": current_user['id']})
+    await reset_tree_changes(current_user['id'])
     return {"success": True}
 
+@api_router.get("/tree/changes")
+async def get_tree_changes(since: int = 0, current_user: dict = Depends(get_current_user)):
+    """Get the persons/links upserted and deleted since a tree revision"""
+    revision_doc = await get_tree_revision_doc(current_user['id'])
+    revision = revision_doc.get('revision', 0)
+    
+    # The log no longer covers the client's revision (compacted, cleared or unknown)
+    if since < revision_doc.get('compacted_through', 0) or since > revision:
+        return {"revision": revision, "since": since, "full_resync": True}
+    
+    upserts = {"person": {}, "link": {}}
+    deletes = {"person": set(), "link": set()}
+    logged = since
+    if since < revision:
+        cursor = db.tree_changes.find(
+            {"owner_id": current_user['id'], "revision": {"$gt": since}},
+            {"_id": 0}
+        ).sort("revision", 1)
+        # Replay in order so only the latest state of each entity is returned.
+        # Revisions are logged before they are counted, so a missing one was
+        # compacted away meanwhile, and a reset entry means the log was dropped.
+        async for entry in cursor:
+            if entry.get('reset') or entry['revision'] != logged + 1:
+                return {"revision": revision, "since": since, "full_resync": True}
+            logged = entry['revision']
+            for change in entry['changes']:
+                entity, entity_id = change.get('entity'), change.get('entity_id')
+                if entity not in upserts:
+                    continue
+                if change.get('op') == "upsert":
+                    upserts[entity][entity_id] = change.get('data')
+                    deletes[entity].discard(entity_id)
+                else:
+                    upserts[entity].pop(entity_id, None)
+                    deletes[entity].add(entity_id)
+    
+    return {
+        "revision": logged,
+        "since": since,
+        "full_resync": False,
+        "upserts": {"persons": list(upserts["person"].values()), "links": list(upserts["link"].values())},
+        "deletes": {"persons": sorted(deletes["person"]), "links": sorted(deletes["link"])},
+    }
+
+async def _tree_walk_response(person_id: str, depth: Optional[int], current_user: dict, direction: str) -> dict:
+    if depth is not None and depth < 1:
+        raise HTTPException(status_code=400, detail="depth must be at least 1")
+    owner_id = current_user['id']
+    if not await db.persons.find_one({"id": person_id, "owner_id": owner_id}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Person not found")
+    
+    graph = await get_family_graph(owner_id)
+    walk = graph.ancestors(person_id, depth) if direction == "ancestors" else graph.descendants(person_id, depth)
+    persons = await _persons_by_id(owner_id, [pid for pid, _ in walk])
+    
+    return {
+        "person_id": person_id,
+        "depth": depth,
+        direction: [
+            {"person": persons[pid], "distance": distance}
+            for pid, distance in walk if pid in persons
+        ],
+    }
+
+@api_router.get("/tree/ancestors/{person_id}")
+async def get_ancestors(person_id: str, depth: Optional[int] = None, current_user: dict = Depends(get_current_user)):
+    """Get a person's ancestors up to depth generations (all if omitted), nearest first"""
+    return await _tree_walk_response(person_id, depth, current_user, "ancestors")
+
+@api_router.get("/tree/descendants/{person_id}")
+async def get_descendants(person_id: str, depth: Optional[int] = None, current_user: dict = Depends(get_current_user)):
+    """Get a person's descendants up to depth generations (all if omitted), nearest first"""
+    return await _tree_walk_response(person_id, depth, current_user, "descendants")
+
+@api_router.get("/tree/generations")
+async def get_generations(current_user: dict = Depends(get_current_user)):
+    """Number every person's generation, 0 being the oldest known ancestors"""
+    owner_id = current_user['id']
+    graph = await get_family_graph(owner_id)
+    persons = await db.persons.find(
+        {"owner_id": owner_id},
+        {"_id": 0, "id": 1, "first_name": 1, "last_name": 1}
+    ).to_list(None)
+    generation, unresolved = graph.generations([p['id'] for p in persons if p.get('id')])
+    
+    by_generation = {}
+    for person in persons:
+        if person.get('id') in generation:
+            by_generation.setdefault(generation[person['id']], []).append(person)
+    
+    return {
+        "generations": [
+            {"generation": number, "persons": by_generation[number]}
+            for number in sorted(by_generation)
+        ],
+        "unresolved": unresolved,
+    }
+
 @api_router.get("/tree/debug")
 async def debug_tree(current_user: dict = Depends(get_current_user)):
     """Debug endpoint for tree data"""
@@ -754,12 +2324,14 @@ async def convert_preview_to_account(token: str, current_user: dict = Depends(ge
         raise HTTPException(status_code=404, detail="Session not found")
     
     # Move persons to user
+    changes = []
     preview_persons = await db.preview_persons.find({"session_token": token}).to_list(1000)
     for person in preview_persons:
         person["owner_id"] = current_user["id"]
         del person["session_token"]
         del person["_id"]
-        await db.persons.insert_one(person)
+        await db.persons.insert_one(with_anniversary_mmdd(person))
+        changes.append(tree_change("person", "upsert", person))
     
     # Move links to user
     preview_links = await db.preview_links.find({"session_token": token}).to_list(1000)
@@ -768,6 +2340,9 @@ async def convert_preview_to_account(token: str, current_user: dict = Depends(ge
         del link["session_token"]
         del link["_id"]
         await db.links.insert_one(link)
+        changes.append(tree_change("link", "upsert", link))
+    
+    await record_tree_changes(current_user["id"], changes)
     
     # Delete preview data
     await db.preview_persons.delete_many({"session_token": token})
@@ -780,53 +2355,218 @@ async def convert_preview_to_account(token: str, current_user: dict = Depends(ge
 # EVENTS ENDPOINTS
 # ============================================================================
 
-@api_router.get("/events/birthdays")
-async def get_upcoming_birthdays(current_user: dict = Depends(get_current_user)):
-    """Get upcoming birthdays"""
-    persons = await db.persons.find(
-        {"owner_id": current_user['id'], "birth_date": {"$ne": None}},
-        {"_id": 0}
-    ).to_list(1000)
+def birthday_window_query(start: date, days: int) -> dict:
+    """birth_mmdd filter for the days start..start+days, wrapping at year end
     
-    today = datetime.now(timezone.utc)
+    Persons written before birth_mmdd was maintained match too, until the
+    backfill reaches them; person_mmdd() then reads their birth_date.
+    """
+    missing = {"birth_mmdd": {"$exists": False}}
+    if days >= 365:
+        return {"$or": [{"birth_mmdd": {"$ne": None}}, missing]}
+    end = start + timedelta(days=days)
+    first, last = start.month * 100 + start.day, end.month * 100 + end.day
+    if last == 228 and not calendar.isleap(end.year):
+        last = 229  # 29 February birthdays are celebrated on the 28th
+    if start.year == end.year:
+        return {"$or": [{"birth_mmdd": {"$gte": first, "$lte": last}}, missing]}
+    return {"$or": [{"birth_mmdd": {"$gte": first}}, {"birth_mmdd": {"$lte": last}}, missing]}
+
+def next_birthday(mmdd: int, today: date) -> date:
+    """Next occurrence (today included) of a month-day, on the 28th for 29 February in other years"""
+    month, day = divmod(mmdd, 100)
+    for year in (today.year, today.year + 1):
+        if month == 2 and day == 29 and not calendar.isleap(year):
+            candidate = date(year, 2, 28)
+        else:
+            candidate = date(year, month, day)
+        if candidate >= today:
+            return candidate
+    return candidate
+
+def birthday_entry(person: dict, when: date, today: date) -> dict:
+    entry = {
+        "person": person,
+        "person_name": f"{person.get('first_name', '')} {person.get('last_name', '')}".strip(),
+        "date": when.isoformat(),
+        "days_until": (when - today).days,
+        "age": None
+    }
+    birth_year = str(person.get('birth_date') or '')[:4]
+    if birth_year.isdigit():
+        entry["age"] = when.year - int(birth_year)
+    return entry
+
+@api_router.get("/events/birthdays")
+async def get_upcoming_birthdays(days: int = 30, current_user: dict = Depends(get_current_user)):
+    """Get birthdays in the next `days` days (30 by default), soonest first"""
+    days = max(0, min(days, 366))
+    today = datetime.now(timezone.utc).date()
     birthdays = []
-    
-    for person in persons:
-        if person.get('birth_date'):
-            try:
-                birth_date = datetime.fromisoformat(person['birth_date'].replace('Z', '+00:00'))
-                # Check if birthday is in the next 30 days
-                this_year_birthday = birth_date.replace(year=today.year)
-                if this_year_birthday < today:
-                    this_year_birthday = birth_date.replace(year=today.year + 1)
-                
-                days_until = (this_year_birthday - today).days
-                if 0 <= days_until <= 30:
-                    birthdays.append({
-                        "person": person,
-                        "date": this_year_birthday.isoformat(),
-                        "days_until": days_until
-                    })
-            except:
-                pass
+    async for person in db.persons.find({"owner_id": current_user['id'], **birthday_window_query(today, days)}, {"_id": 0}):
+        mmdd = person_mmdd(person, 'birth')
+        if mmdd is None:
+            continue
+        when = next_birthday(mmdd, today)
+        if (when - today).days <= days:
+            birthdays.append(birthday_entry(person, when, today))
     
     birthdays.sort(key=lambda x: x['days_until'])
     return birthdays
 
+# owner_id -> ((tree revision, events revision), {"YYYY-MM": [calendar entries]})
+calendar_cache = LRUCache(CALENDAR_CACHE_MAX_ENTRIES)
+
+async def bump_events_revision(owner_id: str):
+    """Mark an owner's events as changed (stored next to the tree revision, for every worker)"""
+    await db.tree_revisions.update_one({"owner_id": owner_id}, {"$inc": {"events_revision": 1}}, upsert=True)
+    calendar_cache.invalidate(owner_id)
+
+def anniversary_entry(person: dict, kind: str, when: date, since: str) -> dict:
+    name = f"{person.get('first_name', '')} {person.get('last_name', '')}".strip()
+    entry = {
+        "date": when.isoformat(),
+        "kind": kind,
+        "title": f"Anniversaire de {name}" if kind == "birthday" else f"Anniversaire du décès de {name}",
+        "person_id": person.get('id'),
+        "person_name": name,
+        "years": None
+    }
+    if since[:4].isdigit():
+        entry["years"] = when.year - int(since[:4])
+    return entry
+
+async def build_calendar_month(owner_id: str, year: int, month: int) -> List[dict]:
+    """Events of one month plus birth and death anniversaries falling in it"""
+    first = datetime(year, month, 1, tzinfo=timezone.utc)
+    following = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    # Documents the backfills have not reached yet are matched on their ISO dates
+    entries = []
+    async for event in db.events.find(
+        {"owner_id": owner_id, "$or": [{"event_day": {"$gte": first, "$lt": following}}, {"event_day": {"$exists": False}}]},
+        {"_id": 0}
+    ):
+        day = event_iso_day(event)
+        if day is None or not first <= day < following:
+            continue
+        event.pop('event_day', None)
+        entries.append({
+            "date": event['event_date'][:10],
+            "kind": "event",
+            "title": event.get('title'),
+            "person_id": event.get('person_id'),
+            "event": event
+        })
+    
+    def month_date(mmdd: int) -> date:
+        # 29 February anniversaries fall on the 28th in other years
+        if mmdd == 229 and not calendar.isleap(year):
+            return date(year, 2, 28)
+        return date(year, month, mmdd % 100)
+    
+    projection = {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "birth_date": 1, "birth_mmdd": 1,
+                  "death_date": 1, "death_mmdd": 1}
+    for kind, min_years in (("birth", 0), ("death", 1)):
+        field = f"{kind}_mmdd"
+        async for person in db.persons.find(
+            {"owner_id": owner_id, "$or": [{field: {"$gte": month * 100 + 1, "$lte": month * 100 + 31}},
+                                           {field: {"$exists": False}}]},
+            projection
+        ):
+            mmdd = person_mmdd(person, kind)
+            if not mmdd or mmdd // 100 != month:
+                continue
+            entry = anniversary_entry(person, "birthday" if kind == "birth" else "death_anniversary",
+                                      month_date(mmdd), person.get(f'{kind}_date') or '')
+            if entry['years'] is None or entry['years'] >= min_years:
+                entries.append(entry)
+    return entries
+
+async def get_calendar_month(owner_id: str, version: tuple, year: int, month: int) -> List[dict]:
+    cached = calendar_cache.get(owner_id)
+    if cached is None or cached[0] != version:
+        cached = (version, {})
+        calendar_cache.set(owner_id, cached)
+    key = f"{year:04d}-{month:02d}"
+    if key not in cached[1]:
+        cached[1][key] = await build_calendar_month(owner_id, year, month)
+    return cached[1][key]
+
+@api_router.get("/events/calendar")
+async def get_calendar(from_: str = Query(..., alias="from"), to: str = Query(...),
+                       current_user: dict = Depends(get_current_user)):
+    """Events and birth/death anniversaries between two dates (YYYY-MM-DD, inclusive), for month/week views"""
+    try:
+        start, end = date.fromisoformat(from_), date.fromisoformat(to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be YYYY-MM-DD")
+    if end < start or (end - start).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"to must be on or after from, at most {CALENDAR_MAX_DAYS} days later")
+    
+    owner_id = current_user['id']
+    revision_doc = await get_tree_revision_doc(owner_id)
+    version = (revision_doc.get('revision', 0), revision_doc.get('events_revision', 0))
+    
+    entries = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        entries.extend(await get_calendar_month(owner_id, version, year, month))
+        year, month = year + month // 12, month % 12 + 1
+    
+    first, last = start.isoformat(), end.isoformat()
+    entries = [entry for entry in entries if first <= entry['date'] <= last]
+    entries.sort(key=lambda entry: (entry['date'], entry['kind'] != "event", entry['title'] or ''))
+    return {"from": first, "to": last, "entries": entries}
+
 @api_router.get("/events/today")
 async def get_todays_events(current_user: dict = Depends(get_current_user)):
     """Get today's events"""
-    today = datetime.now(timezone.utc).date().isoformat()
-    events = await db.events.find(
-        {"owner_id": current_user['id'], "event_date": {"$regex": f"^{today}"}},
+    today = iso_day(datetime.now(timezone.utc).date().isoformat())
+    events = []
+    async for event in db.events.find(
+        {"owner_id": current_user['id'],
+         "$or": [{"event_day": {"$gte": today, "$lt": today + timedelta(days=1)}}, {"event_day": {"$exists": False}}]},
         {"_id": 0}
-    ).to_list(100)
+    ):
+        # Events the backfill has not reached yet are matched on event_date
+        if event_iso_day(event) == today:
+            event.pop('event_day', None)
+            events.append(event)
     return events
 
+def events_cursor(event: dict) -> str:
+    """Keyset cursor of an event: '<event_day YYYY-MM-DD, empty if none>,<_id>'"""
+    day = event.get('event_day')
+    return f"{day.date().isoformat() if day else ''},{event['_id']}"
+
+def events_after_cursor(cursor: str) -> dict:
+    """Query for the events sorted after a cursor (undated events sort first, as null does)"""
+    day_part, _, object_id = cursor.partition(',')
+    day = iso_day(day_part) if day_part else None
+    if not ObjectId.is_valid(object_id) or (day_part and day is None):
+        raise HTTPException(status_code=400, detail="Invalid cursor, pass back X-Next-Cursor as is")
+    after_day = {"event_day": {"$gt": day}} if day else {"event_day": {"$ne": None}}
+    return {"$or": [{"event_day": day, "_id": {"$gt": ObjectId(object_id)}}, after_day]}
+
 @api_router.get("/events")
-async def get_events(current_user: dict = Depends(get_current_user)):
-    """Get all events"""
-    events = await db.events.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
+async def get_events(response: Response, cursor: Optional[str] = None, limit: int = 200,
+                     current_user: dict = Depends(get_current_user)):
+    """Get events by date, one page at a time (for a date range, use /events/calendar)
+    
+    Undated events come first. The next page's cursor, if any, is returned in
+    the X-Next-Cursor header; pass it back as cursor.
+    """
+    limit = max(1, min(limit, EVENTS_PAGE_MAX_LIMIT))
+    query = {"owner_id": current_user['id']}
+    if cursor:
+        query.update(events_after_cursor(cursor))
+    events = await db.events.find(query).sort([("event_day", 1), ("_id", 1)]).limit(limit + 1).to_list(limit + 1)
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers["X-Next-Cursor"] = events_cursor(events[-1])
+    for event in events:
+        event.pop('_id')
+        event.pop('event_day', None)
     return events
 
 @api_router.post("/events")
@@ -842,7 +2582,8 @@ async def create_event(event_data: dict, current_user: dict = Depends(get_curren
         "person_id": event_data.get('person_id'),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.events.insert_one(event)
+    await db.events.insert_one({**event, "event_day": iso_day(event['event_date'])})
+    await bump_events_revision(current_user['id'])
     return event
 
 @api_router.delete("/events/{event_id}")
@@ -851,12 +2592,129 @@ async def delete_event(event_id: str, current_user: dict = Depends(get_current_u
     result = await db.events.delete_one({"id": event_id, "owner_id": current_user['id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await bump_events_revision(current_user['id'])
     return {"success": True}
 
 # ============================================================================
 # NOTIFICATIONS ENDPOINTS
 # ============================================================================
 
+class NotificationHub:
+    """In-process pub/sub: pushes notification events to the open SSE streams of a user"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = {}
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+
+    def publish(self, user_id: str, event: str, data: Any):
+        for queue in self.subscribers.get(user_id, ()):
+            if queue.full():
+                # Slow client: drop its oldest event rather than block the publisher
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+notification_hub = NotificationHub(NOTIFICATION_STREAM_QUEUE_SIZE)
+
+async def seed_unread_counter(user_id: str):
+    """Create a new user's unread counter, so changes never have to seed it from a count"""
+    await db.notification_counters.update_one({"user_id": user_id}, {"$setOnInsert": {"unread": 0}}, upsert=True)
+
+async def recount_unread(user_id: str) -> int:
+    """Reset a user's counter from the notifications themselves (legacy accounts, or a counter gone negative)"""
+    unread = await db.notifications.count_documents({"user_id": user_id, "read": False})
+    try:
+        await db.notification_counters.update_one({"user_id": user_id}, {"$set": {"unread": unread}}, upsert=True)
+    except DuplicateKeyError:
+        # Created concurrently: retry as a plain update
+        await db.notification_counters.update_one({"user_id": user_id}, {"$set": {"unread": unread}})
+    return unread
+
+async def get_unread_notification_count(user_id: str) -> int:
+    """Unread count from the maintained counter, recounted when missing or negative"""
+    counter = await db.notification_counters.find_one({"user_id": user_id}, {"_id": 0, "unread": 1})
+    if counter is None or counter.get('unread', 0) < 0:
+        return await recount_unread(user_id)
+    return counter.get('unread', 0)
+
+async def change_unread_count(user_id: str, delta: int):
+    """Atomically adjust a user's unread counter and push the new value"""
+    if not delta:
+        return
+    counter = await db.notification_counters.find_one_and_update(
+        {"user_id": user_id},
+        {"$inc": {"unread": delta}},
+        return_document=ReturnDocument.AFTER,
+        projection={"_id": 0, "unread": 1}
+    )
+    if counter is None or counter.get('unread', 0) < 0:
+        # Only accounts created before counters were seeded have none; the count includes this change
+        unread = await recount_unread(user_id)
+    else:
+        unread = counter['unread']
+    notification_hub.publish(user_id, "unread_count", {"count": unread})
+
+@job_handler("recount_unread_counters")
+async def run_recount_unread_counters(ctx: JobContext) -> dict:
+    """Correct unread counters that drifted from the notifications, a batch of users at a time
+
+    A counter is only overwritten if it still holds the value the recount
+    started from, so a concurrent $inc is never lost; such a counter is
+    checked again on the next run.
+    """
+    fixed = ctx.progress.get('fixed', 0)
+    async for batch in iter_job_batches(db.notification_counters, {}, ctx.checkpoint.get('after_id'),
+                                        {"_id": 1, "user_id": 1, "unread": 1}):
+        counted = await db.notifications.aggregate([
+            {"$match": {"user_id": {"$in": [counter['user_id'] for counter in batch]}, "read": False}},
+            {"$group": {"_id": "$user_id", "unread": {"$sum": 1}}},
+        ]).to_list(None)
+        actual = {row['_id']: row['unread'] for row in counted}
+        updates = [
+            UpdateOne({"_id": counter['_id'], "unread": counter.get('unread')},
+                      {"$set": {"unread": actual.get(counter['user_id'], 0)}})
+            for counter in batch
+            if counter.get('unread') != actual.get(counter['user_id'], 0)
+        ]
+        if updates:
+            result = await db.notification_counters.bulk_write(updates, ordered=False)
+            fixed += result.modified_count
+        await ctx.save({"after_id": str(batch[-1]['_id'])}, fixed=fixed)
+    return {"fixed": fixed}
+
+async def insert_notification(user_id: str, notification_type: str, title: str, message: str, **extra) -> dict:
+    """Create a notification, bump the recipient's unread counter and push it"""
+    notification = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "type": notification_type,
+        "title": title,
+        "message": message,
+        **extra,
+        "read": False,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.notifications.insert_one(notification)
+    notification.pop('_id', None)
+    notification_hub.publish(user_id, "notification", notification)
+    await change_unread_count(user_id, 1)
+    return notification
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 @api_router.get("/notifications")
 async def get_notifications(current_user: dict = Depends(get_current_user)):
     """Get all notifications for the current user"""
@@ -869,28 +2727,63 @@ async def get_notifications(current_user: dict = Depends(get_current_user)):
 @api_router.get("/notifications/unread-count")
 async def get_unread_count(current_user: dict = Depends(get_current_user)):
     """Get unread notifications count"""
-    count = await db.notifications.count_documents({
-        "user_id": current_user['id'],
-        "read": False
-    })
+    count = await get_unread_notification_count(current_user['id'])
     return {"count": count}
 
+@api_router.get("/notifications/stream")
+async def stream_notifications(request: Request, token: str):
+    """Server-sent events: unread count changes and new notifications.
+    
+    EventSource cannot send headers, so the JWT is passed as ?token=.
+    """
+    payload = decode_token(token)
+    user = await get_cached_user(payload['sub'])
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    user_id = user['id']
+    
+    # Subscribe before reading the count so no change is missed in between
+    queue = notification_hub.subscribe(user_id)
+    try:
+        unread = await get_unread_notification_count(user_id)
+    except Exception:
+        notification_hub.unsubscribe(user_id, queue)
+        raise
+    
+    async def events():
+        try:
+            yield sse_event("unread_count", {"count": unread})
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=NOTIFICATION_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event(event, data)
+        finally:
+            notification_hub.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @api_router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: dict = Depends(get_current_user)):
     """Mark a notification as read"""
-    await db.notifications.update_one(
-        {"id": notification_id, "user_id": current_user['id']},
+    result = await db.notifications.update_one(
+        {"id": notification_id, "user_id": current_user['id'], "read": False},
         {"$set": {"read": True, "read_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await change_unread_count(current_user['id'], -result.modified_count)
     return {"success": True}
 
 @api_router.put("/notifications/read-all")
 async def mark_all_notifications_read(current_user: dict = Depends(get_current_user)):
     """Mark all notifications as read"""
-    await db.notifications.update_many(
+    result = await db.notifications.update_many(
         {"user_id": current_user['id'], "read": False},
         {"$set": {"read": True, "read_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await change_unread_count(current_user['id'], -result.modified_count)
     return {"success": True}
 
 # ============================================================================
@@ -913,6 +2806,247 @@ async def export_data(current_user: dict = Depends(get_current_user)):
         "exported_at": datetime.now(timezone.utc).isoformat()
     }
 
+def gdpr_export_collections(user: dict) -> list:
+    """(file name, collection, filter, projection) for everything stored about a user"""
+    user_id = user['id']
+    return [
+        ("user.ndjson", db.users, {"id": user_id}, {"_id": 0, "password_hash": 0}),
+        ("persons.ndjson", db.persons, {"owner_id": user_id}, {"_id": 0}),
+        ("links.ndjson", db.links, {"owner_id": user_id}, {"_id": 0}),
+        ("events.ndjson", db.events, {"owner_id": user_id}, {"_id": 0}),
+        ("notifications.ndjson", db.notifications, {"user_id": user_id}, {"_id": 0}),
+        ("user_reminders.ndjson", db.user_reminders, {"user_id": user_id}, {"_id": 0}),
+        ("reminder_receipts.ndjson", db.reminder_receipts, {"user_id": user_id}, {"_id": 0}),
+        ("collaborators.ndjson", db.collaborators, {"$or": [{"owner_id": user_id}, {"email": user.get('email')}]}, {"_id": 0}),
+        ("contributions.ndjson", db.contributions, {"$or": [{"tree_owner_id": user_id}, {"contributor_id": user_id}]}, {"_id": 0}),
+        ("chat_messages.ndjson", db.chat_messages, {"$or": [{"tree_owner_id": user_id}, {"sender_id": user_id}]}, {"_id": 0}),
+        ("chat_buckets.ndjson", db.chat_buckets, {"tree_owner_id": user_id}, {"_id": 0}),
+    ]
+
+def gdpr_export_path(export_id: str) -> str:
+    """Scratch file the archive of an export is built in before it is stored"""
+    return os.path.join(GDPR_EXPORT_DIR, f"aila_export_{export_id}.zip")
+
+def gdpr_export_bucket() -> AsyncIOMotorGridFSBucket:
+    """GridFS bucket holding the finished archives, keyed by export id"""
+    return AsyncIOMotorGridFSBucket(db, bucket_name=GDPR_EXPORT_BUCKET, chunk_size_bytes=GDPR_EXPORT_CHUNK_SIZE)
+
+async def delete_export_archive(export_id: str):
+    """Remove an export's archive from GridFS, including the chunks of an interrupted upload"""
+    try:
+        await gdpr_export_bucket().delete(export_id)
+    except NoFile:
+        pass
+
+@job_handler("gdpr_export")
+async def run_gdpr_export(ctx: JobContext) -> dict:
+    """Write every collection owned by a user into a zip of NDJSON files, one batch at a time
+    
+    Runs on the job runner, so an export whose worker died is picked up again
+    once its lease expires; the archive is then rewritten from scratch.
+    """
+    job_id = ctx.params['export_id']
+    path = gdpr_export_path(job_id)
+    counts = {}
+    try:
+        user = await db.users.find_one({"id": ctx.params['user_id']}, {"_id": 0, "password_hash": 0})
+        if not user:
+            raise ValueError("User not found")
+        await db.export_jobs.update_one(
+            {"id": job_id},
+            {"$set": {"status": "running", "started_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        archive = await asyncio.to_thread(zipfile.ZipFile, path, 'w', zipfile.ZIP_DEFLATED)
+        try:
+            for name, collection, query, projection in gdpr_export_collections(user):
+                entry = await asyncio.to_thread(archive.open, name, 'w', force_zip64=True)
+                count = 0
+                buffer = []
+                async for doc in collection.find(query, projection).batch_size(TREE_STREAM_BATCH_SIZE):
+                    buffer.append(json.dumps(doc, default=_json_default, ensure_ascii=False))
+                    count += 1
+                    if len(buffer) >= TREE_STREAM_BATCH_SIZE:
+                        await asyncio.to_thread(entry.write, ("\n".join(buffer) + "\n").encode('utf-8'))
+                        buffer = []
+                if buffer:
+                    await asyncio.to_thread(entry.write, ("\n".join(buffer) + "\n").encode('utf-8'))
+                await asyncio.to_thread(entry.close)
+                counts[name.rsplit('.', 1)[0]] = count
+                await db.export_jobs.update_one({"id": job_id}, {"$set": {"counts": counts}})
+                await ctx.save(counts=counts)
+            
+            manifest = {"format": "AILA GDPR export", "version": "1.0", "user_id": user['id'],
+                        "exported_at": datetime.now(timezone.utc).isoformat(), "counts": counts}
+            await asyncio.to_thread(archive.writestr, "manifest.json", json.dumps(manifest, indent=2))
+        finally:
+            await asyncio.to_thread(archive.close)
+        
+        # A previous attempt may have died halfway through its upload
+        await delete_export_archive(job_id)
+        with open(path, 'rb') as handle:
+            await gdpr_export_bucket().upload_from_stream_with_id(
+                job_id, f"aila_export_{job_id}.zip", handle, metadata={"user_id": user['id']}
+            )
+        size = os.path.getsize(path)
+        os.remove(path)
+        
+        await db.export_jobs.update_one(
+            {"id": job_id},
+            {"$set": {
+                "status": "completed",
+                "size_bytes": size,
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "expires_at": (datetime.now(timezone.utc) + timedelta(hours=GDPR_EXPORT_TTL_HOURS)).isoformat()
+            }}
+        )
+        logger.info(f"GDPR export {job_id} completed for {user.get('email')}: {counts}")
+        return {"export_id": job_id, "counts": counts}
+    except Exception as e:
+        logger.error(f"GDPR export {job_id} failed: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        await delete_export_archive(job_id)
+        await db.export_jobs.update_one(
+            {"id": job_id},
+            {"$set": {"status": "failed", "error": str(e), "finished_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        raise
+
+@job_handler("gdpr_export_sweep")
+async def run_gdpr_export_sweep(ctx: JobContext) -> dict:
+    """Delete expired export archives and mark their exports expired"""
+    now = datetime.now(timezone.utc).isoformat()
+    expired = ctx.progress.get('expired', 0)
+    async for batch in iter_job_batches(db.export_jobs, {"status": "completed", "expires_at": {"$lt": now}},
+                                        ctx.checkpoint.get('after_id'), {"_id": 1, "id": 1}):
+        for job in batch:
+            await delete_export_archive(job['id'])
+        await db.export_jobs.update_many(
+            {"_id": {"$in": [job['_id'] for job in batch]}}, {"$set": {"status": "expired"}}
+        )
+        expired += len(batch)
+        await ctx.save({"after_id": str(batch[-1]['_id'])}, expired=expired)
+    return {"expired": expired}
+
+async def delete_export_archives(user_id: str):
+    """Remove a user's export archives and jobs (archives must not outlive the account)"""
+    async for job in db.export_jobs.find({"user_id": user_id}, {"_id": 0, "id": 1}):
+        await delete_export_archive(job['id'])
+    await db.export_jobs.delete_many({"user_id": user_id})
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Parse a single 'bytes=start-end' range into inclusive offsets; raises 416 when unsatisfiable"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[6:].strip().partition("-")
+    try:
+        if start:
+            first, last = int(start), int(end) if end else size - 1
+        else:
+            first, last = size - int(end), size - 1
+    except ValueError:
+        return None
+    first, last = max(first, 0), min(last, size - 1)
+    if first > last:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return first, last
+
+async def iter_grid_range(grid_out, first: int, last: int):
+    """Yield bytes first..last (inclusive) of a GridFS file in chunks"""
+    try:
+        grid_out.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(GDPR_EXPORT_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        grid_out.close()
+
+@api_router.post("/gdpr/export/jobs", status_code=202)
+async def create_export_job(current_user: dict = Depends(get_current_user)):
+    """Start a complete GDPR export (zip of NDJSON files) in the background"""
+    active = await db.export_jobs.find_one(
+        {"user_id": current_user['id'], "status": {"$in": ["queued", "running"]}}, {"_id": 0}
+    )
+    if active:
+        # Only trust the export while its runner job is alive; otherwise it can never finish
+        runner_job = active.get('runner_job_id') and await db.jobs.find_one(
+            {"id": active['runner_job_id'], "status": {"$in": ["queued", "running"]}}, {"_id": 1}
+        )
+        if runner_job:
+            return {"job_id": active['id'], "status": active['status']}
+        await db.export_jobs.update_one(
+            {"id": active['id'], "status": active['status']},
+            {"$set": {"status": "failed", "error": "Export interrupted",
+                      "finished_at": datetime.now(timezone.utc).isoformat()}}
+        )
+    
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": current_user['id'],
+        "status": "queued",
+        "counts": {},
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.export_jobs.insert_one(job)
+    runner_job = await job_runner.submit(
+        "gdpr_export", {"export_id": job['id'], "user_id": current_user['id']}, created_by=current_user['id'], unique=False
+    )
+    await db.export_jobs.update_one({"id": job['id']}, {"$set": {"runner_job_id": runner_job['id']}})
+    
+    return {"job_id": job['id'], "status": "queued"}
+
+@api_router.get("/gdpr/export/jobs/{job_id}")
+async def get_export_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get the status of a GDPR export"""
+    job = await db.export_jobs.find_one({"id": job_id, "user_id": current_user['id']}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job['status'] == 'completed':
+        job['download_url'] = f"/api/gdpr/export/jobs/{job_id}/download"
+    return job
+
+@api_router.get("/gdpr/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Download a finished GDPR export, with support for Range requests"""
+    job = await db.export_jobs.find_one({"id": job_id, "user_id": current_user['id']}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    
+    if job.get('expires_at', '') < datetime.now(timezone.utc).isoformat():
+        await delete_export_archive(job_id)
+        await db.export_jobs.update_one({"id": job_id}, {"$set": {"status": "expired"}})
+        raise HTTPException(status_code=410, detail="Export expired, please request a new one")
+    try:
+        grid_out = await gdpr_export_bucket().open_download_stream(job_id)
+    except NoFile:
+        logger.error(f"GDPR export {job_id} is completed but its archive is missing")
+        raise HTTPException(status_code=410, detail="Export archive is no longer available, please request a new one")
+    
+    size = grid_out.length
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="aila_export_{job["created_at"][:10]}.zip"',
+        "ETag": f'"{job_id}-{size}"'
+    }
+    byte_range = parse_byte_range(request.headers.get("range"), size)
+    # A stale If-Range validator means the client must restart from scratch
+    if byte_range and request.headers.get("if-range", headers["ETag"]) != headers["ETag"]:
+        byte_range = None
+    if byte_range is None:
+        return StreamingResponse(iter_grid_range(grid_out, 0, size - 1), media_type="application/zip",
+                                 headers={**headers, "Content-Length": str(size)})
+    
+    first, last = byte_range
+    headers.update({"Content-Range": f"bytes {first}-{last}/{size}", "Content-Length": str(last - first + 1)})
+    return StreamingResponse(iter_grid_range(grid_out, first, last), status_code=206,
+                             media_type="application/zip", headers=headers)
+
 @api_router.delete("/gdpr/delete-account")
 async def delete_account(current_user: dict = Depends(get_current_user)):
     """Delete user account and all associated data"""
@@ -923,8 +3057,14 @@ async def delete_account(current_user: dict = Depends(get_current_user)):
     await db.links.delete_many({"owner_id": user_id})
     await db.events.delete_many({"owner_id": user_id})
     await db.notifications.delete_many({"user_id": user_id})
+    await db.notification_counters.delete_many({"user_id": user_id})
     await db.user_reminders.delete_many({"user_id": user_id})
+    await db.reminder_receipts.delete_many({"user_id": user_id})
     await db.users.delete_one({"id": user_id})
+    invalidate_cached_user(user_id)
+    await forget_tree_changes(user_id)
+    
+    await delete_export_archives(user_id)
     
     logger.info(f"User account deleted: {current_user['email']}")
     
@@ -934,36 +3074,194 @@ async def delete_account(current_user: dict = Depends(get_current_user)):
 # TREE EXPORT ENDPOINTS
 # ============================================================================
 
-@api_router.get("/tree/export/json")
-async def export_tree_json(current_user: dict = Depends(get_current_user)):
-    """Export family tree as JSON"""
-    persons = await db.persons.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    links = await db.links.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    
-    return {
+async def stream_tree_json(owner: dict):
+    """Yield the JSON export object piece by piece, persons and links straight from the Motor cursors"""
+    head = {
         "format": "AILA JSON",
         "version": "1.0",
         "exported_at": datetime.now(timezone.utc).isoformat(),
         "owner": {
-            "email": current_user.get('email'),
-            "name": f"{current_user.get('first_name', '')} {current_user.get('last_name', '')}".strip()
+            "email": owner.get('email'),
+            "name": f"{owner.get('first_name', '')} {owner.get('last_name', '')}".strip()
         },
-        "persons": persons,
-        "links": links,
-        "stats": {
-            "total_persons": len(persons),
-            "total_links": len(links)
-        }
     }
+    # The object is left open so the arrays and stats can follow
+    yield json.dumps(head, ensure_ascii=False, separators=(",", ":"))[:-1].encode('utf-8')
+    
+    counts = {}
+    for key, collection in (("persons", db.persons), ("links", db.links)):
+        yield f',"{key}":['.encode('utf-8')
+        count = 0
+        buffer = []
+        async for doc in collection.find({"owner_id": owner['id']}, {"_id": 0}).batch_size(TREE_STREAM_BATCH_SIZE):
+            buffer.append(json.dumps(doc, default=_json_default, ensure_ascii=False, separators=(",", ":")))
+            count += 1
+            if len(buffer) >= TREE_STREAM_BATCH_SIZE:
+                yield (("," if count > len(buffer) else "") + ",".join(buffer)).encode('utf-8')
+                buffer = []
+        if buffer:
+            yield (("," if count > len(buffer) else "") + ",".join(buffer)).encode('utf-8')
+        yield b']'
+        counts[key] = count
+    
+    stats = {"total_persons": counts["persons"], "total_links": counts["links"]}
+    yield f',"stats":{json.dumps(stats)}}}'.encode('utf-8')
 
-@api_router.get("/tree/export/gedcom")
-async def export_tree_gedcom(current_user: dict = Depends(get_current_user)):
-    """Export family tree as GEDCOM format"""
-    persons = await db.persons.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    links = await db.links.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
+@api_router.get("/tree/export/json")
+async def export_tree_json(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    """Export family tree as JSON"""
+    not_modified = await check_tree_etag(current_user['id'], request, response)
+    if not_modified:
+        return not_modified
+    
+    return StreamingResponse(
+        stream_tree_json(current_user),
+        media_type="application/json",
+        headers={
+            "ETag": response.headers["ETag"],
+            "Cache-Control": response.headers["Cache-Control"],
+            "Vary": response.headers["Vary"]
+        }
+    )
+
+GEDCOM_MONTH_NAMES = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+GEDCOM_MAX_LINE_VALUE = 240
+
+def gedcom_xref(prefix: str, key: str) -> str:
+    """Stable, collision-free xref: the full UUID as hex, or a SHA-1 of any other id"""
+    try:
+        token = uuid.UUID(key).hex
+    except (ValueError, TypeError, AttributeError):
+        token = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:32]
+    return f"@{prefix}{token.upper()}@"
+
+def iso_to_gedcom_date(value: str) -> str:
+    """'1950-03-12' -> '12 MAR 1950', '1950-03' -> 'MAR 1950'; other forms are kept as is"""
+    parts = value.strip()[:10].split('-')
+    try:
+        if len(parts) == 3:
+            return f"{int(parts[2])} {GEDCOM_MONTH_NAMES[int(parts[1]) - 1]} {int(parts[0])}"
+        if len(parts) == 2:
+            return f"{GEDCOM_MONTH_NAMES[int(parts[1]) - 1]} {int(parts[0])}"
+    except (ValueError, IndexError):
+        pass
+    return " ".join(value.split())
+
+def gedcom_text(level: int, tag: str, text: str) -> List[str]:
+    """Emit a multi-line value as TAG + CONT lines, splitting long lines with CONC"""
+    lines = []
+    for index, paragraph in enumerate(str(text).replace('\r\n', '\n').split('\n')):
+        chunks = [paragraph[i:i + GEDCOM_MAX_LINE_VALUE] for i in range(0, len(paragraph), GEDCOM_MAX_LINE_VALUE)] or ['']
+        for chunk_index, chunk in enumerate(chunks):
+            if index == 0 and chunk_index == 0:
+                lines.append(f"{level} {tag} {chunk}".rstrip())
+            else:
+                lines.append(f"{level + 1} {'CONC' if chunk_index else 'CONT'} {chunk}".rstrip())
+    return lines
+
+def gedcom_individual_lines(person: dict) -> List[str]:
+    """Map a person document to an INDI record"""
+    first_name = " ".join((person.get('first_name') or '').replace('/', ' ').split())
+    last_name = " ".join((person.get('last_name') or '').replace('/', ' ').split())
+    lines = [
+        f"0 {gedcom_xref('I', person.get('id'))} INDI",
+        f"1 NAME {first_name} /{last_name}/",
+    ]
+    if first_name:
+        lines.append(f"2 GIVN {first_name}")
+    if last_name:
+        lines.append(f"2 SURN {last_name}")
+    gender = person.get('gender')
+    if gender:
+        lines.append(f"1 SEX {'M' if gender == 'male' else 'F' if gender == 'female' else 'U'}")
+    for tag, field in (("BIRT", "birth_date"), ("DEAT", "death_date")):
+        if person.get(field):
+            lines.append(f"1 {tag}")
+            lines.append(f"2 DATE {iso_to_gedcom_date(person[field])}")
+    if person.get('photo_url') and not person['photo_url'].startswith('data:'):
+        lines.append("1 OBJE")
+        lines.append(f"2 FILE {person['photo_url']}")
+    if person.get('bio'):
+        lines.extend(gedcom_text(1, "NOTE", person['bio']))
+    return lines
+
+def gedcom_family_pipeline(owner_id: str) -> list:
+    """Aggregate links into families: one document per couple (partner_1 <= partner_2) with its children
+    
+    A child's parents are sorted and paired up in that order, so a child with
+    more than two parents (e.g. birth and adoptive parents) is listed in one
+    family per pair and each parent link is exported exactly once.
+    """
+    is_spouse = {"$eq": ["$link_type", "spouse"]}
+    is_child = {"$eq": ["$link_type", "child"]}
+    is_couple = {"$eq": ["$_id.child", None]}
+    return [
+        {"$match": {"owner_id": owner_id, "link_type": {"$in": ["parent", "child", "spouse"]}}},
+        {"$project": {
+            "_id": 0,
+            "child": {"$cond": [is_spouse, None, {"$cond": [is_child, "$person_id_1", "$person_id_2"]}]},
+            "parent": {"$cond": [is_spouse, None, {"$cond": [is_child, "$person_id_2", "$person_id_1"]}]},
+            "partner_1": {"$cond": [is_spouse, {"$min": ["$person_id_1", "$person_id_2"]}, None]},
+            "partner_2": {"$cond": [is_spouse, {"$max": ["$person_id_1", "$person_id_2"]}, None]}
+        }},
+        # Parent links collapse into one document per child with its sorted, distinct parents;
+        # spouse links into one per couple
+        {"$group": {"_id": {"child": "$child", "parent": "$parent",
+                            "partner_1": "$partner_1", "partner_2": "$partner_2"}}},
+        {"$sort": {"_id.parent": 1}},
+        {"$group": {
+            "_id": {"child": "$_id.child", "partner_1": "$_id.partner_1", "partner_2": "$_id.partner_2"},
+            "parents": {"$push": "$_id.parent"}
+        }},
+        # Parents 0 and 1 form the first pair, 2 and 3 the second, and so on
+        {"$unwind": {"path": "$parents", "includeArrayIndex": "rank"}},
+        {"$group": {
+            "_id": {"child": "$_id.child", "partner_1": "$_id.partner_1", "partner_2": "$_id.partner_2",
+                    "pair": {"$floor": {"$divide": ["$rank", 2]}}},
+            "low": {"$min": "$parents"},
+            "high": {"$max": "$parents"},
+            "size": {"$sum": 1}
+        }},
+        {"$group": {
+            "_id": {
+                "partner_1": {"$cond": [is_couple, "$_id.partner_1", "$low"]},
+                "partner_2": {"$cond": [is_couple, "$_id.partner_2", {"$cond": [{"$eq": ["$size", 2]}, "$high", None]}]}
+            },
+            "children": {"$addToSet": "$_id.child"}
+        }},
+        {"$sort": {"_id.partner_1": 1, "_id.partner_2": 1}},
+    ]
+
+def gedcom_family_lines(family: dict, genders: dict) -> List[str]:
+    """Map an aggregated family to a FAM record, using gender to pick HUSB/WIFE
+    
+    genders maps the id of every exported INDI to its gender; anyone else is
+    left out of the record, and a record with fewer than two members is skipped.
+    """
+    pids = [family['_id'].get(key) for key in ("partner_1", "partner_2")]
+    partners = [(pid, genders[pid]) for pid in pids if pid in genders]
+    children = sorted(child for child in family.get('children', []) if child in genders)
+    if len(partners) + len(children) < 2:
+        return []
+    # HUSB for the male (or first) partner, WIFE for the female (or second) one
+    partners.sort(key=lambda partner: {"male": 0, "female": 1}.get(partner[1], 2))
+    if len(partners) == 1:
+        roles = ["WIFE" if partners[0][1] == 'female' else "HUSB"]
+    else:
+        roles = ["HUSB", "WIFE"]
     
-    # Generate GEDCOM content
-    gedcom_lines = [
+    # Keyed on the aggregated couple, so leaving someone out cannot make two families collide
+    couple_key = "|".join(sorted(pid for pid in pids if pid))
+    lines = [f"0 {gedcom_xref('F', couple_key)} FAM"]
+    for role, (pid, _) in zip(roles, partners):
+        lines.append(f"1 {role} {gedcom_xref('I', pid)}")
+    for child in children:
+        lines.append(f"1 CHIL {gedcom_xref('I', child)}")
+    return lines
+
+async def stream_tree_gedcom(owner_id: str):
+    """Yield a tree as GEDCOM 5.5.1: INDI records from the persons cursor, FAM records from the links aggregation"""
+    header = [
         "0 HEAD",
         "1 SOUR AILA",
         "2 VERS 1.0",
@@ -973,29 +3271,337 @@ async def export_tree_gedcom(current_user: dict = Depends(get_current_user)):
         "1 CHAR UTF-8",
         f"1 DATE {datetime.now(timezone.utc).strftime('%d %b %Y').upper()}",
     ]
+    yield ("\n".join(header) + "\n").encode('utf-8')
     
-    # Add individuals
-    for person in persons:
-        pid = person.get('id', '')[:8]
-        gedcom_lines.append(f"0 @I{pid}@ INDI")
-        gedcom_lines.append(f"1 NAME {person.get('first_name', '')} /{person.get('last_name', '')}/")
-        if person.get('gender'):
-            sex = 'M' if person.get('gender') == 'male' else 'F' if person.get('gender') == 'female' else 'U'
-            gedcom_lines.append(f"1 SEX {sex}")
-        if person.get('birth_date'):
-            gedcom_lines.append("1 BIRT")
-            gedcom_lines.append(f"2 DATE {person.get('birth_date')}")
-        if person.get('death_date'):
-            gedcom_lines.append("1 DEAT")
-            gedcom_lines.append(f"2 DATE {person.get('death_date')}")
-    
-    gedcom_lines.append("0 TRLR")
+    buffer = []
+    # FAM records may only point at the INDI records written here
+    genders = {}
+    cursor = db.persons.find({"owner_id": owner_id}, {"_id": 0}).sort("id", 1).batch_size(TREE_STREAM_BATCH_SIZE)
+    async for person in cursor:
+        if person.get('id'):
+            genders[person['id']] = person.get('gender')
+        buffer.extend(gedcom_individual_lines(person))
+        if len(buffer) >= TREE_STREAM_BATCH_SIZE:
+            yield ("\n".join(buffer) + "\n").encode('utf-8')
+            buffer = []
+    
+    families = db.links.aggregate(gedcom_family_pipeline(owner_id), allowDiskUse=True, batchSize=TREE_STREAM_BATCH_SIZE)
+    async for family in families:
+        buffer.extend(gedcom_family_lines(family, genders))
+        if len(buffer) >= TREE_STREAM_BATCH_SIZE:
+            yield ("\n".join(buffer) + "\n").encode('utf-8')
+            buffer = []
+    
+    buffer.append("0 TRLR")
+    yield ("\n".join(buffer) + "\n").encode('utf-8')
+
+@api_router.get("/tree/export/gedcom")
+async def export_tree_gedcom(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    """Export family tree as GEDCOM format"""
+    not_modified = await check_tree_etag(current_user['id'], request, response)
+    if not_modified:
+        return not_modified
+    
+    filename = f"aila_tree_{datetime.now(timezone.utc).strftime('%Y%m%d')}.ged"
+    return StreamingResponse(
+        stream_tree_gedcom(current_user['id']),
+        media_type="text/x-gedcom; charset=utf-8",
+        headers={
+            "ETag": response.headers["ETag"],
+            "Cache-Control": response.headers["Cache-Control"],
+            "Vary": response.headers["Vary"],
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        }
+    )
+
+# ============================================================================
+# GEDCOM IMPORT
+# ============================================================================
+
+GEDCOM_LINE_RE = re.compile(r'^\s*(\d+)\s+(?:(@[^@]+@)\s+)?(\S+)(?:\s(.*))?$')
+GEDCOM_MONTHS = {
+    "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12,
+}
+
+def gedcom_date_to_iso(value: str) -> Optional[str]:
+    """'12 MAR 1950' -> '1950-03-12', 'MAR 1950' -> '1950-03', '1950' -> '1950'; other forms are kept as is"""
+    if not value:
+        return None
+    parts = value.strip().upper().split()
+    try:
+        if len(parts) == 3 and parts[1] in GEDCOM_MONTHS:
+            return datetime(int(parts[2]), GEDCOM_MONTHS[parts[1]], int(parts[0])).date().isoformat()
+        if len(parts) == 2 and parts[0] in GEDCOM_MONTHS and parts[1].isdigit():
+            return f"{int(parts[1]):04d}-{GEDCOM_MONTHS[parts[0]]:02d}"
+        if len(parts) == 1 and parts[0].isdigit():
+            return f"{int(parts[0]):04d}"
+    except ValueError:
+        pass
+    return value.strip()
+
+def iter_gedcom_records(lines):
+    """Group GEDCOM lines into level-0 records: yields (xref, tag, [(level, tag, value), ...])"""
+    current = None
+    for line in lines:
+        match = GEDCOM_LINE_RE.match(line)
+        if not match:
+            continue
+        level, xref, tag, value = int(match.group(1)), match.group(2), match.group(3).upper(), match.group(4) or ''
+        if level == 0:
+            if current:
+                yield current
+            current = (xref, tag, [])
+        elif current:
+            current[2].append((level, tag, value))
+    if current:
+        yield current
+
+def gedcom_individual(lines: list) -> dict:
+    """Map the lines of an INDI record to person fields"""
+    person = {"first_name": "", "last_name": "", "birth_date": None, "death_date": None,
+              "gender": None, "photo_url": None, "bio": None}
+    event = None
+    name_seen = False
+    in_note = False
+    notes = []
+    for level, tag, value in lines:
+        if level == 1:
+            event = tag
+            in_note = tag == 'NOTE'
+            if tag == 'NAME' and not name_seen:
+                name_seen = True
+                given, _, rest = value.partition('/')
+                person["first_name"] = given.strip()
+                person["last_name"] = rest.partition('/')[0].strip()
+            elif tag == 'SEX':
+                person["gender"] = {"M": "male", "F": "female"}.get(value.strip().upper())
+            elif tag == 'NOTE' and value and not value.startswith('@'):
+                notes.append(value)
+        elif level == 2:
+            if event == 'NAME' and tag == 'GIVN' and value:
+                person["first_name"] = value.strip()
+            elif event == 'NAME' and tag == 'SURN' and value:
+                person["last_name"] = value.strip()
+            elif event == 'BIRT' and tag == 'DATE':
+                person["birth_date"] = gedcom_date_to_iso(value)
+            elif event == 'DEAT' and tag == 'DATE':
+                person["death_date"] = gedcom_date_to_iso(value)
+            elif event == 'OBJE' and tag == 'FILE' and value.startswith('http'):
+                person["photo_url"] = value.strip()
+            elif in_note and tag == 'CONT':
+                notes.append("\n" + value)
+            elif in_note and tag == 'CONC':
+                notes.append(value)
+    if notes:
+        person["bio"] = "".join(notes)
+    return with_anniversary_mmdd(person)
+
+def gedcom_family(lines: list) -> tuple:
+    """Return (partner xrefs, child xrefs) of a FAM record"""
+    partners, children = [], []
+    for level, tag, value in lines:
+        if level == 1 and tag in ('HUSB', 'WIFE') and value:
+            partners.append(value.strip())
+        elif level == 1 and tag == 'CHIL' and value:
+            children.append(value.strip())
+    return partners, children
+
+def iter_gedcom_file(path: str, progress: dict):
+    """Decode a GEDCOM file line by line, counting bytes read into progress"""
+    with open(path, 'rb') as handle:
+        for raw in handle:
+            progress["bytes_read"] += len(raw)
+            if progress["bytes_read"] == len(raw):
+                raw = raw.lstrip(b'\xef\xbb\xbf')
+            yield raw.decode('utf-8', errors='replace').rstrip('\r\n')
+
+def read_gedcom_records(records, count: int) -> list:
+    """Pull and parse up to count records: [(xref, tag, person dict | (partners, children) | None)]
+    
+    Blocking (file reads and parsing); run_gedcom_import calls it in a worker thread.
+    """
+    parsed = []
+    for xref, tag, lines in records:
+        if tag == 'INDI' and xref:
+            parsed.append((xref, tag, gedcom_individual(lines)))
+        elif tag == 'FAM':
+            parsed.append((xref, tag, gedcom_family(lines)))
+        else:
+            parsed.append((xref, tag, None))
+        if len(parsed) >= count:
+            break
+    return parsed
+
+async def run_gedcom_import(import_id: str, owner_id: str, path: str):
+    """Parse a spooled GEDCOM file and write persons/links in unordered insert_many batches"""
+    progress = {"bytes_read": 0}
+    stats = {"persons": 0, "links": 0, "skipped_links": 0, "skipped_records": 0, "failed": 0, "records": 0}
+    started = time.perf_counter()
+    xref_ids = {}
+    defined = set()
+    deferred = []
+    persons_batch, links_batch = [], []
+    now = datetime.now(timezone.utc).isoformat()
+    
+    def person_id_for(xref: str) -> str:
+        if xref not in xref_ids:
+            xref_ids[xref] = str(uuid.uuid4())
+        return xref_ids[xref]
+    
+    def link_doc(xref_1: str, xref_2: str, link_type: str) -> dict:
+        return {
+            "id": str(uuid.uuid4()),
+            "owner_id": owner_id,
+            "person_id_1": person_id_for(xref_1),
+            "person_id_2": person_id_for(xref_2),
+            "link_type": link_type,
+            "created_at": now
+        }
+    
+    def add_link(xref_1: str, xref_2: str, link_type: str):
+        if xref_1 in defined and xref_2 in defined:
+            links_batch.append(link_doc(xref_1, xref_2, link_type))
+        else:
+            # Family seen before one of its individuals: resolved at the end
+            deferred.append((xref_1, xref_2, link_type))
+    
+    async def flush(force: bool = False):
+        for collection, batch, key in ((db.persons, persons_batch, "persons"), (db.links, links_batch, "links")):
+            if batch and (force or len(batch) >= GEDCOM_IMPORT_BATCH_SIZE):
+                errors = await insert_many_unordered(collection, batch)
+                stats[key] += len(batch) - len(errors)
+                stats["failed"] += len(errors)
+                batch.clear()
+                await db.gedcom_imports.update_one(
+                    {"id": import_id},
+                    {"$set": {**stats, "bytes_read": progress["bytes_read"]}}
+                )
+    
+    try:
+        await db.gedcom_imports.update_one(
+            {"id": import_id},
+            {"$set": {"status": "running", "started_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        records = iter_gedcom_records(iter_gedcom_file(path, progress))
+        while True:
+            # Parsing happens off the event loop, one batch of records at a time
+            parsed = await asyncio.to_thread(read_gedcom_records, records, GEDCOM_IMPORT_BATCH_SIZE)
+            if not parsed:
+                break
+            for xref, tag, data in parsed:
+                stats["records"] += 1
+                if tag == 'INDI':
+                    # Without an xref nothing can point at it; a repeated xref would reuse the first one's id
+                    if data is None or not xref or xref in defined:
+                        stats["skipped_records"] += 1
+                        continue
+                    defined.add(xref)
+                    persons_batch.append({
+                        "id": person_id_for(xref),
+                        "owner_id": owner_id,
+                        **data,
+                        "created_at": now,
+                        "updated_at": now
+                    })
+                elif tag == 'FAM':
+                    partners, children = data
+                    if len(partners) >= 2:
+                        add_link(partners[0], partners[1], "spouse")
+                    for parent in partners:
+                        for child in children:
+                            add_link(parent, child, "parent")
+                await flush()
+        
+        for xref_1, xref_2, link_type in deferred:
+            if xref_1 in defined and xref_2 in defined:
+                links_batch.append(link_doc(xref_1, xref_2, link_type))
+                await flush()
+            else:
+                stats["skipped_links"] += 1
+        await flush(force=True)
+        
+        # Far larger than the change log: clients resync the whole tree
+        await reset_tree_changes(owner_id)
+        
+        elapsed = time.perf_counter() - started
+        await db.gedcom_imports.update_one(
+            {"id": import_id},
+            {"$set": {
+                **stats,
+                "status": "completed",
+                "bytes_read": progress["bytes_read"],
+                "records_per_second": round(stats["records"] / elapsed, 1) if elapsed else None,
+                "finished_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        logger.info(f"GEDCOM import {import_id} completed: {stats}")
+    except Exception as e:
+        logger.error(f"GEDCOM import {import_id} failed: {e}")
+        if stats["persons"] or stats["links"]:
+            await reset_tree_changes(owner_id)
+        await db.gedcom_imports.update_one(
+            {"id": import_id},
+            {"$set": {**stats, "status": "failed", "error": str(e), "finished_at": datetime.now(timezone.utc).isoformat()}}
+        )
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@api_router.post("/tree/import/gedcom", status_code=202)
+async def import_tree_gedcom(background_tasks: BackgroundTasks, file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    """Import a GEDCOM 5.5.1 file into the current tree (runs in the background)"""
+    # Spool the upload to our own file: the request's copy is closed once we respond
+    size = 0
+    handle = tempfile.NamedTemporaryFile(prefix="aila_import_", suffix=".ged", dir=GEDCOM_IMPORT_DIR, delete=False)
+    try:
+        while True:
+            chunk = await file.read(1024 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > GEDCOM_IMPORT_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="GEDCOM file too large")
+            await asyncio.to_thread(handle.write, chunk)
+        handle.close()
+    except Exception:
+        handle.close()
+        os.remove(handle.name)
+        raise
+    
+    import_doc = {
+        "id": str(uuid.uuid4()),
+        "owner_id": current_user['id'],
+        "filename": file.filename,
+        "status": "queued",
+        "bytes_total": size,
+        "bytes_read": 0,
+        "persons": 0,
+        "links": 0,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.gedcom_imports.insert_one(import_doc)
+    import_doc.pop('_id', None)
+    background_tasks.add_task(run_gedcom_import, import_doc['id'], current_user['id'], handle.name)
     
     return {
-        "content": "\n".join(gedcom_lines),
-        "filename": f"aila_tree_{datetime.now(timezone.utc).strftime('%Y%m%d')}.ged"
+        "import_id": import_doc['id'],
+        "status": "queued",
+        "message": "Import GEDCOM lancé, votre arbre sera mis à jour dans quelques instants."
     }
 
+@api_router.get("/tree/import/gedcom/{import_id}")
+async def get_gedcom_import(import_id: str, current_user: dict = Depends(get_current_user)):
+    """Get the progress of a GEDCOM import"""
+    import_doc = await db.gedcom_imports.find_one({"id": import_id, "owner_id": current_user['id']}, {"_id": 0})
+    if not import_doc:
+        raise HTTPException(status_code=404, detail="Import not found")
+    if import_doc.get('bytes_total'):
+        import_doc['progress'] = round(100 * import_doc.get('bytes_read', 0) / import_doc['bytes_total'], 1)
+    return import_doc
+
 # ============================================================================
 # STATUS ENDPOINTS
 # ============================================================================
@@ -1130,6 +3736,7 @@ async def stripe_webhook(request: Request):
                     }
                 },
             )
+            invalidate_cached_user(user_id)
             logger.info("Premium activé pour user_id=%s plan=%s", user_id, plan)
     return {"received": True}
 
@@ -1184,6 +3791,14 @@ async def invite_collaborator(data: dict, current_user: dict = Depends(get_curre
     await db.collaborators.insert_one(invitation)
     logger.info(f"Invitation sent from {current_user['email']} to {email}")
     
+    invitee = await get_cached_user_by_email(email)
+    if invitee and invitee.get('id'):
+        await insert_notification(
+            invitee['id'], "collaboration_invite", "Nouvelle invitation",
+            f"{invitation['owner_name'] or invitation['owner_email']} vous invite à collaborer sur son arbre",
+            invitation_id=invitation['id']
+        )
+    
     return {"success": True, "message": f"Invitation envoyée à {email}"}
 
 @api_router.post("/collaborators/accept/{invite_id}")
@@ -1219,7 +3834,7 @@ async def remove_collaborator(collaborator_id: str, current_user: dict = Depends
 # ============================================================================
 
 @api_router.get("/tree/shared/{owner_id}")
-async def get_shared_tree(owner_id: str, current_user: dict = Depends(get_current_user)):
+async def get_shared_tree(owner_id: str, request: Request, current_user: dict = Depends(get_current_user)):
     """Get a shared tree by owner ID"""
     # Check if user has access to this tree
     collaboration = await db.collaborators.find_one({
@@ -1230,10 +3845,20 @@ async def get_shared_tree(owner_id: str, current_user: dict = Depends(get_curren
     if not collaboration:
         raise HTTPException(status_code=403, detail="You don't have access to this tree")
     
-    persons = await db.persons.find({"owner_id": owner_id}, {"_id": 0}).to_list(1000)
-    links = await db.links.find({"owner_id": owner_id}, {"_id": 0}).to_list(1000)
+    return await get_tree_response(owner_id, request)
+
+@api_router.get("/tree/shared/{owner_id}/stream")
+async def stream_shared_tree(owner_id: str, current_user: dict = Depends(get_current_user)):
+    """Stream a shared tree as NDJSON"""
+    collaboration = await db.collaborators.find_one({
+        "owner_id": owner_id,
+        "email": current_user.get('email'),
+        "status": "accepted"
+    })
+    if not collaboration:
+        raise HTTPException(status_code=403, detail="You don't have access to this tree")
     
-    return {"persons": persons, "links": links}
+    return StreamingResponse(stream_tree_ndjson(owner_id), media_type="application/x-ndjson")
 
 @api_router.post("/tree/shared/{owner_id}/persons")
 async def add_person_to_shared_tree(owner_id: str, person_data: dict, current_user: dict = Depends(get_current_user)):
@@ -1302,6 +3927,13 @@ async def create_contribution(data: dict, owner_id: str = None, current_user: di
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.contributions.insert_one(contribution)
+    
+    if contribution['tree_owner_id'] and contribution['tree_owner_id'] != current_user['id']:
+        await insert_notification(
+            contribution['tree_owner_id'], "contribution_pending", "Nouvelle contribution",
+            f"{current_user.get('email')} propose une modification de votre arbre",
+            contribution_id=contribution['id']
+        )
     return {"success": True, "contribution_id": contribution["id"]}
 
 @api_router.get("/contributions/pending")
@@ -1348,13 +3980,14 @@ async def review_contribution(contribution_id: str, data: dict, current_user: di
     if status == 'approved':
         if contribution.get('type') == 'add_person':
             person_data = contribution.get('data', {})
-            person = {
+            person = with_anniversary_mmdd({
                 "id": str(uuid.uuid4()),
                 "owner_id": current_user['id'],
                 **person_data,
                 "created_at": datetime.now(timezone.utc).isoformat()
-            }
+            })
             await db.persons.insert_one(person)
+            await record_tree_changes(current_user['id'], [tree_change("person", "upsert", person)])
         elif contribution.get('type') == 'add_link':
             link_data = contribution.get('data', {})
             link = {
@@ -1364,6 +3997,15 @@ async def review_contribution(contribution_id: str, data: dict, current_user: di
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
             await db.links.insert_one(link)
+            await record_tree_changes(current_user['id'], [tree_change("link", "upsert", link)])
+    
+    if status in ('approved', 'rejected') and contribution.get('contributor_id'):
+        await insert_notification(
+            contribution['contributor_id'], f"contribution_{status}",
+            "Contribution acceptée" if status == 'approved' else "Contribution refusée",
+            note or "Le propriétaire de l'arbre a examiné votre contribution",
+            contribution_id=contribution_id
+        )
     
     return {"success": True, "status": status}
 
@@ -1371,42 +4013,338 @@ async def review_contribution(contribution_id: str, data: dict, current_user: di
 # CHAT ENDPOINTS
 # ============================================================================
 
-@api_router.get("/chat/messages")
-async def get_chat_messages(limit: int = 50, skip: int = 0, current_user: dict = Depends(get_current_user)):
-    """Get family chat messages"""
-    messages = await db.chat_messages.find(
-        {"tree_owner_id": current_user['id']},
-        {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    return messages
+async def has_chat_access(owner_id: str, user: dict) -> bool:
+    """The tree owner and accepted collaborators share the tree's chat room"""
+    if owner_id == user['id']:
+        return True
+    return bool(await db.collaborators.find_one(
+        {"owner_id": owner_id, "email": user.get('email'), "status": "accepted"},
+        {"_id": 1}
+    ))
+
+class ChatConnection:
+    """One chat WebSocket: events are queued and written by their own task,
+    so a slow client never blocks the broker"""
+
+    def __init__(self, websocket: WebSocket, user: dict, room: str, queue_size: int):
+        self.websocket = websocket
+        self.user = user
+        self.room = room
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.writer = None
+        self.close_code = None
+        self.close_reason = None
+
+    def drop(self, code: int, reason: str):
+        """Stop writing; the socket is then closed with this code and the client reloads history on reconnect"""
+        if self.close_code is None:
+            self.close_code, self.close_reason = code, reason
+            if self.writer:
+                self.writer.cancel()
+
+    def offer(self, event: dict):
+        if self.close_code is not None:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind (possibly stuck in a send)
+            self.drop(1013, "Client too slow")
 
-@api_router.post("/chat/messages")
-async def send_chat_message(data: dict, current_user: dict = Depends(get_current_user)):
-    """Send a chat message"""
+    async def write(self):
+        while True:
+            await self.websocket.send_json(await self.queue.get())
+
+    def start(self):
+        self.writer = asyncio.create_task(self.write())
+        return self.writer
+
+class InMemoryChatBroker:
+    """Delivers chat events to the sockets connected to this process"""
+
+    def __init__(self):
+        self.rooms = {}
+
+    def subscribe(self, connection: ChatConnection):
+        self.rooms.setdefault(connection.room, set()).add(connection)
+
+    def unsubscribe(self, connection: ChatConnection):
+        connections = self.rooms.get(connection.room)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.rooms[connection.room]
+
+    def deliver(self, room: str, event: dict):
+        for connection in list(self.rooms.get(room, ())):
+            connection.offer(event)
+
+    def drop_all(self, code: int, reason: str):
+        for connections in list(self.rooms.values()):
+            for connection in list(connections):
+                connection.drop(code, reason)
+
+    async def publish(self, room: str, event: dict):
+        self.deliver(room, event)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "broker": type(self).__name__,
+            "rooms": len(self.rooms),
+            "connections": sum(len(c) for c in self.rooms.values())
+        }
+
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+CHANGE_STREAM_LOST_CODES = {260, 280, 286}
+
+class MongoChatBroker(InMemoryChatBroker):
+    """Fans chat events out to every worker through a change stream on chat_events"""
+
+    def __init__(self):
+        super().__init__()
+        self.task = None
+
+    async def publish(self, room: str, event: dict):
+        # Delivered locally by the change stream too, so every worker sees the same order
+        await db.chat_events.insert_one({
+            "room": room,
+            "event": event,
+            "created_at": datetime.now(timezone.utc)  # BSON date for the TTL index
+        })
+
+    async def _listen(self):
+        resume_token = None
+        while True:
+            try:
+                async with db.chat_events.watch([{"$match": {"operationType": "insert"}}],
+                                                resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        doc = change['fullDocument']
+                        self.deliver(doc['room'], doc['event'])
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if resume_token is not None and e.code in CHANGE_STREAM_LOST_CODES:
+                    # Events since the token are gone: clients must reconnect and reload history
+                    logger.error(f"Chat change stream cannot resume, dropping sockets: {e}")
+                    resume_token = None
+                    self.drop_all(1012, "Chat restarted")
+                else:
+                    logger.error(f"Chat change stream failed, resuming: {e}")
+                await asyncio.sleep(1)
+            except Exception as e:
+                logger.error(f"Chat change stream failed, resuming: {e}")
+                await asyncio.sleep(1)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+chat_broker = MongoChatBroker() if CHAT_BROKER == 'mongo' else InMemoryChatBroker()
+
+def chat_bucket_push(owner_id: str, day: str, messages: List[dict]) -> UpdateOne:
+    """Append messages to the tree's open bucket for that day (a new one once it is full)"""
+    return UpdateOne(
+        {"tree_owner_id": owner_id, "day": day, "count": {"$lt": CHAT_BUCKET_MAX_MESSAGES}},
+        {"$push": {"messages": {"$each": messages}}, "$inc": {"count": len(messages)}},
+        upsert=True
+    )
+
+def chat_cursor(message: dict) -> str:
+    return f"{message['created_at']},{message['id']}"
+
+def parse_chat_cursor(before: Optional[str]) -> Optional[tuple]:
+    """before=<created_at>,<id> -> (created_at, id)"""
+    if not before:
+        return None
+    # An unencoded '+' of the UTC offset arrives as a space
+    created_at, sep, message_id = before.replace(' ', '+').rpartition(',')
+    if not sep or not created_at:
+        raise HTTPException(status_code=400, detail="Invalid cursor, expected before=<created_at>,<id>")
+    return created_at, message_id
+
+async def load_chat_page(owner_id: str, before: Optional[tuple], limit: int, skip: int = 0) -> List[dict]:
+    """Newest-first page of a room's history, strictly older than the before cursor"""
+    if CHAT_STORAGE != 'buckets':
+        query = {"tree_owner_id": owner_id}
+        if before:
+            query["$or"] = [
+                {"created_at": {"$lt": before[0]}},
+                {"created_at": before[0], "id": {"$lt": before[1]}}
+            ]
+        cursor = db.chat_messages.find(query, {"_id": 0}).sort([("created_at", -1), ("id", -1)])
+        if skip and not before:
+            cursor = cursor.skip(skip)  # legacy offset paging
+        return await cursor.limit(limit).to_list(limit)
+    
+    # Buckets: read whole days newest first until the page is full
+    query = {"tree_owner_id": owner_id}
+    if before:
+        query["day"] = {"$lte": before[0][:10]}
+    messages, seen, day = [], set(), None
+    async for bucket in db.chat_buckets.find(query, {"_id": 0, "day": 1, "messages": 1}).sort("day", -1):
+        if bucket['day'] != day and len(messages) >= skip + limit:
+            break
+        day = bucket['day']
+        for message in bucket.get('messages', []):
+            key = (message['created_at'], message['id'])
+            if (before is None or key < before) and message['id'] not in seen:
+                seen.add(message['id'])
+                messages.append(message)
+    messages.sort(key=lambda m: (m['created_at'], m['id']), reverse=True)
+    return messages[skip:skip + limit] if not before else messages[:limit]
+
+async def create_chat_message(owner_id: str, user: dict, data: dict) -> dict:
+    """Store a chat message in a tree's room and broadcast it"""
     message = {
         "id": str(uuid.uuid4()),
-        "tree_owner_id": current_user['id'],
-        "sender_id": current_user['id'],
-        "sender_name": f"{current_user.get('first_name', '')} {current_user.get('last_name', '')}".strip(),
-        "sender_email": current_user.get('email'),
+        "tree_owner_id": owner_id,
+        "sender_id": user['id'],
+        "sender_name": f"{user.get('first_name', '')} {user.get('last_name', '')}".strip(),
+        "sender_email": user.get('email'),
         "message": data.get('message', ''),
         "mentioned_person_id": data.get('mentioned_person_id'),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
+    # chat_messages is written in both layouts, so switching back from buckets loses nothing
     await db.chat_messages.insert_one(message)
+    message.pop('_id', None)
+    if CHAT_STORAGE == 'buckets':
+        await db.chat_buckets.bulk_write([chat_bucket_push(owner_id, message['created_at'][:10], [message])])
+    await chat_broker.publish(owner_id, {"type": "message", "message": message})
     return message
 
+async def remove_chat_message(message_id: str, user: dict) -> bool:
+    """Delete one of the user's own messages and broadcast the deletion"""
+    message = await db.chat_messages.find_one_and_delete(
+        {"id": message_id, "sender_id": user['id']},
+        projection={"_id": 0, "tree_owner_id": 1}
+    )
+    if CHAT_STORAGE == 'buckets':
+        in_bucket = {"messages": {"$elemMatch": {"id": message_id, "sender_id": user['id']}}}
+        if not message:
+            # Posted in bucket mode before chat_messages was written too
+            message = await db.chat_buckets.find_one(in_bucket, {"_id": 0, "tree_owner_id": 1})
+        if message:
+            # A replayed migration batch can leave a copy in more than one bucket
+            await db.chat_buckets.update_many(
+                {"tree_owner_id": message['tree_owner_id'], **in_bucket},
+                {"$pull": {"messages": {"id": message_id}}, "$inc": {"count": -1}}
+            )
+    if not message:
+        return False
+    await chat_broker.publish(message['tree_owner_id'], {"type": "deleted", "id": message_id})
+    return True
+
+@api_router.get("/chat/messages")
+async def get_chat_messages(response: Response, limit: int = 50, skip: int = 0, before: Optional[str] = None,
+                            owner_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Get family chat messages, newest first (your own tree's room unless owner_id is given)
+    
+    Page with before=<created_at>,<id> of the last message received; the next
+    page's cursor, if any, is returned in the X-Next-Cursor header.
+    """
+    owner_id = owner_id or current_user['id']
+    if not await has_chat_access(owner_id, current_user):
+        raise HTTPException(status_code=403, detail="You don't have access to this tree")
+    limit = max(1, min(limit, CHAT_PAGE_MAX_LIMIT))
+    
+    messages = await load_chat_page(owner_id, parse_chat_cursor(before), limit + 1, skip)
+    if len(messages) > limit:
+        messages = messages[:limit]
+        response.headers["X-Next-Cursor"] = chat_cursor(messages[-1])
+    return messages
+
+@api_router.post("/chat/messages")
+async def send_chat_message(data: dict, owner_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Send a chat message"""
+    owner_id = owner_id or current_user['id']
+    if not await has_chat_access(owner_id, current_user):
+        raise HTTPException(status_code=403, detail="You don't have access to this tree")
+    return await create_chat_message(owner_id, current_user, data)
+
 @api_router.delete("/chat/messages/{message_id}")
 async def delete_chat_message(message_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a chat message"""
-    result = await db.chat_messages.delete_one({
-        "id": message_id,
-        "sender_id": current_user['id']
-    })
-    if result.deleted_count == 0:
+    if not await remove_chat_message(message_id, current_user):
         raise HTTPException(status_code=404, detail="Message not found or not yours")
     return {"success": True}
 
+@api_router.websocket("/chat/ws/{owner_id}")
+async def chat_socket(websocket: WebSocket, owner_id: str, token: str = ""):
+    """Chat room of a tree: pushes new/deleted messages, accepts
+    {"type": "message" | "delete" | "ping"} frames.
+    
+    Browsers cannot set headers on a WebSocket, so the JWT is passed as ?token=.
+    """
+    try:
+        user = await get_cached_user(decode_token(token)['sub'])
+    except HTTPException:
+        user = None
+    if not user or not await has_chat_access(owner_id, user):
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    connection = ChatConnection(websocket, user, owner_id, CHAT_SOCKET_QUEUE_SIZE)
+    chat_broker.subscribe(connection)
+    
+    async def read():
+        while True:
+            data = await websocket.receive_json()
+            kind = data.get('type') if isinstance(data, dict) else None
+            if kind == 'message':
+                if str(data.get('message', '')).strip():
+                    await create_chat_message(owner_id, user, data)
+            elif kind == 'delete':
+                if not await remove_chat_message(str(data.get('id', '')), user):
+                    connection.offer({"type": "error", "detail": "Message not found or not yours"})
+            elif kind == 'ping':
+                connection.offer({"type": "pong"})
+    
+    async def recheck_access():
+        # Access is granted at connect time; drop the socket once it is revoked
+        while True:
+            await asyncio.sleep(CHAT_ACCESS_RECHECK_SECONDS)
+            current = await get_cached_user(user['id'])
+            if not current or not await has_chat_access(owner_id, current):
+                connection.drop(1008, "Access revoked")
+                return
+    
+    reader = asyncio.create_task(read())
+    writer = connection.start()
+    checker = asyncio.create_task(recheck_access())
+    try:
+        done, _ = await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = None if task.cancelled() else task.exception()
+            if error and not isinstance(error, WebSocketDisconnect):
+                logger.error(f"Chat socket error for {user['id']} in {owner_id}: {error}")
+        if connection.close_code is not None:
+            logger.warning(f"Chat socket of {user['id']} in {owner_id} dropped: {connection.close_reason}")
+            try:
+                await asyncio.wait_for(websocket.close(code=connection.close_code, reason=connection.close_reason), timeout=1)
+            except Exception:
+                pass
+    finally:
+        chat_broker.unsubscribe(connection)
+        for task in (reader, writer, checker):
+            task.cancel()
+        await asyncio.gather(reader, writer, checker, return_exceptions=True)
+
 # ============================================================================
 # TREE MERGE ENDPOINTS
 # ============================================================================
@@ -1422,7 +4360,7 @@ async def get_mergeable_trees(current_user: dict = Depends(get_current_user)):
     
     mergeable = []
     for collab in collaborations:
-        owner = await db.users.find_one({"id": collab.get('owner_id')}, {"_id": 0, "password_hash": 0})
+        owner = await get_cached_user(collab.get('owner_id'))
         if owner:
             person_count = await db.persons.count_documents({"owner_id": collab.get('owner_id')})
             mergeable.append({
@@ -1439,26 +4377,39 @@ async def get_mergeable_trees(current_user: dict = Depends(get_current_user)):
 async def analyze_merge(source_tree_owner_id: str, current_user: dict = Depends(get_current_user)):
     """Analyze potential merge conflicts between two trees"""
     # Get both trees
-    my_persons = await db.persons.find({"owner_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    source_persons = await db.persons.find({"owner_id": source_tree_owner_id}, {"_id": 0}).to_list(1000)
-    
-    # Find potential duplicates by name
-    duplicates = []
-    for sp in source_persons:
-        for mp in my_persons:
-            if (sp.get('first_name', '').lower() == mp.get('first_name', '').lower() and
-                sp.get('last_name', '').lower() == mp.get('last_name', '').lower()):
-                duplicates.append({
-                    "source_person": sp,
-                    "my_person": mp,
-                    "match_type": "name"
-                })
+    my_tree = await load_compact_tree(current_user['id'])
+    source_tree = await load_compact_tree(source_tree_owner_id)
+    
+    # Find potential duplicates by name (hash join instead of comparing every pair)
+    my_by_name = {}
+    for record in my_tree.records:
+        key = ((record.first_name or '').lower(), (record.last_name or '').lower())
+        my_by_name.setdefault(key, []).append(record.id)
+    
+    matches = []
+    for record in source_tree.records:
+        key = ((record.first_name or '').lower(), (record.last_name or '').lower())
+        for my_id in my_by_name.get(key, ()):
+            matches.append((record.id, my_id))
+    
+    # Only the matched persons are loaded as full documents
+    my_docs = await _persons_by_id(current_user['id'], {my_id for _, my_id in matches})
+    source_docs = await _persons_by_id(source_tree_owner_id, {source_id for source_id, _ in matches})
+    duplicates = [
+        {
+            "source_person": source_docs[source_id],
+            "my_person": my_docs[my_id],
+            "match_type": "name"
+        }
+        for source_id, my_id in matches
+        if source_id in source_docs and my_id in my_docs
+    ]
     
     return {
-        "my_tree_count": len(my_persons),
-        "source_tree_count": len(source_persons),
+        "my_tree_count": len(my_tree),
+        "source_tree_count": len(source_tree),
         "potential_duplicates": duplicates,
-        "new_persons": len(source_persons) - len(duplicates)
+        "new_persons": len(source_tree) - len(duplicates)
     }
 
 @api_router.post("/tree/merge/execute")
@@ -1467,31 +4418,42 @@ async def execute_merge(data: dict, current_user: dict = Depends(get_current_use
     source_tree_owner_id = data.get('source_tree_owner_id')
     merge_strategy = data.get('merge_strategy', 'add_new')  # 'add_new', 'replace', 'skip_duplicates'
     
-    source_persons = await db.persons.find({"owner_id": source_tree_owner_id}, {"_id": 0}).to_list(1000)
-    source_links = await db.links.find({"owner_id": source_tree_owner_id}, {"_id": 0}).to_list(1000)
-    
     merged_persons = 0
     merged_links = 0
     
     # Map old IDs to new IDs for link migration
     id_map = {}
+    changes = []
     
-    for person in source_persons:
+    # The whole source tree is copied, a batch of documents at a time
+    batch = []
+    cursor = db.persons.find({"owner_id": source_tree_owner_id}, {"_id": 0}).batch_size(TREE_STREAM_BATCH_SIZE)
+    async for person in cursor:
         old_id = person.get('id')
         new_id = str(uuid.uuid4())
         id_map[old_id] = new_id
         
-        new_person = {
+        new_person = with_anniversary_mmdd({
             **person,
             "id": new_id,
             "owner_id": current_user['id'],
             "merged_from": source_tree_owner_id,
             "merged_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.persons.insert_one(new_person)
-        merged_persons += 1
+        })
+        batch.append(new_person)
+        if len(batch) >= TREE_STREAM_BATCH_SIZE:
+            await db.persons.insert_many(batch, ordered=False)
+            changes.extend(tree_change("person", "upsert", doc) for doc in batch)
+            merged_persons += len(batch)
+            batch = []
+    if batch:
+        await db.persons.insert_many(batch, ordered=False)
+        changes.extend(tree_change("person", "upsert", doc) for doc in batch)
+        merged_persons += len(batch)
     
-    for link in source_links:
+    batch = []
+    cursor = db.links.find({"owner_id": source_tree_owner_id}, {"_id": 0}).batch_size(TREE_STREAM_BATCH_SIZE)
+    async for link in cursor:
         new_link = {
             **link,
             "id": str(uuid.uuid4()),
@@ -1501,8 +4463,18 @@ async def execute_merge(data: dict, current_user: dict = Depends(get_current_use
             "merged_from": source_tree_owner_id,
             "merged_at": datetime.now(timezone.utc).isoformat()
         }
-        await db.links.insert_one(new_link)
-        merged_links += 1
+        batch.append(new_link)
+        if len(batch) >= TREE_STREAM_BATCH_SIZE:
+            await db.links.insert_many(batch, ordered=False)
+            changes.extend(tree_change("link", "upsert", doc) for doc in batch)
+            merged_links += len(batch)
+            batch = []
+    if batch:
+        await db.links.insert_many(batch, ordered=False)
+        changes.extend(tree_change("link", "upsert", doc) for doc in batch)
+        merged_links += len(batch)
+    
+    await record_tree_changes(current_user['id'], changes)
     
     return {
         "success": True,
@@ -1521,7 +4493,7 @@ async def forgot_password(data: dict):
     if not email:
         raise HTTPException(status_code=400, detail="Email is required")
     
-    user = await db.users.find_one({"email": email})
+    user = await get_cached_user_by_email(email)
     if not user:
         # Don't reveal if email exists or not
         return {"success": True, "message": "Si cet email existe, vous recevrez un lien de réinitialisation."}
@@ -1570,11 +4542,12 @@ async def reset_password(data: dict):
         raise HTTPException(status_code=400, detail="Token has expired")
     
     # Update password
-    new_hash = hash_password(new_password)
+    new_hash = await password_hasher.hash(new_password)
     await db.users.update_one(
         {"id": reset_request['user_id']},
         {"$set": {"password_hash": new_hash, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    invalidate_cached_user(reset_request['user_id'])
     
     # Mark token as used
     await db.password_resets.update_one(
@@ -1643,6 +4616,7 @@ class Reminder(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_by: Optional[str] = None
     status: str = "pending"
+    audience: Optional[str] = None
 
 class FamilyReminderCreate(BaseModel):
     family_member_email: str
@@ -1656,6 +4630,169 @@ class ReminderStats(BaseModel):
     total_pending: int
     read_rate: float
 
+def to_utc_iso(value: datetime) -> str:
+    """ISO string in UTC; naive datetimes are taken as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+class ReminderDispatcher:
+    """Delivers scheduled user reminders when they come due
+
+    Due reminders are claimed one by one with a lease (find_one_and_update),
+    so several workers never deliver the same reminder; a worker that dies
+    mid-batch leaves leases that expire and are claimed again. Between
+    batches the loop sleeps until the next due time, or until wake() is
+    called by an endpoint that scheduled something.
+    """
+    
+    def __init__(self, batch_size: int, lease_seconds: int, max_sleep: float):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_sleep = max_sleep
+        self.wake_event = asyncio.Event()
+        self.task = None
+        self.lags_ms = deque(maxlen=1000)
+        self.dispatched = 0
+        self.batches = 0
+        self.last_batch_at = None
+        self.next_wake_at = None
+    
+    def wake(self):
+        self.wake_event.set()
+    
+    async def _claim(self, now: datetime) -> Optional[dict]:
+        now_iso = now.isoformat()
+        return await db.user_reminders.find_one_and_update(
+            {
+                "status": "scheduled",
+                "scheduled_at": {"$lte": now_iso},
+                "$or": [
+                    {"dispatch_lease_expires_at": {"$exists": False}},
+                    {"dispatch_lease_expires_at": {"$lt": now_iso}}
+                ]
+            },
+            {"$set": {
+                "dispatch_lease_owner": JOB_WORKER_ID,
+                "dispatch_lease_expires_at": (now + timedelta(seconds=self.lease_seconds)).isoformat()
+            }},
+            projection={"_id": 0, "id": 1, "scheduled_at": 1},
+            sort=[("scheduled_at", 1)]
+        )
+    
+    async def dispatch_due(self) -> int:
+        """Claim and deliver one batch of due reminders; returns how many were delivered"""
+        now = datetime.now(timezone.utc)
+        claimed = []
+        while len(claimed) < self.batch_size:
+            reminder = await self._claim(now)
+            if not reminder:
+                break
+            claimed.append(reminder)
+        if not claimed:
+            return 0
+        
+        sent_at = datetime.now(timezone.utc)
+        operations = []
+        lags = []
+        for reminder in claimed:
+            try:
+                lag_ms = max(0.0, (sent_at - datetime.fromisoformat(reminder['scheduled_at'])).total_seconds() * 1000)
+            except (TypeError, ValueError):
+                lag_ms = 0.0
+            lags.append(lag_ms)
+            operations.append(UpdateOne(
+                {"id": reminder['id'], "status": "scheduled", "dispatch_lease_owner": JOB_WORKER_ID},
+                {
+                    "$set": {"status": "sent", "sent_at": sent_at.isoformat(), "dispatch_lag_ms": round(lag_ms)},
+                    "$unset": {"dispatch_lease_owner": "", "dispatch_lease_expires_at": ""}
+                }
+            ))
+        result = await db.user_reminders.bulk_write(operations, ordered=False)
+        
+        self.lags_ms.extend(lags)
+        self.dispatched += result.modified_count
+        self.batches += 1
+        self.last_batch_at = sent_at.isoformat()
+        logger.info(f"Dispatched {result.modified_count} scheduled reminders (max lag {round(max(lags))} ms)")
+        return result.modified_count
+    
+    async def next_wake_delay(self) -> float:
+        """Seconds until the next reminder comes due, or a lease held by another worker expires"""
+        now = datetime.now(timezone.utc)
+        candidates = []
+        upcoming = await db.user_reminders.find_one(
+            {"status": "scheduled", "scheduled_at": {"$gt": now.isoformat()}},
+            {"_id": 0, "scheduled_at": 1}, sort=[("scheduled_at", 1)]
+        )
+        if upcoming:
+            candidates.append(upcoming['scheduled_at'])
+        leased = await db.user_reminders.find_one(
+            {"status": "scheduled", "scheduled_at": {"$lte": now.isoformat()}, "dispatch_lease_expires_at": {"$gt": now.isoformat()}},
+            {"_id": 0, "dispatch_lease_expires_at": 1}, sort=[("dispatch_lease_expires_at", 1)]
+        )
+        if leased:
+            candidates.append(leased['dispatch_lease_expires_at'])
+        
+        delay = self.max_sleep
+        for value in candidates:
+            try:
+                delay = min(delay, (datetime.fromisoformat(value) - now).total_seconds())
+            except (TypeError, ValueError):
+                continue
+        self.next_wake_at = (now + timedelta(seconds=max(delay, 0))).isoformat()
+        return max(delay, 0.0)
+    
+    async def _loop(self):
+        while True:
+            try:
+                # Drain everything due before going back to sleep
+                while await self.dispatch_due() >= self.batch_size:
+                    pass
+                delay = await self.next_wake_delay()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reminder dispatch failed: {e}")
+                delay = self.max_sleep
+            self.wake_event.clear()
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+    
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+    
+    def stats(self) -> dict:
+        lags = list(self.lags_ms)
+        return {
+            "worker": JOB_WORKER_ID,
+            "running": self.task is not None and not self.task.done(),
+            "dispatched": self.dispatched,
+            "batches": self.batches,
+            "last_batch_at": self.last_batch_at,
+            "next_wake_at": self.next_wake_at,
+            "lag_ms": {
+                "count": len(lags),
+                "p50": _percentile(lags, 50),
+                "p95": _percentile(lags, 95),
+                "p99": _percentile(lags, 99),
+                "max": round(max(lags), 2) if lags else 0.0,
+            },
+        }
+
+reminder_dispatcher = ReminderDispatcher(
+    REMINDER_DISPATCH_BATCH_SIZE, REMINDER_DISPATCH_LEASE_SECONDS, REMINDER_DISPATCH_MAX_SLEEP_SECONDS
+)
+
 @api_router.post("/reminders")
 async def create_reminder(reminder: ReminderCreate):
     """Create a new reminder (admin only)"""
@@ -1668,28 +4805,25 @@ async def create_reminder(reminder: ReminderCreate):
             "message": reminder.message,
             "send_email": reminder.send_email,
             "send_push": reminder.send_push,
-            "scheduled_at": reminder.scheduled_at.isoformat() if reminder.scheduled_at else None,
-            "status": "pending" if reminder.scheduled_at else "sent",
+            "scheduled_at": to_utc_iso(reminder.scheduled_at) if reminder.scheduled_at else None,
+            "status": "scheduled" if reminder.scheduled_at else "sent",
             "sent_at": None if reminder.scheduled_at else datetime.now(timezone.utc).isoformat(),
             "read_at": None,
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
-        await db.reminders.insert_one(doc)
-        
-        # If user_id is None, send to all users
         if reminder.user_id is None:
-            users = await db.users.find({}, {"id": 1}).to_list(10000)
-            for user in users:
-                user_reminder = doc.copy()
-                user_reminder['id'] = str(uuid.uuid4())
-                user_reminder['user_id'] = user.get('id')
-                user_reminder.pop('_id', None)
-                await db.user_reminders.insert_one(user_reminder)
+            # Broadcast: stored once, merged into each user's reminders on read
+            doc['audience'] = "all"
+            await db.reminders.insert_one(doc)
         else:
+            await db.reminders.insert_one(doc)
             doc.pop('_id', None)
             await db.user_reminders.insert_one(doc)
         
+        if reminder.scheduled_at and reminder.user_id is not None:
+            reminder_dispatcher.wake()
+        
         logger.info(f"Reminder created: {doc['id']}")
         doc.pop('_id', None)
         return doc
@@ -1709,6 +4843,45 @@ async def get_reminders(limit: int = 50, skip: int = 0):
     
     return reminders
 
+def live_broadcast_query(now: str) -> dict:
+    """Broadcast reminders that are visible now (sent, or scheduled and due)"""
+    return {
+        "audience": "all",
+        "status": {"$in": ["sent", "scheduled"]},
+        "$or": [{"scheduled_at": None}, {"scheduled_at": {"$lte": now}}]
+    }
+
+async def get_broadcasts_for_user(user_id: str, limit: int) -> List[dict]:
+    """Live broadcasts a user has neither read nor dismissed, shaped like user reminders"""
+    query = live_broadcast_query(datetime.now(timezone.utc).isoformat())
+    user = await get_cached_user(user_id)
+    if user and isinstance(user.get('created_at'), str):
+        # Like the per-user copies they replace: only broadcasts sent after sign-up
+        query["created_at"] = {"$gte": user['created_at']}
+    broadcasts = await db.reminders.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    if not broadcasts:
+        return []
+    
+    handled = set(await db.reminder_receipts.distinct(
+        "reminder_id", {"user_id": user_id, "reminder_id": {"$in": [b['id'] for b in broadcasts]}}
+    ))
+    return [
+        {**b, "user_id": user_id, "status": "sent", "sent_at": b.get('sent_at') or b.get('scheduled_at')}
+        for b in broadcasts if b['id'] not in handled
+    ]
+
+async def record_broadcast_receipt(reminder_id: str, user_id: str, field: str) -> bool:
+    """Lazily record a user's read/dismiss of a broadcast; False if reminder_id is not a broadcast"""
+    if not await db.reminders.find_one({"id": reminder_id, "audience": "all"}, {"_id": 1}):
+        return False
+    now = datetime.now(timezone.utc).isoformat()
+    await db.reminder_receipts.update_one(
+        {"reminder_id": reminder_id, "user_id": user_id},
+        {"$set": {field: now}, "$setOnInsert": {"created_at": now}},
+        upsert=True
+    )
+    return True
+
 @api_router.get("/reminders/user/{user_id}", response_model=List[Reminder])
 async def get_user_reminders(user_id: str):
     """Get reminders for a specific user"""
@@ -1716,6 +4889,9 @@ async def get_user_reminders(user_id: str):
         {"user_id": user_id, "status": {"$in": ["sent", "pending"]}}, 
         {"_id": 0}
     ).sort("created_at", -1).to_list(50)
+    reminders.extend(await get_broadcasts_for_user(user_id, 50))
+    reminders.sort(key=lambda r: str(r.get('created_at') or ''), reverse=True)
+    reminders = reminders[:50]
     
     for r in reminders:
         for key in ['scheduled_at', 'sent_at', 'read_at', 'created_at']:
@@ -1727,10 +4903,23 @@ async def get_user_reminders(user_id: str):
 @api_router.put("/reminders/{reminder_id}/read")
 async def mark_reminder_read(reminder_id: str, user_id: str):
     """Mark a reminder as read"""
-    await db.user_reminders.update_one(
+    result = await db.user_reminders.update_one(
         {"id": reminder_id, "user_id": user_id},
         {"$set": {"read_at": datetime.now(timezone.utc).isoformat(), "status": "read"}}
     )
+    if not result.matched_count:
+        await record_broadcast_receipt(reminder_id, user_id, "read_at")
+    return {"success": True}
+
+@api_router.put("/reminders/{reminder_id}/dismiss")
+async def dismiss_reminder(reminder_id: str, user_id: str):
+    """Dismiss a reminder without reading it"""
+    result = await db.user_reminders.update_one(
+        {"id": reminder_id, "user_id": user_id},
+        {"$set": {"dismissed_at": datetime.now(timezone.utc).isoformat(), "status": "dismissed"}}
+    )
+    if not result.matched_count and not await record_broadcast_receipt(reminder_id, user_id, "dismissed_at"):
+        raise HTTPException(status_code=404, detail="Reminder not found")
     return {"success": True}
 
 @api_router.get("/reminders/stats", response_model=ReminderStats)
@@ -1738,7 +4927,26 @@ async def get_reminder_stats():
     """Get reminder statistics (admin only)"""
     total_sent = await db.user_reminders.count_documents({"status": "sent"})
     total_read = await db.user_reminders.count_documents({"status": "read"})
-    total_pending = await db.user_reminders.count_documents({"status": "pending"})
+    total_pending = await db.user_reminders.count_documents({"status": {"$in": ["pending", "scheduled"]}})
+    
+    # Broadcasts count once per user who had an account when they were sent
+    now = datetime.now(timezone.utc).isoformat()
+    live_ids = set(await db.reminders.distinct("id", live_broadcast_query(now)))
+    async for broadcast in db.reminders.find({"audience": "all"}, {"_id": 0, "id": 1, "created_at": 1}):
+        audience = await db.users.count_documents({"created_at": {"$lte": broadcast.get('created_at')}})
+        if broadcast['id'] in live_ids:
+            total_sent += audience
+        else:
+            total_pending += audience
+    receipts = {
+        row['_id']: row['count']
+        async for row in db.reminder_receipts.aggregate([
+            {"$match": {"reminder_id": {"$in": list(live_ids)}}},
+            {"$group": {"_id": {"$cond": [{"$ifNull": ["$read_at", False]}, "read", "dismissed"]}, "count": {"$sum": 1}}},
+        ])
+    }
+    total_read += receipts.get("read", 0)
+    total_sent -= receipts.get("read", 0) + receipts.get("dismissed", 0)
     
     read_rate = (total_read / total_sent * 100) if total_sent > 0 else 0
     
@@ -1771,173 +4979,231 @@ async def send_family_reminder(reminder: FamilyReminderCreate):
         logger.error(f"Error sending family reminder: {e}")
         return {"success": False, "message": str(e)}
 
-@api_router.get("/reminders/analyze-trees")
-async def analyze_incomplete_trees(limit: int = 20):
-    """Analyze trees and find users who need reminders"""
-    try:
-        users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(100)
-        analysis = []
-        
-        for user in users:
-            user_id = user.get('id')
-            if not user_id:
-                continue
-                
-            # Count persons and links
-            person_count = await db.persons.count_documents({"owner_id": user_id})
-            link_count = await db.links.count_documents({"owner_id": user_id})
-            
-            # Calculate completion score (simple heuristic)
-            # A "complete" tree has at least 10 persons and links connecting them
-            if person_count == 0:
-                completion_score = 0
-            elif person_count < 3:
-                completion_score = 10
-            elif person_count < 10:
-                completion_score = 30 + (person_count * 3)
-            else:
-                link_ratio = link_count / person_count if person_count > 0 else 0
-                completion_score = min(100, 50 + (person_count * 2) + (link_ratio * 20))
-            
-            # Check last activity
-            last_person = await db.persons.find_one(
-                {"owner_id": user_id}, 
-                sort=[("created_at", -1)]
-            )
-            last_activity = last_person.get('created_at') if last_person else user.get('created_at')
-            
-            analysis.append({
-                "user_id": user_id,
-                "user_name": f"{user.get('first_name', '')} {user.get('last_name', '')}".strip() or "Utilisateur",
-                "user_email": user.get('email'),
-                "person_count": person_count,
-                "link_count": link_count,
-                "completion_score": int(completion_score),
-                "last_activity": last_activity,
-                "needs_reminder": completion_score < 50 or person_count < 5
-            })
-        
-        # Sort by completion score (lowest first)
-        analysis.sort(key=lambda x: x['completion_score'])
-        
-        return analysis[:limit]
-    except Exception as e:
-        logger.error(f"Error analyzing trees: {e}")
-        return []
+def tree_analysis_pipeline(after: Optional[tuple] = None, limit: Optional[int] = None) -> list:
+    """Per-user tree stats in one pass: persons and links grouped by owner_id, joined to users
 
-@api_router.post("/reminders/send-auto")
-async def send_auto_reminders(dry_run: bool = True, min_days_inactive: int = 7):
-    """Send automatic reminders to inactive users
+    Runs on the persons collection. Results are ordered by (completion_score, user id);
+    after is the (score, user id) of the last row of the previous page.
+    """
+    person_count = "$person_count"
+    link_ratio = {"$divide": ["$link_count", {"$max": [person_count, 1]}]}
+    pipeline = [
+        {"$group": {"_id": "$owner_id", "person_count": {"$sum": 1}, "last_person_at": {"$max": "$created_at"}}},
+        {"$unionWith": {"coll": "links", "pipeline": [
+            {"$group": {"_id": "$owner_id", "link_count": {"$sum": 1}}},
+        ]}},
+        {"$unionWith": {"coll": "users", "pipeline": [
+            {"$match": {"id": {"$nin": [None, ""]}}},
+            {"$project": {"_id": "$id", "user": {
+                "first_name": "$first_name", "last_name": "$last_name",
+                "email": "$email", "created_at": "$created_at"
+            }}},
+        ]}},
+        {"$group": {
+            "_id": "$_id",
+            "person_count": {"$sum": "$person_count"},
+            "link_count": {"$sum": "$link_count"},
+            "last_person_at": {"$max": "$last_person_at"},
+            "user": {"$max": "$user"}
+        }},
+        # Owners without a user account (orphans) are left out
+        {"$match": {"user": {"$ne": None}}},
+        # A "complete" tree has at least 10 persons and links connecting them
+        {"$addFields": {"completion_score": {"$trunc": {"$switch": {
+            "branches": [
+                {"case": {"$eq": [person_count, 0]}, "then": 0},
+                {"case": {"$lt": [person_count, 3]}, "then": 10},
+                {"case": {"$lt": [person_count, 10]}, "then": {"$add": [30, {"$multiply": [person_count, 3]}]}},
+            ],
+            "default": {"$min": [100, {"$add": [50, {"$multiply": [person_count, 2]}, {"$multiply": [link_ratio, 20]}]}]}
+        }}}}},
+    ]
+    if after:
+        score, user_id = after
+        pipeline.append({"$match": {"$or": [
+            {"completion_score": {"$gt": score}},
+            {"completion_score": score, "_id": {"$gt": user_id}}
+        ]}})
+    pipeline.append({"$sort": {"completion_score": 1, "_id": 1}})
+    if limit:
+        pipeline.append({"$limit": limit})
+    return pipeline
+
+def tree_analysis_row(doc: dict) -> dict:
+    user = doc.get('user') or {}
+    return {
+        "user_id": doc['_id'],
+        "user_name": f"{user.get('first_name') or ''} {user.get('last_name') or ''}".strip() or "Utilisateur",
+        "user_email": user.get('email'),
+        "person_count": doc['person_count'],
+        "link_count": doc['link_count'],
+        "completion_score": int(doc['completion_score']),
+        "last_activity": doc.get('last_person_at') or user.get('created_at'),
+        "needs_reminder": doc['completion_score'] < 50 or doc['person_count'] < 5
+    }
+
+AUTO_REMINDER_CAMPAIGN = "auto_reminders"
+
+def campaign_window(now: datetime) -> str:
+    """Start date of the fixed REMINDER_CAMPAIGN_WINDOW_DAYS period containing now"""
+    day = now.date().toordinal()
+    return datetime.fromordinal(day - day % REMINDER_CAMPAIGN_WINDOW_DAYS).date().isoformat()
+
+def plan_auto_reminder(user: dict, person_count: int, last_activity: Any, now: datetime, min_days_inactive: int) -> Optional[dict]:
+    """The automatic reminder a user should get, given their tree size and last activity"""
+    if last_activity:
+        try:
+            if isinstance(last_activity, str):
+                last_activity = datetime.fromisoformat(last_activity.replace('Z', '+00:00'))
+            if last_activity.tzinfo is None:
+                last_activity = last_activity.replace(tzinfo=timezone.utc)
+            days_inactive = (now - last_activity).days
+        except (ValueError, TypeError, AttributeError):
+            days_inactive = 999
+    else:
+        days_inactive = 999
     
-    Args:
-        dry_run: If True, only preview what would be sent without actually sending
-        min_days_inactive: Minimum days of inactivity before sending reminder
+    # Determine reminder type based on tree status
+    if person_count == 0:
+        reminder_type = "continue_tree"
+        title = "Commencez votre arbre ! 🌳"
+        message = "Vous n'avez pas encore ajouté de personnes. Commencez par vous-même !"
+    elif person_count < 5:
+        reminder_type = "invite_family"
+        title = "Invitez votre famille ! 👨‍👩‍👧‍👦"
+        message = f"Votre arbre a {person_count} personnes. Invitez vos proches pour le compléter !"
+    elif days_inactive >= min_days_inactive:
+        reminder_type = "continue_tree"
+        title = "Continuez votre arbre ! 🌳"
+        message = f"Cela fait {days_inactive} jours que vous n'avez pas enrichi votre arbre."
+    else:
+        return None
+    
+    return {
+        "user_id": user['id'],
+        "user_email": user.get('email'),
+        "user_name": f"{user.get('first_name', '')} {user.get('last_name', '')}".strip(),
+        "reminder_type": reminder_type,
+        "title": title,
+        "message": message,
+        "days_inactive": days_inactive,
+        "person_count": person_count
+    }
+
+async def iter_auto_reminder_plans(now: datetime, min_days_inactive: int, timings: dict, after_id: Optional[str] = None):
+    """Stream users in batches and yield (last _id of the batch, planned reminders)
+
+    Activity and recent reminders are fetched for a whole batch at once;
+    timings accumulates the milliseconds spent in each phase.
     """
-    try:
-        users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(100)
+    def lap(phase: str, since: float) -> float:
+        current = time.perf_counter()
+        timings[phase] = timings.get(phase, 0) + round((current - since) * 1000, 1)
+        return current
+    
+    cutoff = now - timedelta(days=REMINDER_CAMPAIGN_WINDOW_DAYS)
+    mark = time.perf_counter()
+    async for users in iter_job_batches(db.users, {"id": {"$nin": [None, ""]}}, after_id,
+                                        {"_id": 1, "id": 1, "email": 1, "first_name": 1, "last_name": 1},
+                                        batch_size=REMINDER_CAMPAIGN_BATCH_SIZE):
+        mark = lap("load_users", mark)
+        user_ids = [user['id'] for user in users]
         
-        reminders_to_send = []
-        now = datetime.now(timezone.utc)
+        activity = {
+            row['_id']: row
+            async for row in db.persons.aggregate([
+                {"$match": {"owner_id": {"$in": user_ids}}},
+                {"$group": {"_id": "$owner_id", "person_count": {"$sum": 1}, "last_activity": {"$max": "$created_at"}}},
+            ])
+        }
+        mark = lap("activity", mark)
         
+        # created_at is an ISO string on most reminders, a date on some older ones
+        recently_reminded = set(await db.user_reminders.distinct("user_id", {
+            "user_id": {"$in": user_ids},
+            "$or": [{"created_at": {"$gte": cutoff.isoformat()}}, {"created_at": {"$gte": cutoff}}]
+        }))
+        mark = lap("recent_reminders", mark)
+        
+        plans = []
         for user in users:
-            user_id = user.get('id')
-            if not user_id:
-                continue
-            
-            # Check tree status
-            person_count = await db.persons.count_documents({"owner_id": user_id})
-            
-            # Check last activity
-            last_person = await db.persons.find_one(
-                {"owner_id": user_id},
-                sort=[("created_at", -1)]
-            )
-            
-            if last_person and last_person.get('created_at'):
-                try:
-                    last_activity_str = last_person.get('created_at')
-                    if isinstance(last_activity_str, str):
-                        last_activity = datetime.fromisoformat(last_activity_str.replace('Z', '+00:00'))
-                    else:
-                        last_activity = last_activity_str
-                    days_inactive = (now - last_activity).days
-                except:
-                    days_inactive = 999
-            else:
-                days_inactive = 999
-            
-            # Check if reminder already sent recently
-            recent_reminder = await db.user_reminders.find_one({
-                "user_id": user_id,
-                "created_at": {"$gte": (now - timedelta(days=7)).isoformat()}
-            })
-            
-            if recent_reminder:
+            if user['id'] in recently_reminded:
                 continue
-            
-            # Determine reminder type based on tree status
-            if person_count == 0:
-                reminder_type = "continue_tree"
-                title = "Commencez votre arbre ! 🌳"
-                message = "Vous n'avez pas encore ajouté de personnes. Commencez par vous-même !"
-            elif person_count < 5:
-                reminder_type = "invite_family"
-                title = "Invitez votre famille ! 👨‍👩‍👧‍👦"
-                message = f"Votre arbre a {person_count} personnes. Invitez vos proches pour le compléter !"
-            elif days_inactive >= min_days_inactive:
-                reminder_type = "continue_tree"
-                title = "Continuez votre arbre ! 🌳"
-                message = f"Cela fait {days_inactive} jours que vous n'avez pas enrichi votre arbre."
-            else:
-                continue
-            
-            reminders_to_send.append({
-                "user_id": user_id,
-                "user_email": user.get('email'),
-                "user_name": f"{user.get('first_name', '')} {user.get('last_name', '')}".strip(),
-                "reminder_type": reminder_type,
-                "title": title,
-                "message": message,
-                "days_inactive": days_inactive,
-                "person_count": person_count
-            })
-        
-        if dry_run:
-            return {
-                "dry_run": True,
-                "reminders_count": len(reminders_to_send),
-                "reminders_preview": reminders_to_send
-            }
-        
-        # Actually send reminders
-        sent_count = 0
-        for reminder_data in reminders_to_send:
-            try:
-                doc = {
-                    "id": str(uuid.uuid4()),
-                    "user_id": reminder_data["user_id"],
-                    "reminder_type": reminder_data["reminder_type"],
-                    "title": reminder_data["title"],
-                    "message": reminder_data["message"],
-                    "status": "sent",
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "sent_at": datetime.now(timezone.utc).isoformat()
-                }
-                await db.user_reminders.insert_one(doc)
-                sent_count += 1
-                logger.info(f"Auto reminder sent to {reminder_data['user_email']}")
-            except Exception as e:
-                logger.error(f"Error sending reminder to {reminder_data['user_email']}: {e}")
+            stats = activity.get(user['id'], {})
+            plan = plan_auto_reminder(user, stats.get('person_count', 0), stats.get('last_activity'), now, min_days_inactive)
+            if plan:
+                plans.append(plan)
+        mark = lap("plan", mark)
         
-        return {
-            "dry_run": False,
-            "reminders_sent": sent_count,
-            "reminders_failed": len(reminders_to_send) - sent_count
-        }
-        
-    except Exception as e:
-        logger.error(f"Error in send_auto_reminders: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        yield str(users[-1]['_id']), len(users), plans
+        mark = time.perf_counter()
+
+@job_handler("send_auto_reminders")
+async def run_send_auto_reminders(ctx: JobContext) -> dict:
+    """Auto-reminder campaign: plan reminders per batch of users and insert them in chunks
+
+    Each reminder carries an idempotency key (user, campaign, window), so a
+    resumed or repeated run within the same window cannot send twice.
+    """
+    now = datetime.now(timezone.utc)
+    # Fixed at submit time, so a run resumed after the window rolled over keeps its idempotency keys
+    window = ctx.params['window']
+    min_days_inactive = ctx.params.get('min_days_inactive', 7)
+    progress = {
+        "users_scanned": 0, "reminders_sent": 0, "reminders_duplicate": 0, "reminders_failed": 0,
+        "timings_ms": {}, **ctx.progress
+    }
+    timings = progress["timings_ms"]
+    
+    async for last_id, scanned, plans in iter_auto_reminder_plans(now, min_days_inactive, timings, ctx.checkpoint.get('after_id')):
+        started = time.perf_counter()
+        docs = [{
+            "id": str(uuid.uuid4()),
+            "user_id": plan["user_id"],
+            "reminder_type": plan["reminder_type"],
+            "title": plan["title"],
+            "message": plan["message"],
+            "status": "sent",
+            "campaign": AUTO_REMINDER_CAMPAIGN,
+            "window": window,
+            "idempotency_key": f"{plan['user_id']}:{AUTO_REMINDER_CAMPAIGN}:{window}",
+            "created_at": now.isoformat(),
+            "sent_at": now.isoformat()
+        } for plan in plans]
+        for start in range(0, len(docs), JOB_BATCH_SIZE):
+            chunk = docs[start:start + JOB_BATCH_SIZE]
+            errors = await insert_many_unordered(db.user_reminders, chunk)
+            duplicates = sum(1 for message in errors.values() if 'E11000' in message)
+            progress["reminders_sent"] += len(chunk) - len(errors)
+            progress["reminders_duplicate"] += duplicates
+            progress["reminders_failed"] += len(errors) - duplicates
+        timings["insert"] = timings.get("insert", 0) + round((time.perf_counter() - started) * 1000, 1)
+        progress["users_scanned"] += scanned
+        await ctx.save({"after_id": last_id}, **progress)
+    
+    logger.info(f"Auto reminder campaign {window}: {progress}")
+    return {
+        "dry_run": False,
+        "campaign": AUTO_REMINDER_CAMPAIGN,
+        "window": window,
+        **progress
+    }
+
+@job_handler("preview_auto_reminders")
+async def run_preview_auto_reminders(ctx: JobContext) -> dict:
+    """Dry run of the auto-reminder campaign: count the reminders and keep the first 100"""
+    min_days_inactive = ctx.params.get('min_days_inactive', 7)
+    progress = {"users_scanned": 0, "reminders_count": 0, "reminders_preview": [], "timings_ms": {}, **ctx.progress}
+    preview = progress["reminders_preview"]
+    
+    async for last_id, scanned, plans in iter_auto_reminder_plans(datetime.now(timezone.utc), min_days_inactive,
+                                                                  progress["timings_ms"], ctx.checkpoint.get('after_id')):
+        progress["users_scanned"] += scanned
+        progress["reminders_count"] += len(plans)
+        preview.extend(plans[:100 - len(preview)])
+        await ctx.save({"after_id": last_id}, **progress)
+    
+    return {"dry_run": True, **progress}
 
 @api_router.post("/reminders/auto-schedule")
 async def schedule_auto_reminders(current_user: dict = Depends(get_current_user)):
@@ -2007,6 +5273,8 @@ async def schedule_auto_reminders(current_user: dict = Depends(get_current_user)
             }
             await db.user_reminders.insert_one(reminder)
             scheduled_count += 1
+        if scheduled_count:
+            reminder_dispatcher.wake()
         
         return {
             "success": True,
@@ -2024,28 +5292,9 @@ async def analyze_missing_trees(current_user: dict = Depends(get_current_user)):
     try:
         user_id = current_user['id']
         
-        # Get all persons and links
-        persons = await db.persons.find({"owner_id": user_id}, {"_id": 0}).to_list(1000)
-        links = await db.links.find({"owner_id": user_id}, {"_id": 0}).to_list(1000)
-        
-        # Build family relationships map
-        relationships = {}
-        for link in links:
-            person1_id = link.get('person_id_1')
-            person2_id = link.get('person_id_2')
-            link_type = link.get('link_type')
-            
-            if person1_id not in relationships:
-                relationships[person1_id] = {'parents': [], 'children': [], 'spouses': []}
-            if person2_id not in relationships:
-                relationships[person2_id] = {'parents': [], 'children': [], 'spouses': []}
-            
-            if link_type == 'parent':
-                relationships[person2_id]['parents'].append(person1_id)
-                relationships[person1_id]['children'].append(person2_id)
-            elif link_type == 'spouse':
-                relationships[person1_id]['spouses'].append(person2_id)
-                relationships[person2_id]['spouses'].append(person1_id)
+        # Load the tree in its compact form
+        tree = await load_compact_tree(user_id)
+        parent_counts = tree.parent_counts()
         
         # Analyze missing elements
         missing_analysis = {
@@ -2056,28 +5305,25 @@ async def analyze_missing_trees(current_user: dict = Depends(get_current_user)):
             "suggestions": []
         }
         
-        for person in persons:
-            person_id = person.get('id')
-            person_rels = relationships.get(person_id, {'parents': [], 'children': [], 'spouses': []})
-            
+        for i, person in enumerate(tree.records):
             # Check for missing parents (except for oldest generation)
-            if len(person_rels['parents']) == 0:
+            if parent_counts[i] == 0:
                 missing_analysis["persons_without_parents"].append({
-                    "id": person_id,
-                    "name": f"{person.get('first_name', '')} {person.get('last_name', '')}".strip()
+                    "id": person.id,
+                    "name": person.name
                 })
             
             # Check for incomplete profiles
-            if not person.get('birth_date') or not person.get('photo_url'):
+            if not person.birth_date or not person.photo_url:
                 missing_fields = []
-                if not person.get('birth_date'):
+                if not person.birth_date:
                     missing_fields.append('date de naissance')
-                if not person.get('photo_url'):
+                if not person.photo_url:
                     missing_fields.append('photo')
                 
                 missing_analysis["incomplete_profiles"].append({
-                    "id": person_id,
-                    "name": f"{person.get('first_name', '')} {person.get('last_name', '')}".strip(),
+                    "id": person.id,
+                    "name": person.name,
                     "missing_fields": missing_fields
                 })
         
@@ -2096,7 +5342,7 @@ async def analyze_missing_trees(current_user: dict = Depends(get_current_user)):
                 "message": f"Complétez {len(missing_analysis['incomplete_profiles'])} profils avec dates et photos"
             })
         
-        if len(persons) < 10:
+        if len(tree) < 10:
             missing_analysis["suggestions"].append({
                 "type": "expand_tree",
                 "priority": "medium", 
@@ -2104,8 +5350,8 @@ async def analyze_missing_trees(current_user: dict = Depends(get_current_user)):
             })
         
         return {
-            "total_persons": len(persons),
-            "total_links": len(links),
+            "total_persons": len(tree),
+            "total_links": tree.link_count,
             "analysis": missing_analysis,
             "completion_score": max(0, 100 - len(missing_analysis["persons_without_parents"]) * 10 - len(missing_analysis["incomplete_profiles"]) * 5)
         }
@@ -2213,6 +5459,44 @@ async def get_admin_stats(admin: dict = Depends(verify_admin_token)):
         "premium_users": 0
     }
 
+@api_router.get("/admin/indexes")
+async def get_admin_indexes(admin: dict = Depends(verify_admin_token)):
+    """Report missing, undeclared and unused indexes for every registered collection"""
+    try:
+        report = await verify_indexes()
+        return {
+            "collections": report,
+            "missing_count": sum(len(r["missing"]) for r in report.values()),
+            "unused_count": sum(len(r["unused"]) for r in report.values()),
+        }
+    except Exception as e:
+        logger.error(f"Index verification error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/indexes/ensure")
+async def ensure_admin_indexes(admin: dict = Depends(verify_admin_token)):
+    """Create any missing registered index"""
+    created = await ensure_indexes()
+    return {"success": True, "indexes": created}
+
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(admin: dict = Depends(verify_admin_token)):
+    """Hit/miss counters of the in-process caches"""
+    return {"users": user_cache.stats(), "user_emails": user_email_cache.stats(), "trees": tree_cache.stats()}
+
+@api_router.get("/admin/password-hashing/stats")
+async def get_password_hashing_stats(admin: dict = Depends(verify_admin_token)):
+    """Password hashing pool metrics (work factor, queue depth, latency percentiles)"""
+    return password_hasher.stats()
+
+@api_router.post("/admin/password-hashing/calibrate")
+async def calibrate_password_hashing(target_ms: float, admin: dict = Depends(verify_admin_token)):
+    """Re-tune the bcrypt work factor to a target hash latency for every worker; existing hashes upgrade on login"""
+    if target_ms <= 0:
+        raise HTTPException(status_code=400, detail="target_ms must be positive")
+    rounds = await password_hasher.calibrate(target_ms)
+    return {"success": True, "rounds": rounds}
+
 @api_router.get("/admin/users")
 async def get_admin_users(limit: int = 100, search: str = None, admin: dict = Depends(verify_admin_token)):
     """Get all users for admin"""
@@ -2251,109 +5535,292 @@ async def reset_user_password(user_id: str, data: PasswordReset, admin: dict = D
         raise HTTPException(status_code=404, detail="User not found")
     
     # Hash new password
-    new_hash = hash_password(data.new_password)
+    new_hash = await password_hasher.hash(data.new_password)
     
     await db.users.update_one(
         {"id": user_id},
         {"$set": {"password_hash": new_hash, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    invalidate_cached_user(user_id)
     
     logger.info(f"Admin reset password for user: {user['email']}")
     return {"success": True, "message": f"Password reset for {user['email']}"}
 
+@api_router.get("/admin/chat/broker")
+async def get_chat_broker_stats(admin: dict = Depends(verify_admin_token)):
+    """Chat broker type and connected sockets in this process (admin only)"""
+    return chat_broker.stats()
+
+@api_router.get("/admin/reminders/dispatcher")
+async def get_reminder_dispatcher_stats(admin: dict = Depends(verify_admin_token)):
+    """Scheduled reminder dispatcher metrics for this worker (lag = delivery time - scheduled_at)"""
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        **reminder_dispatcher.stats(),
+        "due_now": await db.user_reminders.count_documents({"status": "scheduled", "scheduled_at": {"$lte": now}}),
+        "scheduled": await db.user_reminders.count_documents({"status": "scheduled"})
+    }
+
+@api_router.get("/admin/jobs")
+async def list_jobs(status: Optional[str] = None, type: Optional[str] = None, limit: int = 50, admin: dict = Depends(verify_admin_token)):
+    """List background jobs, most recent first"""
+    query = {}
+    if status:
+        query["status"] = status
+    if type:
+        query["type"] = type
+    jobs = await db.jobs.find(query, {"_id": 0}).sort("created_at", -1).to_list(max(1, min(limit, 200)))
+    return json.loads(json.dumps(jobs, default=_json_default))
+
+@api_router.get("/admin/jobs/{job_id}")
+async def get_job(job_id: str, admin: dict = Depends(verify_admin_token)):
+    """Get the status, progress and result of a background job"""
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return json.loads(json.dumps(job, default=_json_default))
+
+@api_router.post("/admin/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, admin: dict = Depends(verify_admin_token)):
+    """Cancel a queued job, or stop a running one at its next checkpoint"""
+    job = await job_runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No queued or running job with this id")
+    return {"success": True, "job_id": job_id, "status": job['status']}
+
+async def submit_admin_job(job_type: str, admin: dict, params: Optional[dict] = None) -> dict:
+    job = await job_runner.submit(job_type, params, created_by=admin.get('email'))
+    return {"success": True, "job_id": job['id'], "status": job['status']}
+
+@api_router.get("/reminders/analyze-trees")
+async def analyze_incomplete_trees(response: Response, limit: int = 20, cursor: Optional[str] = None, admin: dict = Depends(verify_admin_token)):
+    """Analyze trees and find users who need reminders (lowest completion first, paginated)
+
+    The next page's cursor, if any, is returned in the X-Next-Cursor header.
+    """
+    limit = max(1, min(limit, TREE_PAGE_MAX_LIMIT))
+    after = None
+    if cursor:
+        score, sep, user_id = cursor.partition(':')
+        if not sep or not score.lstrip('-').isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor, expected cursor=<completion_score>:<user_id>")
+        after = (int(score), user_id)
+    try:
+        docs = await db.persons.aggregate(tree_analysis_pipeline(after, limit + 1), allowDiskUse=True).to_list(limit + 1)
+        analysis = [tree_analysis_row(doc) for doc in docs[:limit]]
+        if len(docs) > limit:
+            last = analysis[-1]
+            response.headers["X-Next-Cursor"] = f"{last['completion_score']}:{last['user_id']}"
+        
+        return analysis
+    except Exception as e:
+        logger.error(f"Error analyzing trees: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/reminders/send-auto")
+async def send_auto_reminders(dry_run: bool = True, min_days_inactive: int = 7, admin: dict = Depends(verify_admin_token)):
+    """Send automatic reminders to inactive users (background job)
+    
+    Args:
+        dry_run: If True, only preview what would be sent without actually sending
+        min_days_inactive: Minimum days of inactivity before sending reminder
+    """
+    try:
+        # Both cover every user: the dry run's count and preview are in the job result
+        params = {"min_days_inactive": min_days_inactive}
+        if not dry_run:
+            params["window"] = campaign_window(datetime.now(timezone.utc))
+        job_type = "preview_auto_reminders" if dry_run else "send_auto_reminders"
+        result = await submit_admin_job(job_type, admin, params)
+        return {"dry_run": dry_run, **result}
+        
+    except Exception as e:
+        logger.error(f"Error in send_auto_reminders: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+MIGRATION_COLLECTIONS = [("users", "email"), ("persons", "id"), ("links", "id")]
+
+async def copy_batch_if_missing(collection, key: str, batch: List[dict], owners: Optional[set] = None) -> dict:
+    """Insert the documents of a batch whose key is not in collection yet, in one upsert bulk_write
+    
+    The owner_id of every inserted document is added to owners, when given.
+    """
+    operations = [
+        UpdateOne({key: doc[key]}, {"$setOnInsert": {k: v for k, v in doc.items() if k != '_id'}}, upsert=True)
+        for doc in batch
+    ]
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        counts = {"inserted": result.upserted_count, "existing": result.matched_count, "failed": 0}
+        upserted = result.upserted_ids
+    except BulkWriteError as e:
+        details = e.details
+        counts = {
+            "inserted": details.get('nUpserted', 0),
+            "existing": details.get('nMatched', 0),
+            "failed": len(details.get('writeErrors', []))
+        }
+        upserted = {entry['index']: entry['_id'] for entry in details.get('upserted', [])}
+    if owners is not None:
+        owners.update(batch[index].get('owner_id') for index in upserted if batch[index].get('owner_id'))
+    return counts
+
+@job_handler("migrate_to_aila_db")
+async def run_migrate_to_aila_db(ctx: JobContext) -> dict:
+    """Copy users/persons/links missing from 'aila_db' over from 'aila'
+
+    Each collection is streamed in _id order; MIGRATION_PARALLELISM upsert
+    batches are written concurrently (a wave), then the wave is checkpointed.
+    Owners that received persons or links get a full resync at the end.
+    """
+    source_db = client['aila']
+    target_db = client['aila_db']
+    report = ctx.progress.get('collections', {})
+    resume_index = ctx.checkpoint.get('collection_index', 0)
+    affected_owners = set(ctx.checkpoint.get('affected_owners', []))
+    
+    for index, (name, key) in enumerate(MIGRATION_COLLECTIONS):
+        if index < resume_index:
+            continue
+        after_id = ctx.checkpoint.get('after_id') if index == resume_index else None
+        stats = report.setdefault(name, {"read": 0, "inserted": 0, "existing": 0, "skipped": 0, "failed": 0, "elapsed_ms": 0})
+        started = time.perf_counter() - stats["elapsed_ms"] / 1000
+        wave = []
+        
+        async def flush_wave():
+            # One key per wave: concurrent upserts of a duplicated key could both insert
+            seen = set()
+            batches = []
+            for batch in wave:
+                docs = []
+                for doc in batch:
+                    if doc.get(key) in (None, '') or doc[key] in seen:
+                        stats["skipped"] += 1
+                        continue
+                    seen.add(doc[key])
+                    docs.append(doc)
+                if docs:
+                    batches.append(docs)
+            owners = affected_owners if name in ("persons", "links") else None
+            for result in await asyncio.gather(*(copy_batch_if_missing(target_db[name], key, docs, owners) for docs in batches)):
+                for field, value in result.items():
+                    stats[field] += value
+            stats["read"] += sum(len(batch) for batch in wave)
+            stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+            stats["docs_per_second"] = round(stats["read"] / max(time.perf_counter() - started, 1e-6))
+            await ctx.save({"collection_index": index, "after_id": str(wave[-1][-1]['_id']),
+                            "affected_owners": sorted(affected_owners)}, collections=report)
+            wave.clear()
+        
+        async for batch in iter_job_batches(source_db[name], {}, after_id, batch_size=MIGRATION_BATCH_SIZE):
+            wave.append(batch)
+            if len(wave) >= MIGRATION_PARALLELISM:
+                await flush_wave()
+        if wave:
+            await flush_wave()
+        logger.info(f"Migrated {name}: {stats}")
+    
+    for owner_id in affected_owners:
+        await reset_tree_changes(owner_id)
+    
+    return {
+        "migrated": {name: stats["inserted"] for name, stats in report.items()},
+        "collections": report
+    }
+
 @api_router.post("/admin/migrate-to-aila-db")
 async def migrate_to_aila_db(admin: dict = Depends(verify_admin_token)):
-    """Migrate data from 'aila' database to 'aila_db' database"""
+    """Migrate data from 'aila' database to 'aila_db' database (background job)"""
     try:
-        # Connect to both databases
-        source_db = client['aila']
-        target_db = client['aila_db']
-        
-        migrated = {"users": 0, "persons": 0, "links": 0}
-        
-        # Migrate users
-        source_users = await source_db.users.find({}, {"_id": 0}).to_list(1000)
-        for user in source_users:
-            existing = await target_db.users.find_one({"email": user.get("email")})
-            if not existing:
-                await target_db.users.insert_one(user)
-                migrated["users"] += 1
-        
-        # Migrate persons
-        source_persons = await source_db.persons.find({}, {"_id": 0}).to_list(10000)
-        for person in source_persons:
-            existing = await target_db.persons.find_one({"id": person.get("id")})
-            if not existing:
-                await target_db.persons.insert_one(person)
-                migrated["persons"] += 1
-        
-        # Migrate links
-        source_links = await source_db.links.find({}, {"_id": 0}).to_list(10000)
-        for link in source_links:
-            existing = await target_db.links.find_one({"id": link.get("id")})
-            if not existing:
-                await target_db.links.insert_one(link)
-                migrated["links"] += 1
-        
-        logger.info(f"Migration complete: {migrated}")
-        return {"success": True, "migrated": migrated}
+        return await submit_admin_job("migrate_to_aila_db", admin)
     except Exception as e:
         logger.error(f"Migration error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+EMAIL_IN_TEXT_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+def orphan_owners_pipeline() -> list:
+    """Group a collection by owner_id and keep the owners that match no user id"""
+    return [
+        {"$group": {"_id": "$owner_id", "documents": {"$sum": 1}}},
+        {"$lookup": {"from": "users", "localField": "_id", "foreignField": "id", "as": "user"}},
+        {"$match": {"user": {"$size": 0}}},
+        {"$project": {"_id": 0, "owner_id": "$_id", "documents": 1}},
+        {"$sort": {"documents": -1}},
+    ]
+
+async def load_email_to_id() -> dict:
+    """Hashed lowercase email -> user id map, built in one pass over users"""
+    email_to_id = {}
+    async for user in db.users.find({"email": {"$nin": [None, ""]}, "id": {"$nin": [None, ""]}}, {"_id": 0, "id": 1, "email": 1}):
+        email_to_id[user['email'].lower()] = user['id']
+    return email_to_id
+
+def resolve_owner_id(owner_id: Any, email_to_id: dict) -> Optional[str]:
+    """The user id an orphaned owner_id belongs to: the owner is an email, or contains one"""
+    if not isinstance(owner_id, str) or '@' not in owner_id:
+        return None
+    if owner_id.lower() in email_to_id:
+        return email_to_id[owner_id.lower()]
+    for email in EMAIL_IN_TEXT_RE.findall(owner_id):
+        if email.lower() in email_to_id:
+            return email_to_id[email.lower()]
+    return None
+
+async def plan_owner_reconciliation() -> dict:
+    """Diff of owner_id fixes: orphaned owners per collection and the user each maps to"""
+    email_to_id = await load_email_to_id()
+    plan = {"fixes": [], "unresolved": []}
+    for name in ("persons", "links"):
+        async for orphan in db[name].aggregate(orphan_owners_pipeline(), allowDiskUse=True):
+            new_owner_id = resolve_owner_id(orphan['owner_id'], email_to_id)
+            entry = {"collection": name, "owner_id": orphan['owner_id'], "documents": orphan['documents']}
+            if new_owner_id:
+                plan["fixes"].append({**entry, "new_owner_id": new_owner_id})
+            else:
+                plan["unresolved"].append(entry)
+    return plan
+
+@job_handler("fix_owner_ids")
+async def run_fix_owner_ids(ctx: JobContext) -> dict:
+    """Re-point persons/links owned by an email (or a string containing one) to that user's id"""
+    # Recomputed on resume: already applied fixes are no longer orphans
+    plan = await plan_owner_reconciliation()
+    fixed = ctx.progress.get('fixed', {"persons": 0, "links": 0})
+    affected_owners = set(ctx.checkpoint.get('affected_owners', []))
+    
+    for name in ("persons", "links"):
+        fixes = [fix for fix in plan["fixes"] if fix["collection"] == name]
+        for start in range(0, len(fixes), JOB_BATCH_SIZE):
+            chunk = fixes[start:start + JOB_BATCH_SIZE]
+            result = await db[name].bulk_write(
+                [UpdateMany({"owner_id": fix["owner_id"]}, {"$set": {"owner_id": fix["new_owner_id"]}}) for fix in chunk],
+                ordered=False
+            )
+            fixed[name] += result.modified_count
+            affected_owners.update(fix["new_owner_id"] for fix in chunk)
+            await ctx.save({"affected_owners": sorted(affected_owners)}, fixed=fixed)
+    
+    for owner_id in affected_owners:
+        await reset_tree_changes(owner_id)
+    
+    return {"fixed": fixed, "unresolved": plan["unresolved"][:100]}
+
 @api_router.post("/admin/fix-owner-ids")
-async def fix_owner_ids(admin: dict = Depends(verify_admin_token)):
-    """Fix owner_id in persons and links to match user IDs"""
+async def fix_owner_ids(dry_run: bool = False, admin: dict = Depends(verify_admin_token)):
+    """Fix owner_id in persons and links to match user IDs (dry_run returns the diff, otherwise a background job)"""
     try:
-        fixed = {"persons": 0, "links": 0}
-        
-        # Get all users with their emails and IDs
-        users = await db.users.find({}, {"_id": 0}).to_list(1000)
-        email_to_id = {}
-        for user in users:
-            if user.get('id') and user.get('email'):
-                email_to_id[user['email'].lower()] = user['id']
-                # Also map old-style owner_id (email) to new ID
-                email_to_id[user['email']] = user['id']
-        
-        # Fix persons - update owner_id if it's an email to use the user's ID
-        persons = await db.persons.find({}, {"_id": 0}).to_list(10000)
-        for person in persons:
-            owner_id = person.get('owner_id', '')
-            # Check if owner_id is an email (contains @)
-            if '@' in str(owner_id) and owner_id.lower() in email_to_id:
-                new_owner_id = email_to_id[owner_id.lower()]
-                await db.persons.update_one(
-                    {"id": person['id']},
-                    {"$set": {"owner_id": new_owner_id}}
-                )
-                fixed["persons"] += 1
-            # Also check if owner_id doesn't exist in users
-            elif owner_id and owner_id not in [u.get('id') for u in users]:
-                # Try to find user by matching patterns
-                for email, uid in email_to_id.items():
-                    if email in str(owner_id).lower() or str(owner_id) in email:
-                        await db.persons.update_one(
-                            {"id": person['id']},
-                            {"$set": {"owner_id": uid}}
-                        )
-                        fixed["persons"] += 1
-                        break
-        
-        # Fix links - same logic
-        links = await db.links.find({}, {"_id": 0}).to_list(10000)
-        for link in links:
-            owner_id = link.get('owner_id', '')
-            if '@' in str(owner_id) and owner_id.lower() in email_to_id:
-                new_owner_id = email_to_id[owner_id.lower()]
-                await db.links.update_one(
-                    {"id": link['id']},
-                    {"$set": {"owner_id": new_owner_id}}
-                )
-                fixed["links"] += 1
-        
-        logger.info(f"Fixed owner_ids: {fixed}")
-        return {"success": True, "fixed": fixed}
+        if dry_run:
+            plan = await plan_owner_reconciliation()
+            return {
+                "dry_run": True,
+                "would_fix": {
+                    name: sum(fix["documents"] for fix in plan["fixes"] if fix["collection"] == name)
+                    for name in ("persons", "links")
+                },
+                **plan
+            }
+        return await submit_admin_job("fix_owner_ids", admin)
     except Exception as e:
         logger.error(f"Fix owner_ids error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2362,96 +5829,314 @@ async def fix_owner_ids(admin: dict = Depends(verify_admin_token)):
 async def debug_owners(admin: dict = Depends(verify_admin_token)):
     """Debug: show unique owner_ids in persons and links"""
     try:
-        # Get unique owner_ids from persons
-        persons = await db.persons.find({}, {"owner_id": 1, "_id": 0}).to_list(10000)
-        person_owners = list(set([p.get('owner_id', 'NONE') for p in persons]))
-        
-        # Get unique owner_ids from links
-        links = await db.links.find({}, {"owner_id": 1, "_id": 0}).to_list(10000)
-        link_owners = list(set([l.get('owner_id', 'NONE') for l in links]))
+        owners = {}
+        orphaned = {}
+        for name in ("persons", "links"):
+            owners[name] = await db[name].aggregate([
+                {"$group": {"_id": "$owner_id", "documents": {"$sum": 1}}},
+                {"$sort": {"documents": -1}},
+                {"$limit": 20},
+            ]).to_list(20)
+            orphaned[name] = await db[name].aggregate(orphan_owners_pipeline() + [{"$limit": 20}]).to_list(20)
         
         # Get all user IDs
-        users = await db.users.find({}, {"id": 1, "email": 1, "_id": 0}).to_list(1000)
+        users = await db.users.find({}, {"id": 1, "email": 1, "_id": 0}).to_list(20)
         user_info = [{"id": u.get('id', 'NO ID'), "email": u.get('email', '')} for u in users]
         
         return {
-            "person_owner_ids": person_owners[:20],  # Limit to 20
-            "link_owner_ids": link_owners[:20],
-            "users": user_info[:20],
-            "total_persons": len(persons),
-            "total_links": len(links)
+            "person_owner_ids": [o['_id'] if o['_id'] is not None else 'NONE' for o in owners["persons"]],
+            "link_owner_ids": [o['_id'] if o['_id'] is not None else 'NONE' for o in owners["links"]],
+            "orphaned_owner_ids": orphaned,
+            "users": user_info,
+            "total_persons": await db.persons.count_documents({}),
+            "total_links": await db.links.count_documents({})
         }
     except Exception as e:
         logger.error(f"Debug owners error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@job_handler("transfer_ownership")
+async def run_transfer_ownership(ctx: JobContext) -> dict:
+    """Move all persons/links of one owner (and those without an owner) to another"""
+    old_owner_id = ctx.params['old_owner_id']
+    new_owner_id = ctx.params['new_owner_id']
+    steps = [
+        ("persons", {"owner_id": old_owner_id}),
+        ("links", {"owner_id": old_owner_id}),
+        # Also handle NONE owner_id
+        ("persons", {"owner_id": {"$in": [None, "NONE", ""]}}),
+        ("links", {"owner_id": {"$in": [None, "NONE", ""]}}),
+    ]
+    updated = ctx.progress.get('updated', {"persons": 0, "links": 0})
+    
+    for index, (name, query) in enumerate(steps):
+        if index < ctx.checkpoint.get('step', 0):
+            continue
+        result = await db[name].update_many(query, {"$set": {"owner_id": new_owner_id}})
+        updated[name] += result.modified_count
+        await ctx.save({"step": index + 1}, updated=updated)
+    
+    await reset_tree_changes(old_owner_id)
+    await reset_tree_changes(new_owner_id)
+    
+    logger.info(f"Transferred ownership from {old_owner_id} to {new_owner_id}")
+    return {"persons_updated": updated["persons"], "links_updated": updated["links"]}
+
 @api_router.post("/admin/transfer-ownership")
 async def transfer_ownership(old_owner_id: str, new_owner_id: str, admin: dict = Depends(verify_admin_token)):
-    """Transfer all persons and links from one owner to another"""
+    """Transfer all persons and links from one owner to another (background job)"""
     try:
-        # Update persons
-        persons_result = await db.persons.update_many(
-            {"owner_id": old_owner_id},
-            {"$set": {"owner_id": new_owner_id}}
-        )
-        
-        # Update links
-        links_result = await db.links.update_many(
-            {"owner_id": old_owner_id},
-            {"$set": {"owner_id": new_owner_id}}
-        )
-        
-        # Also handle NONE owner_id
-        persons_none = await db.persons.update_many(
-            {"owner_id": {"$in": [None, "NONE", ""]}},
-            {"$set": {"owner_id": new_owner_id}}
-        )
-        
-        links_none = await db.links.update_many(
-            {"owner_id": {"$in": [None, "NONE", ""]}},
-            {"$set": {"owner_id": new_owner_id}}
-        )
-        
-        logger.info(f"Transferred ownership from {old_owner_id} to {new_owner_id}")
-        return {
-            "success": True,
-            "persons_updated": persons_result.modified_count + persons_none.modified_count,
-            "links_updated": links_result.modified_count + links_none.modified_count
-        }
+        params = {"old_owner_id": old_owner_id, "new_owner_id": new_owner_id}
+        job = await job_runner.submit("transfer_ownership", params, created_by=admin.get('email'), unique=False)
+        return {"success": True, "job_id": job['id'], "status": job['status']}
     except Exception as e:
         logger.error(f"Transfer ownership error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@job_handler("chat_to_buckets")
+async def run_chat_to_buckets(ctx: JobContext) -> dict:
+    """Copy chat_messages into day buckets (for CHAT_STORAGE=buckets); chat_messages is kept"""
+    copied = ctx.progress.get('copied', 0)
+    async for batch in iter_job_batches(db.chat_messages, {}, ctx.checkpoint.get('after_id')):
+        groups = {}
+        for message in batch:
+            if message.get('tree_owner_id') and message.get('created_at'):
+                message_doc = {k: v for k, v in message.items() if k != '_id'}
+                groups.setdefault((message['tree_owner_id'], message['created_at'][:10]), []).append(message_doc)
+        if groups:
+            # A batch replayed after a crash may be pushed twice; reads skip duplicate ids
+            await db.chat_buckets.bulk_write(
+                [chat_bucket_push(owner_id, day, messages) for (owner_id, day), messages in groups.items()],
+                ordered=False
+            )
+        copied += sum(len(messages) for messages in groups.values())
+        await ctx.save({"after_id": str(batch[-1]['_id'])}, copied=copied)
+    return {"copied": copied}
+
+@api_router.post("/admin/chat/buckets")
+async def migrate_chat_to_buckets(admin: dict = Depends(verify_admin_token)):
+    """Copy chat history into the day-bucket layout (background job)"""
+    try:
+        return await submit_admin_job("chat_to_buckets", admin)
+    except Exception as e:
+        logger.error(f"Chat bucket migration error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+PERSONS_MISSING_MMDD = {"$or": [{"birth_mmdd": {"$exists": False}}, {"death_mmdd": {"$exists": False}}]}
+
+@job_handler("backfill_birth_mmdd")
+async def run_backfill_birth_mmdd(ctx: JobContext) -> dict:
+    """Set birth_mmdd and death_mmdd on persons written before they were maintained
+    
+    With missing_only, only persons lacking one of them are visited.
+    """
+    updated = ctx.progress.get('updated', 0)
+    query = PERSONS_MISSING_MMDD if ctx.params.get('missing_only') else {}
+    async for batch in iter_job_batches(db.persons, query, ctx.checkpoint.get('after_id'),
+                                        {"_id": 1, "birth_date": 1, "birth_mmdd": 1, "death_date": 1, "death_mmdd": 1}):
+        operations = []
+        for person in batch:
+            fields = with_anniversary_mmdd({"birth_date": person.get('birth_date'), "death_date": person.get('death_date')})
+            changes = {key: fields[key] for key in ('birth_mmdd', 'death_mmdd') if key not in person or person[key] != fields[key]}
+            if changes:
+                operations.append(UpdateOne({"_id": person['_id']}, {"$set": changes}))
+        if operations:
+            result = await db.persons.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+        await ctx.save({"after_id": str(batch[-1]['_id'])}, updated=updated)
+    return {"updated": updated}
+
+@job_handler("backfill_event_day")
+async def run_backfill_event_day(ctx: JobContext) -> dict:
+    """Set event_day on events written before it was maintained"""
+    updated = ctx.progress.get('updated', 0)
+    owners = set()
+    async for batch in iter_job_batches(db.events, {"event_day": {"$exists": False}}, ctx.checkpoint.get('after_id'),
+                                        {"_id": 1, "owner_id": 1, "event_date": 1}):
+        operations = [UpdateOne({"_id": event['_id']}, {"$set": {"event_day": iso_day(event.get('event_date'))}})
+                      for event in batch]
+        result = await db.events.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+        owners.update(event['owner_id'] for event in batch if event.get('owner_id'))
+        await ctx.save({"after_id": str(batch[-1]['_id'])}, updated=updated)
+    for owner_id in owners:
+        await bump_events_revision(owner_id)
+    return {"updated": updated}
+
+@api_router.post("/admin/events/backfill")
+async def backfill_event_day(admin: dict = Depends(verify_admin_token)):
+    """Compute event_day for existing events (background job)"""
+    try:
+        return await submit_admin_job("backfill_event_day", admin)
+    except Exception as e:
+        logger.error(f"event_day backfill error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def birthday_digest_message(persons: List[dict], day: date) -> str:
+    names = []
+    for person in persons[:5]:
+        entry = birthday_entry(person, day, day)
+        if entry['age'] is not None and not person.get('death_date'):
+            names.append(f"{entry['person_name']} ({entry['age']} ans)")
+        else:
+            names.append(entry['person_name'])
+    if len(persons) > 5:
+        names.append(f"et {len(persons) - 5} autre(s)")
+    return ", ".join(names)
+
+@job_handler("birthday_digest")
+async def run_birthday_digest(ctx: JobContext) -> dict:
+    """Notify every user of the day's birthdays in their tree
+    
+    One pass over persons in (owner_id, birth_mmdd) index order, grouped by
+    owner (persons not backfilled yet are matched on birth_date); resumes
+    after the last notified owner, and skips owners who already have the
+    day's digest.
+    """
+    day = date.fromisoformat(ctx.params.get('day') or datetime.now(timezone.utc).date().isoformat())
+    mmdds = [day.month * 100 + day.day]
+    if (day.month, day.day) == (2, 28) and not calendar.isleap(day.year):
+        mmdds.append(229)
+    query = {"$or": [{"birth_mmdd": {"$in": mmdds}}, {"birth_mmdd": {"$exists": False}}]}
+    if ctx.checkpoint.get('after_owner_id'):
+        query["owner_id"] = {"$gt": ctx.checkpoint['after_owner_id']}
+    notified = ctx.progress.get('notified', 0)
+    owners_seen = 0
+    
+    async def flush(owner_id: str, persons: List[dict]):
+        nonlocal notified, owners_seen
+        try:
+            await insert_notification(
+                owner_id, "birthday_digest", "Anniversaires du jour", birthday_digest_message(persons, day),
+                day=day.isoformat(), person_ids=[p['id'] for p in persons]
+            )
+            notified += 1
+        except DuplicateKeyError:
+            pass  # already has the day's digest (unique user_id/type/day index)
+        owners_seen += 1
+        if owners_seen % JOB_BATCH_SIZE == 0:
+            await ctx.save({"after_owner_id": owner_id}, notified=notified)
+    
+    owner_id, persons = None, []
+    projection = {"_id": 0, "id": 1, "owner_id": 1, "first_name": 1, "last_name": 1, "birth_date": 1, "death_date": 1,
+                  "birth_mmdd": 1}
+    async for person in db.persons.find(query, projection).sort([("owner_id", 1), ("birth_mmdd", 1)]):
+        if person_mmdd(person, 'birth') not in mmdds:
+            continue
+        if person.get('owner_id') != owner_id:
+            if persons:
+                await flush(owner_id, persons)
+            owner_id, persons = person.get('owner_id'), []
+        persons.append(person)
+    if persons and owner_id:
+        await flush(owner_id, persons)
+    
+    return {"day": day.isoformat(), "notified": notified}
+
+class DailyJobScheduler:
+    """Submits each daily job once its UTC hour has passed, once per day across workers
+    
+    The unique (type, params.day) index on scheduler jobs decides which
+    worker submits; a day whose job failed is retried on later ticks, up to
+    DAILY_JOB_MAX_ATTEMPTS runs.
+    """
+    
+    def __init__(self):
+        self.jobs = []
+        self.task = None
+    
+    def add(self, job_type: str, hour: int):
+        self.jobs.append((job_type, hour))
+    
+    async def tick(self):
+        now = datetime.now(timezone.utc)
+        day = now.date().isoformat()
+        for job_type, hour in self.jobs:
+            if now.hour < hour:
+                continue
+            try:
+                await job_runner.submit(job_type, {"day": day}, created_by="scheduler", unique=False)
+            except DuplicateKeyError:
+                await job_runner.retry({"type": job_type, "params.day": day, "created_by": "scheduler",
+                                        "attempts": {"$lt": DAILY_JOB_MAX_ATTEMPTS}})
+    
+    async def _loop(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Daily job scheduling failed: {e}")
+            await asyncio.sleep(DAILY_JOB_CHECK_SECONDS)
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+    
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+daily_jobs = DailyJobScheduler()
+daily_jobs.add("birthday_digest", BIRTHDAY_DIGEST_HOUR)
+daily_jobs.add("gdpr_export_sweep", GDPR_EXPORT_SWEEP_HOUR)
+daily_jobs.add("recount_unread_counters", NOTIFICATION_RECOUNT_HOUR)
+
+@api_router.post("/admin/birthdays/backfill")
+async def backfill_birth_mmdd(admin: dict = Depends(verify_admin_token)):
+    """Compute birth_mmdd and death_mmdd for existing persons (background job)"""
+    try:
+        return await submit_admin_job("backfill_birth_mmdd", admin)
+    except Exception as e:
+        logger.error(f"birth_mmdd backfill error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/birthdays/digest")
+async def send_birthday_digest(day: Optional[str] = None, admin: dict = Depends(verify_admin_token)):
+    """Build a day's birthday notifications now (background job; today by default)"""
+    try:
+        day = date.fromisoformat(day).isoformat() if day else datetime.now(timezone.utc).date().isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
+    try:
+        return await submit_admin_job("birthday_digest", admin, {"day": day})
+    except Exception as e:
+        logger.error(f"Birthday digest error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+EMPTY_ID_QUERY = {"$or": [{"id": {"$exists": False}}, {"id": None}, {"id": ""}]}
+
+@job_handler("fix_empty_ids")
+async def run_fix_empty_ids(ctx: JobContext) -> dict:
+    """Give an id to persons and links that lack one"""
+    fixed = ctx.progress.get('fixed', {"persons": 0, "links": 0})
+    affected_owners = set(ctx.checkpoint.get('affected_owners', []))
+    
+    for name in ("persons", "links"):
+        # Fixed documents leave the query, so each pass picks up where the last one stopped
+        while True:
+            batch = await db[name].find(EMPTY_ID_QUERY, {"_id": 1, "owner_id": 1}).limit(JOB_BATCH_SIZE).to_list(JOB_BATCH_SIZE)
+            if not batch:
+                break
+            operations = [UpdateOne({"_id": doc['_id']}, {"$set": {"id": str(uuid.uuid4())}}) for doc in batch]
+            result = await db[name].bulk_write(operations, ordered=False)
+            fixed[name] += result.modified_count
+            affected_owners.update(doc['owner_id'] for doc in batch if doc.get('owner_id'))
+            await ctx.save({"affected_owners": sorted(affected_owners)}, fixed=fixed)
+            if result.modified_count == 0:
+                break
+    
+    for owner_id in affected_owners:
+        await reset_tree_changes(owner_id)
+    
+    return {"fixed": fixed}
+
 @api_router.post("/admin/fix-empty-ids")
 async def fix_empty_ids(admin: dict = Depends(verify_admin_token)):
-    """Add IDs to persons and links that don't have one"""
+    """Add IDs to persons and links that don't have one (background job)"""
     try:
-        fixed = {"persons": 0, "links": 0}
-        
-        # Fix persons without ID
-        persons = await db.persons.find({}).to_list(10000)
-        for person in persons:
-            if not person.get('id') or person.get('id') == '' or person.get('id') is None:
-                new_id = str(uuid.uuid4())
-                await db.persons.update_one(
-                    {"_id": person['_id']},
-                    {"$set": {"id": new_id}}
-                )
-                fixed["persons"] += 1
-        
-        # Fix links without ID
-        links = await db.links.find({}).to_list(10000)
-        for link in links:
-            if not link.get('id') or link.get('id') == '' or link.get('id') is None:
-                new_id = str(uuid.uuid4())
-                await db.links.update_one(
-                    {"_id": link['_id']},
-                    {"$set": {"id": new_id}}
-                )
-                fixed["links"] += 1
-        
-        logger.info(f"Fixed empty IDs: {fixed}")
-        return {"success": True, "fixed": fixed}
+        return await submit_admin_job("fix_empty_ids", admin)
     except Exception as e:
         logger.error(f"Fix empty IDs error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2467,7 +6152,13 @@ async def delete_user_admin(user_id: str, admin: dict = Depends(verify_admin_tok
     await db.persons.delete_many({"owner_id": user_id})
     await db.links.delete_many({"owner_id": user_id})
     await db.events.delete_many({"owner_id": user_id})
+    await db.notifications.delete_many({"user_id": user_id})
+    await db.notification_counters.delete_many({"user_id": user_id})
+    await db.reminder_receipts.delete_many({"user_id": user_id})
     await db.users.delete_one({"id": user_id})
+    invalidate_cached_user(user_id)
+    await forget_tree_changes(user_id)
+    await delete_export_archives(user_id)
     
     logger.info(f"Admin deleted user: {user['email']}")
     return {"success": True, "message": f"User {user['email']} deleted"}
@@ -2487,6 +6178,49 @@ app.add_middleware(
 # Include the router in the main app (MUST be after all route definitions)
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def startup_ensure_indexes():
+    try:
+        await ensure_indexes()
+        logger.info("Database indexes ensured")
+    except Exception as e:
+        logger.error(f"Error ensuring indexes: {e}")
+
+@app.on_event("startup")
+async def startup_calibrate_password_hashing():
+    # Only the first worker started with a new target calibrates; the others adopt its result
+    try:
+        stored = await db.settings.find_one({"_id": PASSWORD_HASH_SETTINGS_ID})
+        if BCRYPT_TARGET_MS > 0 and (not stored or stored.get('target_ms') != BCRYPT_TARGET_MS):
+            await password_hasher.calibrate(BCRYPT_TARGET_MS)
+        else:
+            await password_hasher.refresh(force=True)
+    except Exception as e:
+        logger.error(f"bcrypt calibration failed: {e}")
+
+@app.on_event("startup")
+async def startup_job_runner():
+    job_runner.start()
+    reminder_dispatcher.start()
+    chat_broker.start()
+    daily_jobs.start()
+
+@app.on_event("startup")
+async def startup_backfills():
+    # Anniversary and calendar queries fall back to the ISO dates until these finish
+    try:
+        if await db.persons.find_one(PERSONS_MISSING_MMDD, {"_id": 1}):
+            await job_runner.submit("backfill_birth_mmdd", {"missing_only": True}, created_by="startup")
+        if await db.events.find_one({"event_day": {"$exists": False}}, {"_id": 1}):
+            await job_runner.submit("backfill_event_day", created_by="startup")
+    except Exception as e:
+        logger.error(f"Could not start backfills: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await daily_jobs.stop()
+    await chat_broker.stop()
+    await reminder_dispatcher.stop()
+    await job_runner.stop()
     client.close()
+    password_hasher.executor.shutdown(wait=False)
@@ -5,6 +5,8 @@ import { Ionicons } from '@expo/vector-icons';
 import { Platform, View, Text, StyleSheet } from 'react-native';
 import { useTranslation } from 'react-i18next';
 import AsyncStorage from '@react-native-async-storage/async-storage';
+import { useAuth } from '@/context/AuthContext';
+import { notificationsAPI } from '@/services/api';
 
 // SECURITY: Global preview mode flag key
 const PREVIEW_MODE_ACTIVE_KEY = 'preview_mode_active';
@@ -15,7 +17,9 @@ const isAndroidWebView = Platform.OS === 'web' && typeof navigator !== 'undefine
 export default function TabsLayout() {
   const { t } = useTranslation();
   const params = useLocalSearchParams();
+  const { user } = useAuth();
   const [isPreviewMode, setIsPreviewMode] = useState(false);
+  const [unreadCount, setUnreadCount] = useState(0);
   
   // SECURITY: Track preview mode globally via AsyncStorage
   useEffect(() => {
@@ -33,6 +37,37 @@ export default function TabsLayout() {
     };
     checkPreviewMode();
   }, [params.preview]);
+
+  // Unread notifications badge: kept live by the server-sent events stream on web,
+  // fetched once on native where EventSource is not available
+  useEffect(() => {
+    setUnreadCount(0);
+    if (!user || isPreviewMode) return;
+    let source: EventSource | null = null;
+    let cancelled = false;
+    const subscribe = async () => {
+      const token = await AsyncStorage.getItem('auth_token');
+      if (cancelled || !token) return;
+      if (typeof EventSource === 'undefined') {
+        try {
+          const response = await notificationsAPI.getUnreadCount();
+          if (!cancelled) setUnreadCount(response.data?.count || 0);
+        } catch (error) {
+          console.error('Error loading unread notifications:', error);
+        }
+        return;
+      }
+      source = new EventSource(notificationsAPI.streamUrl(token));
+      source.addEventListener('unread_count', (event: MessageEvent) => {
+        setUnreadCount(JSON.parse(event.data).count || 0);
+      });
+    };
+    subscribe();
+    return () => {
+      cancelled = true;
+      source?.close();
+    };
+  }, [user, isPreviewMode]);
   
   return (
     <View style={[
@@ -110,6 +145,7 @@ export default function TabsLayout() {
           name="profile"
           options={{
             title: t('navigation.profile'),
+            tabBarBadge: unreadCount > 0 ? (unreadCount > 99 ? '99+' : unreadCount) : undefined,
             tabBarIcon: ({ color, size }) => (
               <Ionicons name="person-outline" size={size} color={color} />
             ),
@@ -14,6 +14,7 @@ import {
 } from 'react-native';
 import { SafeAreaView } from 'react-native-safe-area-context';
 import { Ionicons } from '@expo/vector-icons';
+import AsyncStorage from '@react-native-async-storage/async-storage';
 import { useAuth } from '@/context/AuthContext';
 import { chatAPI } from '@/services/api';
 import AdBanner from '@/components/AdBanner';
@@ -33,6 +34,7 @@ export default function ChatScreen() {
   const { user } = useAuth();
   const { t } = useTranslation();
   const scrollViewRef = useRef<ScrollView>(null);
+  const socketRef = useRef<WebSocket | null>(null);
   
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const [newMessage, setNewMessage] = useState('');
@@ -46,6 +48,58 @@ export default function ChatScreen() {
     }
   }, [user]);
 
+  // Live updates from the tree's chat room; on reconnect, history is reloaded to catch up
+  useEffect(() => {
+    if (!user) return;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+    let stopped = false;
+    let reconnecting = false;
+
+    const connect = async () => {
+      const token = await AsyncStorage.getItem('auth_token');
+      if (stopped || !token) return;
+      const socket = new WebSocket(chatAPI.socketUrl(user.id, token));
+      socketRef.current = socket;
+      socket.onopen = () => {
+        if (reconnecting) loadMessages();
+      };
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'message') {
+          // Newest first, as returned by the API
+          setMessages((current) =>
+            current.some((msg) => msg.id === data.message.id) ? current : [data.message, ...current]
+          );
+        } else if (data.type === 'deleted') {
+          setMessages((current) => current.filter((msg) => msg.id !== data.id));
+        }
+      };
+      socket.onclose = (event) => {
+        if (socketRef.current === socket) socketRef.current = null;
+        // 1008: no access to this room, retrying would not help
+        if (!stopped && event.code !== 1008) {
+          reconnecting = true;
+          retry = setTimeout(connect, 5000);
+        }
+      };
+    };
+    connect();
+
+    return () => {
+      stopped = true;
+      if (retry) clearTimeout(retry);
+      socketRef.current?.close();
+      socketRef.current = null;
+    };
+  }, [user]);
+
+  // Without a live socket, the list is refreshed over REST after a change
+  const reloadUnlessLive = async () => {
+    if (socketRef.current?.readyState !== WebSocket.OPEN) {
+      await loadMessages();
+    }
+  };
+
   const loadMessages = async () => {
     try {
       const response = await chatAPI.getMessages(50, 0);
@@ -70,7 +124,7 @@ export default function ChatScreen() {
     try {
       await chatAPI.sendMessage({ message: newMessage.trim() });
       setNewMessage('');
-      await loadMessages();
+      await reloadUnlessLive();
     } catch (error) {
       console.error('Error sending message:', error);
       Alert.alert(t('common.error'), t('chatScreen.errorSend'));
@@ -121,8 +175,8 @@ export default function ChatScreen() {
       console.log('Delete API response data:', response.data);
       
       // Reload messages after successful deletion
-      await loadMessages();
-      console.log('Messages reloaded successfully after delete');
+      await reloadUnlessLive();
+      console.log('Messages updated successfully after delete');
       
     } catch (error: any) {
       console.error('=== DELETE ERROR ===');
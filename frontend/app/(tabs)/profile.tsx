@@ -346,22 +346,19 @@ export default function ProfileScreen() {
         const file = e.target.files?.[0];
         if (!file) return;
         
-        const reader = new FileReader();
-        reader.onload = async (event) => {
-          const content = event.target?.result as string;
+        const formData = new FormData();
+        formData.append('file', file);
+        
+        try {
+          const response = await api.post('/tree/import/gedcom', formData, {
+            headers: { 'Content-Type': 'multipart/form-data' }
+          });
           
-          try {
-            const response = await api.post('/tree/import/gedcom', {
-              gedcom_content: content
-            });
-            
-            window.alert(response.data.message);
-          } catch (error: any) {
-            console.error('Import error:', error);
-            window.alert(error.response?.data?.detail || 'Erreur lors de l\'import');
-          }
-        };
-        reader.readAsText(file);
+          window.alert(response.data.message);
+        } catch (error: any) {
+          console.error('Import error:', error);
+          window.alert(error.response?.data?.detail || 'Erreur lors de l\'import');
+        }
       };
       
       input.click();
@@ -1847,6 +1847,7 @@ export default function TreeScreen() {
   const [currentEvent, setCurrentEvent] = useState<any>(null);
   const [upcomingBirthdays, setUpcomingBirthdays] = useState<any[]>([]);
   const [todaysEvents, setTodaysEvents] = useState<any[]>([]);
+  const [calendarEntries, setCalendarEntries] = useState<any[]>([]);
   const [showCreateEvent, setShowCreateEvent] = useState(false);
   const [newEventType, setNewEventType] = useState('custom');
   const [newEventTitle, setNewEventTitle] = useState('');
@@ -1899,7 +1900,20 @@ export default function TreeScreen() {
     }
   }, [user, isPreviewMode, loading]);
 
+  // Family events and death anniversaries of the next 30 days (birthdays have their own list)
+  const loadCalendar = async () => {
+    try {
+      const from = new Date();
+      const to = new Date(from.getTime() + 29 * 24 * 60 * 60 * 1000);
+      const response = await eventsAPI.getCalendar(from.toISOString().slice(0, 10), to.toISOString().slice(0, 10));
+      setCalendarEntries((response.data?.entries || []).filter((entry: any) => entry.kind !== 'birthday'));
+    } catch (error) {
+      // Silent fail for non-critical events
+    }
+  };
+
   const loadEvents = async () => {
+    loadCalendar();
     try {
       const [birthdaysRes, todayRes] = await Promise.all([
         eventsAPI.getUpcomingBirthdays(),
@@ -2549,6 +2563,24 @@ export default function TreeScreen() {
                 ))
               )}
 
+              {/* Next 30 days from the calendar */}
+              <Text style={styles.eventsSectionTitle}>📅 {t('treeScreen.events.calendar')}</Text>
+              {calendarEntries.length === 0 ? (
+                <Text style={styles.eventsEmpty}>{t('treeScreen.events.noCalendarEntries')}</Text>
+              ) : (
+                calendarEntries.map((entry, index) => (
+                  <View key={`${entry.date}-${entry.person_id || entry.title}-${index}`} style={styles.eventCard}>
+                    <Text style={styles.eventCardEmoji}>{entry.kind === 'death_anniversary' ? '🕯️' : '📌'}</Text>
+                    <View style={styles.eventCardContent}>
+                      <Text style={styles.eventCardTitle}>{entry.title}</Text>
+                      <Text style={styles.eventCardSubtitle}>
+                        {new Date(`${entry.date}T00:00:00`).toLocaleDateString('fr-FR', { weekday: 'long', day: 'numeric', month: 'long' })}
+                      </Text>
+                    </View>
+                  </View>
+                ))
+              )}
+
               {/* Create Event Section */}
               <Text style={styles.eventsSectionTitle}>✨ Créer un événement</Text>
               
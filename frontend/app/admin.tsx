@@ -287,6 +287,25 @@ export default function AdminScreen() {
     setReminderMessage(template.message);
   };
 
+  // Auto reminders run as background jobs: poll one until it finishes and return its result
+  const waitForJob = async (token: string | null, jobId: string) => {
+    let job: any = { status: 'queued' };
+    while (job.status === 'queued' || job.status === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const jobResponse = await fetch(`${API_URL}/admin/jobs/${jobId}`, {
+        headers: { 'Authorization': `Bearer ${token}` },
+      });
+      if (!jobResponse.ok) {
+        throw new Error('Erreur serveur');
+      }
+      job = await jobResponse.json();
+    }
+    if (job.status !== 'completed') {
+      throw new Error(job.error || 'Job interrompu');
+    }
+    return job.result;
+  };
+
   const handlePreviewAutoReminders = async () => {
     setAutoReminderLoading(true);
     try {
@@ -300,7 +319,8 @@ export default function AdminScreen() {
       });
       
       if (response.ok) {
-        const preview = await response.json();
+        const { job_id } = await response.json();
+        const preview = await waitForJob(token, job_id);
         setAutoReminderPreview(preview);
         setShowAutoReminderModal(true);
       } else {
@@ -330,7 +350,9 @@ export default function AdminScreen() {
       });
       
       if (response.ok) {
-        const result = await response.json();
+        const { job_id } = await response.json();
+        const result = await waitForJob(token, job_id);
+        
         // Close modal FIRST
         setShowAutoReminderModal(false);
         setAutoReminderPreview(null);
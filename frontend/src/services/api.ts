@@ -151,19 +151,30 @@ export const notificationsAPI = {
   getUnreadCount: () => api.get('/notifications/unread-count'),
   markRead: (id: string) => api.put(`/notifications/${id}/read`),
   markAllRead: () => api.put('/notifications/read-all'),
+  // Server-sent events (EventSource): 'unread_count' and 'notification'
+  streamUrl: (token: string) =>
+    `${API_URL === '' ? '/api' : `${API_URL}/api`}/notifications/stream?token=${encodeURIComponent(token)}`,
 };
 
 export const chatAPI = {
-  getMessages: (limit = 50, skip = 0) => api.get(`/chat/messages?limit=${limit}&skip=${skip}`),
+  // Pass the X-Next-Cursor header of the previous page as `before` to load older messages
+  getMessages: (limit = 50, skip = 0, before?: string) =>
+    api.get('/chat/messages', { params: before ? { limit, before } : { limit, skip } }),
   sendMessage: (data: { message: string; mentioned_person_id?: string }) => api.post('/chat/messages', data),
   deleteMessage: (id: string) => api.delete(`/chat/messages/${id}`),
+  // WebSocket room of a tree; the Vercel proxy does not forward WebSockets, so web production connects to Render directly
+  socketUrl: (ownerId: string, token: string) =>
+    `${(API_URL || PRODUCTION_API_URL).replace(/^http/, 'ws')}/api/chat/ws/${ownerId}?token=${encodeURIComponent(token)}`,
 };
 
 // Family Events API
 export const eventsAPI = {
   getUpcomingBirthdays: () => api.get('/events/birthdays'),
   getTodaysEvents: () => api.get('/events/today'),
-  getEvents: () => api.get('/events'),
+  // Events by date, one page at a time: pass the X-Next-Cursor header of the previous page as `cursor`
+  getEvents: (cursor?: string, limit = 200) => api.get('/events', { params: cursor ? { limit, cursor } : { limit } }),
+  // Events plus birth/death anniversaries between two YYYY-MM-DD dates (inclusive)
+  getCalendar: (from: string, to: string) => api.get('/events/calendar', { params: { from, to } }),
   createEvent: (data: {
     event_type: string;
     title: string;